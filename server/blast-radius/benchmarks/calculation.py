@@ -0,0 +1,241 @@
+"""
+End-to-end latency, throughput and memory of blast-radius calculations against synthetic Jira projects.
+
+For every corpus size a local Jira stub (`benchmarks/jira_stub.py`) serves that many synthetic issues, with nested
+ADF descriptions, over HTTP. The service then runs in a fresh subprocess per mode and phase, so start-up time and peak
+RSS are measured in isolation:
+
+- `inprocess` calls `calculate_blast_radius` directly inside the app's lifespan;
+- `http` serves `src.main:app` with uvicorn and sends requests over a local socket.
+
+The `cold` phase starts with empty embedding and issue caches, so the first result waits for the full Jira load and
+for every issue to be encoded; the `warm` phase restarts on the caches the cold phase left behind. In both phases the
+result cache is disabled and every query is distinct, so the latencies are those of encoding and scoring.
+
+    poetry run python -m benchmarks.calculation --sizes 1000 10000 100000 --output calculation.json
+
+Compare two runs by diffing their JSON, e.g. `latency_ms.p95` per size, mode and phase.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_issue
+
+MODES = ("inprocess", "http")
+PHASES = ("cold", "warm")
+
+
+def make_queries(count: int) -> list[str]:
+    # Issue-like sentences from a different seed and project than the corpus, so no query is an exact issue summary
+    return [
+        f"{make_issue(i, project='QRY', seed=1)['fields']['summary']} Adds handling for case {i}."
+        for i in range(count)
+    ]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 120.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    return {
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "mean": float(ms.mean()),
+        "max": float(ms.max()),
+    }
+
+
+async def drive(send, queries: list[str], concurrency: int) -> dict:
+    """Sends the first query until it succeeds, then the rest one at a time, then all of them concurrently."""
+    started = time.perf_counter()
+    await send(queries[0])
+    first_result = time.perf_counter() - started
+
+    latencies = []
+    for query in queries[1:]:
+        request_started = time.perf_counter()
+        await send(query)
+        latencies.append(time.perf_counter() - request_started)
+
+    # Fresh summaries for the throughput pass, so the summary embedding cache doesn't serve them
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(query: str):
+        async with semaphore:
+            await send(query)
+
+    burst = [f"{query} (concurrent)" for query in queries]
+    burst_started = time.perf_counter()
+    await asyncio.gather(*[limited(query) for query in burst])
+    burst_seconds = time.perf_counter() - burst_started
+
+    return {
+        "time_to_first_result_seconds": first_result,
+        "latency_ms": latency_summary(latencies),
+        "throughput_rps": len(burst) / burst_seconds,
+        "concurrency": concurrency,
+    }
+
+
+async def run_inprocess(queries: list[str], max_items: int, concurrency: int) -> dict:
+    started = time.perf_counter()
+    from src.calculate import calculate_blast_radius
+    from src.data_models.calculation import CalculationRequestModel
+    from src.main import app
+    import_seconds = time.perf_counter() - started
+
+    async def send(summary: str):
+        await calculate_blast_radius(CalculationRequestModel(summary=summary, max_items=max_items))
+
+    async with app.router.lifespan_context(app):
+        report = await drive(send, queries, concurrency)
+    return {"import_seconds": import_seconds, **report}
+
+
+async def run_http(queries: list[str], max_items: int, concurrency: int) -> dict:
+    import httpx
+    import uvicorn
+
+    started = time.perf_counter()
+    from src.main import app
+    import_seconds = time.perf_counter() - started
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+        async def send(summary: str):
+            response = await client.post("/blast-radius/calculation", json={"summary": summary, "max_items": max_items})
+            response.raise_for_status()
+
+        report = await drive(send, queries, concurrency)
+
+    server.should_exit = True
+    await serving
+    return {"import_seconds": import_seconds, **report}
+
+
+def run_child(args):
+    """Runs one mode and phase in this process and prints its report as JSON."""
+    queries = make_queries(args.queries)
+    run = run_inprocess if args.mode == "inprocess" else run_http
+    report = asyncio.run(run(queries, args.max_items, args.concurrency))
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(report))
+
+
+def run_size(num_issues: int, args, work_dir: str) -> list[dict]:
+    stub_port = free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.jira_stub:app_from_env", "--factory",
+         "--port", str(stub_port), "--log-level", "warning"],
+        env={**os.environ, "STUB_NUM_ISSUES": str(num_issues), "STUB_LATENCY_MS": str(args.jira_latency_ms)}
+    )
+    results = []
+    try:
+        wait_for(f"http://127.0.0.1:{stub_port}/stub/stats")
+        for mode in args.modes:
+            cache_dir = os.path.join(work_dir, f"{num_issues}-{mode}")
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            for phase in PHASES:
+                env = {
+                    **os.environ,
+                    "JIRA_URL": f"http://127.0.0.1:{stub_port}",
+                    "EMBEDDING_CACHE_DIR": os.path.join(cache_dir, "embeddings"),
+                    "ISSUE_STORE_PATH": os.path.join(cache_dir, "issues.json"),
+                    "ISSUE_LOAD_TIMEOUT_SECONDS": "3600",
+                    "RESULT_CACHE_MAX_ENTRIES": "0",
+                }
+                started = time.perf_counter()
+                child = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.calculation", "--child", "--mode", mode,
+                     "--queries", str(args.queries), "--max-items", str(args.max_items),
+                     "--concurrency", str(args.concurrency)],
+                    env=env, capture_output=True, text=True, check=True
+                )
+                report = json.loads(child.stdout.strip().splitlines()[-1])
+                results.append({
+                    "issues": num_issues, "mode": mode, "phase": phase,
+                    "wall_seconds": time.perf_counter() - started, **report
+                })
+                print(json.dumps(results[-1]), file=sys.stderr)
+    finally:
+        stub.terminate()
+        stub.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-items", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--jira-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="blast-radius-bench-")
+    try:
+        report = {
+            "config": {
+                "sizes": args.sizes, "modes": args.modes, "queries": args.queries, "max_items": args.max_items,
+                "concurrency": args.concurrency, "jira_latency_ms": args.jira_latency_ms,
+                "encoder_backend": os.getenv("ENCODER_BACKEND", "torch"),
+                "vector_index_compression": os.getenv("VECTOR_INDEX_COMPRESSION"),
+                "retrieval_mode": os.getenv("RETRIEVAL_MODE", "dense"),
+            },
+            "results": [result for size in args.sizes for result in run_size(size, args, work_dir)],
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
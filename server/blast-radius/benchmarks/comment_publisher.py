@@ -0,0 +1,100 @@
+"""
+Posting the comments for one pull request to Jira: one at a time versus through `CommentPublisher`.
+
+Runs against the local Jira stub in-process, with latency on every comment post and a share of them answered with a
+429 and `Retry-After`. Each run posts one comment per affected issue plus a few repeated comments, and checks that
+the stub ends up with exactly one copy of every distinct comment.
+
+    poetry run python -m benchmarks.comment_publisher --issues 20 --latency-ms 200 --rate-limit-every 5
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.jira_stub import create_app
+from src.adf import text_to_adf
+from src.comment_publisher import CommentPublisher
+from src.jira_client import JiraClient
+
+
+def make_comments(num_issues: int, repeats: int) -> list[tuple[str, str]]:
+    comments = [(f"SYN-{i + 1}", f"PR #42 may affect SYN-{i + 1}.") for i in range(num_issues)]
+    # A retried webhook or a re-run calculation submits some of the same comments again
+    return comments + comments[:repeats]
+
+
+async def post_sequentially(client: JiraClient, comments: list[tuple[str, str]]) -> int:
+    """The previous behaviour: one blocking round trip per comment, duplicates included."""
+    failed = 0
+    for issue_key, text in comments:
+        try:
+            await client.add_comment(issue_key, text_to_adf(text))
+        except httpx.HTTPError:
+            failed += 1
+    return failed
+
+
+async def run_one(mode: str, args) -> dict:
+    stub = create_app(
+        num_issues=max(args.issues, 1),
+        comment_latency_ms=args.latency_ms,
+        comment_rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after
+    )
+    client = JiraClient("http://jira-stub", "bench@example.com", "token",
+                        transport=httpx.ASGITransport(app=stub))
+    comments = make_comments(args.issues, args.repeats)
+
+    started = time.perf_counter()
+    if mode == "sequential":
+        failed = await post_sequentially(client, comments)
+        duplicates = 0
+    else:
+        publisher = CommentPublisher(client, max_concurrency=args.concurrency)
+        results = await publisher.publish(comments)
+        failed = sum(not result.posted for result in results)
+        duplicates = sum(result.duplicate for result in results)
+    seconds = time.perf_counter() - started
+    await client.aclose()
+
+    posted = [(comment["issueKey"], comment["body"]["content"][0]["content"][0]["text"])
+              for comment in stub.state.comments]
+    return {
+        "comments": len(comments),
+        "seconds": seconds,
+        "comments_per_second": len(comments) / seconds,
+        "posted": len(posted),
+        "duplicates_skipped": duplicates,
+        "failed": failed,
+        "throttled": stub.state.requests["comments_throttled"],
+        "one_copy_each": sorted(posted) == sorted(set(comments)),
+    }
+
+
+async def run(args) -> dict:
+    return {mode: await run_one(mode, args) for mode in ("sequential", "publisher")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5, help="Comments submitted a second time")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--rate-limit-every", type=int, default=5)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
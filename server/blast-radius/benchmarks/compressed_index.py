@@ -0,0 +1,126 @@
+"""
+Memory versus recall report for the compressed vector index tiers in `src/vector_index.py`.
+
+The corpus is written to a shared embedding file and memory-mapped, as the service does, and searched through an
+uncompressed index and through the int8 and binary tiers. Recall@k and threshold recall are measured against an exact
+float32 search of the same vectors. An uncompressed index over the memory map scores every row per query and keeps
+the whole file resident in the page cache; the compressed tiers only touch the rows they rescore. By default the
+corpus is clustered random vectors; pass `--model` to encode synthetic Jira issues instead, which is slower but closer
+to real similarity distributions.
+
+    poetry run python -m benchmarks.compressed_index --corpus-size 100000 --output compressed.json
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from src.embedding_file import SharedEmbeddingFile
+from src.vector_index import COMPRESSIONS, VectorIndex
+
+
+def clustered_corpus(corpus_size: int, num_queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, corpus_size // 100), dim))
+    corpus = centers[rng.integers(0, len(centers), corpus_size)] + 0.8 * rng.normal(size=(corpus_size, dim))
+    queries = corpus[rng.integers(0, corpus_size, num_queries)] + 0.5 * rng.normal(size=(num_queries, dim))
+    return corpus.astype(np.float32), queries.astype(np.float32)
+
+
+def encoded_corpus(model_name: str, corpus_size: int, num_queries: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    from benchmarks.synthetic import make_project
+    from src.data_models.jira import JiraIssues
+    from src.encoders import load_encoder
+
+    texts = [
+        JiraIssues.JiraIssue.from_api(issue, "https://jira.example.com").textual_representation
+        for issue in make_project(corpus_size + num_queries, seed=seed)
+    ]
+    embeddings = np.asarray(load_encoder(model_name).encode(texts, batch_size=64), dtype=np.float32)
+    return embeddings[:corpus_size], embeddings[corpus_size:]
+
+
+def run(corpus: np.ndarray, queries: np.ndarray, k: int, threshold: float, dtype: str, min_train_size: int) -> dict:
+    keys = [f"ISSUE-{i}" for i in range(len(corpus))]
+    reference = VectorIndex(exact=True)
+    reference.upsert_many(keys, corpus)
+    expected = [reference.search(query, k, threshold) for query in queries]
+
+    # The shared file stores normalised vectors, as IssueIndex publishes them
+    _, _, normalised = reference.export()
+    shared_file = SharedEmbeddingFile(tempfile.mkdtemp(prefix="compressed-index-"), "benchmark", dtype=dtype)
+    shared_file.try_become_writer()
+    shared_file.publish(keys, [None] * len(keys), normalised)
+    snapshot = shared_file.open()
+
+    report = {
+        "corpus_size": len(corpus),
+        "dim": corpus.shape[1],
+        "k": k,
+        "threshold": threshold,
+        "shared_dtype": dtype,
+        "mapped_bytes": int(snapshot.vectors.nbytes),
+        "tiers": {},
+    }
+    # "float32" is the private in-memory index every worker held before; the others search the memory map
+    for name, compression in (("float32", None), ("mmap", None), *((c, c) for c in COMPRESSIONS)):
+        index = VectorIndex(compression=compression, min_train_size=min_train_size)
+        if name == "float32":
+            index.upsert_many(keys, corpus)
+        else:
+            index.load(snapshot.keys, snapshot.vectors)
+
+        timings, top_k_recall, threshold_recall = [], [], []
+        for query, exact in zip(queries, expected):
+            started = time.perf_counter()
+            result = index.search(query, k, threshold)
+            timings.append(time.perf_counter() - started)
+
+            top_k_recall.append(len({key for key, _ in exact.top_k} & {key for key, _ in result.top_k}) / k)
+            hits = {key for key, _ in exact.above_threshold}
+            if hits:
+                threshold_recall.append(len(hits & {key for key, _ in result.above_threshold}) / len(hits))
+
+        baseline = report["tiers"].get("float32", {}).get("private_bytes", index.nbytes)
+        report["tiers"][name] = {
+            "private_bytes": index.nbytes,
+            "private_memory_saved": 1 - index.nbytes / baseline,
+            f"recall@{k}": float(np.mean(top_k_recall)),
+            "threshold_recall": float(np.mean(threshold_recall)) if threshold_recall else None,
+            "p50_ms": float(np.percentile(timings, 50) * 1000),
+            "p95_ms": float(np.percentile(timings, 95) * 1000),
+        }
+        print(name, json.dumps(report["tiers"][name]))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the random corpus (ignored with --model)")
+    parser.add_argument("--model", help="Encode synthetic Jira issues with this model instead of random vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--dtype", default="float16", choices=("float16", "float32"),
+                        help="Storage of the memory-mapped full-precision vectors used for rescoring")
+    parser.add_argument("--min-train-size", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.model:
+        corpus, queries = encoded_corpus(args.model, args.corpus_size, args.queries, args.seed)
+    else:
+        corpus, queries = clustered_corpus(args.corpus_size, args.queries, args.dim, args.seed)
+
+    report = run(corpus, queries, args.k, args.threshold, args.dtype, args.min_train_size)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Accuracy and throughput comparison of the encoder backends in `src/encoders.py`.
+
+Every backend encodes the same fixed corpus (synthetic Jira issues and code-change style queries). Cosine similarities
+between queries and issues are compared with the full-precision PyTorch reference, together with how many of the
+reference top-10 issues each backend still ranks in its own top-10. Peak RSS is for the whole process, so run one
+backend at a time when comparing memory.
+
+    poetry run python -m benchmarks.encoder_backends --backends torch torch-int8 onnx onnx-int8 --output encoders.json
+"""
+import argparse
+import json
+import resource
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_project
+from src.data_models.jira import JiraIssues
+from src.encoders import ENCODER_BACKENDS, load_encoder
+
+QUERIES = [
+    "Adds retry logic to the payments client when the billing service times out.",
+    "Refactors session handling so users stay logged in after a deploy.",
+    "Fixes a memory leak in the notifications worker under load.",
+    "Validates webhook payloads and rejects malformed input with a 400.",
+    "Speeds up exports for large projects by streaming rows instead of buffering them.",
+    "Moves feature flag evaluation into a shared module with caching.",
+    "Updates the rate limiter to use a sliding window per tenant.",
+    "Changes the checkout page to handle Safari autofill correctly.",
+]
+
+
+def cosine_matrix(queries: np.ndarray, corpus: np.ndarray) -> np.ndarray:
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    return queries @ corpus.T
+
+
+def top_k_overlap(reference: np.ndarray, candidate: np.ndarray, k: int = 10) -> float:
+    overlaps = [
+        len(set(np.argsort(-ref)[:k]) & set(np.argsort(-cand)[:k])) / k
+        for ref, cand in zip(reference, candidate)
+    ]
+    return float(np.mean(overlaps))
+
+
+def run(model_name: str, backends: list[str], corpus_size: int, batch_size: int, repeats: int) -> dict:
+    corpus = [
+        JiraIssues.JiraIssue.from_api(issue, "https://jira.example.com").textual_representation
+        for issue in make_project(corpus_size, seed=42)
+    ]
+
+    results = {}
+    reference = None
+    for backend in backends:
+        started = time.perf_counter()
+        model = load_encoder(model_name, backend)
+        load_seconds = time.perf_counter() - started
+
+        model.encode(corpus[:batch_size], batch_size=batch_size)  # warm-up
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            corpus_embeddings = model.encode(corpus, batch_size=batch_size)
+            timings.append(time.perf_counter() - started)
+        similarities = cosine_matrix(model.encode(QUERIES), corpus_embeddings)
+
+        result = {
+            "load_seconds": load_seconds,
+            "texts_per_second": corpus_size / min(timings),
+            "process_peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+        if reference is None:
+            reference = similarities
+        else:
+            errors = np.abs(similarities - reference)
+            result.update({
+                "max_abs_cosine_error": float(errors.max()),
+                "mean_abs_cosine_error": float(errors.mean()),
+                "top10_overlap": top_k_overlap(reference, similarities),
+                "speedup": result["texts_per_second"] / results[backends[0]]["texts_per_second"],
+            })
+        results[backend] = result
+        print(backend, json.dumps(result))
+
+    return {"model": model_name, "reference": backends[0], "corpus_size": corpus_size, "backends": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS,
+                        help="The first backend is the reference the others are compared with")
+    parser.add_argument("--corpus-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args.model, args.backends, args.corpus_size, args.batch_size, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+In-memory stand-in for the parts of the Firestore client `src/database.py` uses, for exercising `DatabaseService`
+without a Firebase project.
+
+Documents live in a dict keyed by path. Reads can be given artificial latency and are counted, and `on_snapshot`
+listeners are called on every write, like Firestore's listener thread would. Running the module compares how many
+Firestore reads a burst of settings lookups costs with and without the settings cache:
+
+    poetry run python -m benchmarks.firestore_stub --users 50 --lookups 2000
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Optional
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._data) if self._data is not None else None
+
+
+class Watch:
+    def __init__(self, reference: "DocumentReference", callback: Callable):
+        self._reference = reference
+        self.callback = callback
+
+    def unsubscribe(self):
+        self._reference.client.remove_listener(self._reference.path, self)
+
+
+class DocumentReference:
+    def __init__(self, client: "InMemoryFirestore", collection: str, document_id: str):
+        self.client = client
+        self.id = document_id
+        self.path = f"{collection}/{document_id}"
+
+    def get(self) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self.client.read(self.path))
+
+    def set(self, data: dict):
+        self.client.write(self.path, dict(data))
+
+    def update(self, data: dict):
+        self.client.write(self.path, {**(self.client.read(self.path, count=False) or {}), **data})
+
+    def delete(self):
+        self.client.write(self.path, None)
+
+    def on_snapshot(self, callback: Callable) -> Watch:
+        watch = Watch(self, callback)
+        self.client.add_listener(self.path, watch)
+        # Firestore delivers the current state as the first snapshot
+        callback([self.get()], [], time.time())
+        return watch
+
+
+class CollectionReference:
+    def __init__(self, client: "InMemoryFirestore", name: str):
+        self.client = client
+        self.name = name
+
+    def document(self, document_id: str) -> DocumentReference:
+        return DocumentReference(self.client, self.name, document_id)
+
+
+class InMemoryFirestore:
+    """Drop-in for `firestore.client()` in `DatabaseService(db=...)`."""
+
+    def __init__(self, documents: Optional[dict[str, dict]] = None, read_latency_ms: float = 0.0):
+        self.read_latency_ms = read_latency_ms
+        self.reads = 0
+        self._documents: dict[str, dict] = dict(documents or {})
+        self._listeners: dict[str, list[Watch]] = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def read(self, path: str, count: bool = True) -> Optional[dict]:
+        if count:
+            if self.read_latency_ms:
+                time.sleep(self.read_latency_ms / 1000)
+            with self._lock:
+                self.reads += 1
+        with self._lock:
+            data = self._documents.get(path)
+            return dict(data) if data is not None else None
+
+    def write(self, path: str, data: Optional[dict]):
+        with self._lock:
+            if data is None:
+                self._documents.pop(path, None)
+            else:
+                self._documents[path] = data
+            listeners = list(self._listeners.get(path, []))
+
+        collection, document_id = path.split("/", 1)
+        snapshot = DocumentSnapshot(self.collection(collection).document(document_id), data)
+        for watch in listeners:
+            watch.callback([snapshot], [], time.time())
+
+    def add_listener(self, path: str, watch: Watch):
+        with self._lock:
+            self._listeners.setdefault(path, []).append(watch)
+
+    def remove_listener(self, path: str, watch: Watch):
+        with self._lock:
+            if watch in self._listeners.get(path, []):
+                self._listeners[path].remove(watch)
+
+
+def make_settings(num_users: int) -> dict[str, dict]:
+    documents = {"config/default_feature_flags": {"prSummariesEnabled": True, "jiraTicketEnabled": False}}
+    for i in range(num_users):
+        documents[f"settings/user-{i}"] = {
+            "jiraEmail": f"user-{i}@example.com",
+            "jiraDomain": f"https://tenant-{i}.atlassian.net",
+            "jiraApiToken": "token",
+            "prSummariesEnabled": i % 2 == 0,
+            "systemInstructions": f"Instructions for user {i}",
+        }
+    return documents
+
+
+async def lookup_burst(num_users: int, lookups: int, read_latency_ms: float, cached: bool) -> dict:
+    from src.database import DatabaseService, SettingsCache
+
+    class UncachedSettings(SettingsCache):
+        # Reads the document on every call, which is what DatabaseService did before the settings cache
+        async def get(self, doc_ref):
+            self.misses += 1
+            return await asyncio.to_thread(self._read, doc_ref)
+
+    db = InMemoryFirestore(make_settings(num_users), read_latency_ms=read_latency_ms)
+    cache = SettingsCache() if cached else UncachedSettings(watch=False)
+    service = DatabaseService(db=db, cache=cache)
+
+    async def lookup(i: int):
+        user_id = f"user-{i % num_users}"
+        await service.get_feature_flags(user_id)
+        await service.get_prompt_templates(user_id)
+        await service.get_jira_credentials(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(lookup(i) for i in range(lookups)))
+    seconds = time.perf_counter() - started
+
+    # An edit reaches the cache through the snapshot listener, without waiting for the TTL
+    db.collection("settings").document("user-0").update({"systemInstructions": "Edited"})
+    edited = (await service.get_prompt_templates("user-0")).system_instructions
+
+    return {
+        "firestore_reads": db.reads,
+        "reads_per_lookup": db.reads / lookups,
+        "seconds": seconds,
+        "edit_visible": edited == "Edited",
+        "cache": cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=2000, help="Each lookup reads flags, prompts and credentials")
+    parser.add_argument("--read-latency-ms", type=float, default=2.0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = {
+        mode: asyncio.run(lookup_burst(args.users, args.lookups, args.read_latency_ms, cached=mode == "cached"))
+        for mode in ("uncached", "cached")
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Microbenchmark of Jira issue parsing and storage at tens of thousands of issues.
+
+Compares, on the same synthetic search pages the local Jira stub serves:
+
+- parsing: `json` versus `orjson` (when installed) on the raw response bytes, and the previous recursive ADF flattener
+  versus the iterative `adf_to_text`, including a description nested deeper than the recursion limit;
+- storage: a dict of `JiraIssue` models versus `IssueTable`, measured with tracemalloc.
+
+    poetry run python -m benchmarks.issue_representation --issues 50000 --output issues.json
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_project
+from src.adf import adf_to_text, orjson
+from src.data_models.jira import JiraIssues
+from src.issue_table import IssueTable
+
+JIRA_URL = "https://jira.example.com"
+
+
+def recursive_adf_to_text(document: dict) -> str:
+    """The flattener `JiraIssue` used before `adf_to_text`, kept as the baseline."""
+    def traverse_content(content):
+        raw_text = ""
+        for item in content:
+            if item['type'] == 'text':
+                raw_text += item['text'] + ' '
+            if 'content' in item:
+                raw_text += traverse_content(item['content'])
+        return raw_text
+
+    return traverse_content(document['content']).strip()
+
+
+def timed(function, *args, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def allocated_bytes(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def long_document(paragraphs: int) -> dict:
+    return {"type": "doc", "version": 1, "content": [
+        {"type": "paragraph", "content": [{"type": "text", "text": f"Paragraph {i} of a very long description."}]}
+        for i in range(paragraphs)
+    ]}
+
+
+def deep_document(depth: int) -> dict:
+    node = {"type": "text", "text": "bottom"}
+    for _ in range(depth):
+        node = {"type": "listItem", "content": [node]}
+    return {"type": "doc", "version": 1, "content": [node]}
+
+
+def run(num_issues: int, page_size: int) -> dict:
+    raw_issues = make_project(num_issues, seed=7)
+    pages = [
+        json.dumps({"issues": raw_issues[start:start + page_size]}).encode()
+        for start in range(0, num_issues, page_size)
+    ]
+    documents = [issue["fields"]["description"] for issue in raw_issues if issue["fields"]["description"]]
+
+    report = {"issues": num_issues, "parsing": {}, "storage": {}}
+    parsing = report["parsing"]
+    parsing["json_loads_seconds"] = timed(lambda: [json.loads(page) for page in pages])
+    if orjson is not None:
+        parsing["orjson_loads_seconds"] = timed(lambda: [orjson.loads(page) for page in pages])
+    parsing["recursive_adf_seconds"] = timed(lambda: [recursive_adf_to_text(d) for d in documents])
+    parsing["iterative_adf_seconds"] = timed(lambda: [adf_to_text(d) for d in documents])
+    parsing["adf_outputs_match"] = all(recursive_adf_to_text(d) == adf_to_text(d) for d in documents[:1000])
+
+    long = long_document(200000)
+    parsing["recursive_adf_long_document_seconds"] = timed(recursive_adf_to_text, long)
+    parsing["iterative_adf_long_document_seconds"] = timed(adf_to_text, long)
+
+    deep = deep_document(sys.getrecursionlimit() * 2)
+    try:
+        recursive_adf_to_text(deep)
+        parsing["recursive_adf_deep_document"] = "ok"
+    except RecursionError:
+        parsing["recursive_adf_deep_document"] = "RecursionError"
+    parsing["iterative_adf_deep_document"] = "ok" if adf_to_text(deep) == "bottom" else "wrong output"
+
+    del raw_issues, documents
+    loads = orjson.loads if orjson is not None else json.loads
+
+    # Both are built from the response bytes, so each owns its strings and only what it keeps alive is measured
+    def build_models():
+        return {
+            issue["key"]: JiraIssues.JiraIssue.from_api(issue, JIRA_URL)
+            for page in pages for issue in loads(page)["issues"]
+        }
+
+    def build_table():
+        table = IssueTable()
+        for page in pages:
+            for issue in loads(page)["issues"]:
+                table.upsert(JiraIssues.JiraIssue.from_api(issue, JIRA_URL))
+        return table
+
+    model_bytes, models = allocated_bytes(build_models)
+    table_bytes, table = allocated_bytes(build_table)
+    report["storage"] = {
+        "pydantic_dict_bytes": model_bytes,
+        "issue_table_bytes": table_bytes,
+        "issue_table_reported_nbytes": table.nbytes,
+        "memory_ratio": model_bytes / table_bytes,
+        "pydantic_build_seconds": timed(build_models, repeats=1),
+        "issue_table_build_seconds": timed(build_table, repeats=1),
+        "rows_match": all(table.get(key) == issue for key, issue in list(models.items())[:1000]),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args.issues, args.page_size)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Jira Cloud REST API, serving a large synthetic project.
+
+Run it with `uvicorn benchmarks.jira_stub:app_from_env --factory --port 8090` and point the service at it with
+`JIRA_URL=http://localhost:8090`. The stub can be tuned through environment variables:
+
+- `STUB_NUM_ISSUES`: number of synthetic issues (default 10000)
+- `STUB_MAX_RESULTS`: page size cap, like Jira's own `maxResults` limit (default 100)
+- `STUB_LATENCY_MS`: latency added to every request (default 0)
+- `STUB_RATE_LIMIT_EVERY`: answer every n-th request with a 429 and `Retry-After` (default 0, disabled)
+- `STUB_COMMENT_LATENCY_MS`: extra latency for posting a comment, on top of `STUB_LATENCY_MS` (default 0)
+- `STUB_COMMENT_RATE_LIMIT_EVERY`: answer every n-th comment post with a 429 and `Retry-After` (default 0, disabled)
+
+It can also be used in-process through `httpx.ASGITransport(app=create_app(...))`. Issues can be edited and deleted
+through `POST`/`DELETE /stub/issues/{key}`, and `updated >= -<n>m` JQL clauses are honoured, so incremental syncs
+see those changes. Comments posted through `POST /rest/api/3/issue/{key}/comment` are kept and listed by
+`GET /stub/comments`.
+"""
+import asyncio
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from .synthetic import make_project
+
+
+def create_app(
+        num_issues: int = 10000,
+        max_results_cap: int = 100,
+        latency_ms: float = 0,
+        rate_limit_every: int = 0,
+        retry_after: float = 0.1,
+        comment_latency_ms: float = 0,
+        comment_rate_limit_every: int = 0
+) -> FastAPI:
+    stub = FastAPI()
+    stub.state.issues = make_project(num_issues)
+    stub.state.requests = Counter()
+    stub.state.comments = []
+
+    @stub.middleware("http")
+    async def inject_latency_and_rate_limits(request: Request, call_next):
+        stub.state.requests["total"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if rate_limit_every and stub.state.requests["total"] % rate_limit_every == 0:
+            stub.state.requests["throttled"] += 1
+            return JSONResponse(
+                {"errorMessages": ["Rate limit exceeded"]},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+        return await call_next(request)
+
+    def matching(jql: str) -> list[dict]:
+        updated_since = re.search(r"updated\s*>=\s*-(\d+)m", jql)
+        if not updated_since:
+            return stub.state.issues
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=int(updated_since.group(1))))
+        cutoff = cutoff.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        return [issue for issue in stub.state.issues if issue["fields"]["updated"] >= cutoff]
+
+    def page(jql: str, start_at: int, max_results: int) -> tuple[list[dict], int, int]:
+        issues = matching(jql)
+        max_results = max(0, min(max_results, max_results_cap))
+        return issues[start_at:start_at + max_results], max_results, len(issues)
+
+    @stub.get("/rest/api/3/search")
+    async def search(startAt: int = 0, maxResults: int = 50, jql: str = "", fields: str = ""):
+        issues, max_results, total = page(jql, startAt, maxResults)
+        return {"startAt": startAt, "maxResults": max_results, "total": total, "issues": issues}
+
+    @stub.get("/rest/api/3/search/jql")
+    async def search_jql(nextPageToken: str = "0", maxResults: int = 50, jql: str = "", fields: str = ""):
+        start_at = int(nextPageToken)
+        issues, max_results, total = page(jql, start_at, maxResults)
+        next_start = start_at + max_results
+        is_last = next_start >= total
+        return {"issues": issues, "isLast": is_last, **({} if is_last else {"nextPageToken": str(next_start)})}
+
+    @stub.post("/rest/api/3/issue/{key}/comment", status_code=201)
+    async def add_comment(key: str, payload: dict):
+        stub.state.requests["comment_attempts"] += 1
+        if comment_latency_ms:
+            await asyncio.sleep(comment_latency_ms / 1000)
+        if comment_rate_limit_every and stub.state.requests["comment_attempts"] % comment_rate_limit_every == 0:
+            stub.state.requests["comments_throttled"] += 1
+            return JSONResponse(
+                {"errorMessages": ["Rate limit exceeded"]},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+        if not any(issue["key"] == key for issue in stub.state.issues):
+            return JSONResponse({"errorMessages": ["Issue does not exist or you do not have permission to see it."]},
+                                status_code=404)
+
+        comment = {"id": str(10000 + len(stub.state.comments)), "issueKey": key, "body": payload["body"]}
+        stub.state.comments.append(comment)
+        return comment
+
+    @stub.get("/stub/comments")
+    async def comments():
+        return stub.state.comments
+
+    @stub.post("/stub/issues/{key}")
+    async def edit_issue(key: str, fields: dict):
+        """Edits (or creates) an issue and bumps its `updated` time, like a user editing it in Jira."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        issue = next((issue for issue in stub.state.issues if issue["key"] == key), None)
+        if issue is None:
+            issue = {"id": str(10000 + len(stub.state.issues)), "key": key,
+                     "fields": {"summary": "", "description": None, "issuetype": {"name": "Task"}}}
+            stub.state.issues.append(issue)
+        issue["fields"].update(fields, updated=now)
+        return issue
+
+    @stub.delete("/stub/issues/{key}", status_code=204)
+    async def delete_issue(key: str):
+        stub.state.issues = [issue for issue in stub.state.issues if issue["key"] != key]
+
+    @stub.get("/stub/stats")
+    async def stats():
+        return dict(stub.state.requests)
+
+    return stub
+
+
+def app_from_env() -> FastAPI:
+    return create_app(
+        num_issues=int(os.getenv("STUB_NUM_ISSUES", "10000")),
+        max_results_cap=int(os.getenv("STUB_MAX_RESULTS", "100")),
+        latency_ms=float(os.getenv("STUB_LATENCY_MS", "0")),
+        rate_limit_every=int(os.getenv("STUB_RATE_LIMIT_EVERY", "0")),
+        comment_latency_ms=float(os.getenv("STUB_COMMENT_LATENCY_MS", "0")),
+        comment_rate_limit_every=int(os.getenv("STUB_COMMENT_RATE_LIMIT_EVERY", "0"))
+    )
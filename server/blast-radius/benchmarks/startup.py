@@ -0,0 +1,134 @@
+"""
+Import-time and cold-start budget check for the blast-radius service.
+
+Measures, each in a fresh process:
+
+- how long `import src.main` takes (`python -X importtime`), with the heaviest top-level imports;
+- how long after launching uvicorn `/health` answers (the process is serving) and `/ready` answers 200 (the encoder
+  is loaded and warmed up and the preloaded tenant's issues from a local Jira stub are indexed).
+
+Each figure is compared with its budget, and the process exits with status 1 if any is exceeded, so it can gate CI:
+
+    poetry run python -m benchmarks.startup --issues 1000 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.calculation import free_port, wait_for
+
+
+def measure_imports(module: str = "src.main", top: int = 10) -> dict:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    wall_seconds = time.perf_counter() - started
+
+    # Lines look like "import time:   self [us] | cumulative | imported package", nested imports indented further.
+    # Self times add up without double counting, so they are summed per top-level package, e.g. all of "torch.*".
+    package_us = {}
+    module_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == module:
+            module_us = int(cumulative_us)
+        package = name.split(".")[0]
+        package_us[package] = package_us.get(package, 0) + int(self_us)
+    heaviest = sorted(package_us.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "process_wall_seconds": wall_seconds,
+        "import_seconds": module_us / 1e6 if module_us is not None else None,
+        "heaviest_packages_ms": {name: us / 1000 for name, us in heaviest},
+        "torch_imported": "torch" in package_us,
+        "firebase_admin_imported": "firebase_admin" in package_us,
+    }
+
+
+def measure_cold_start(num_issues: int, timeout: float) -> dict:
+    stub_port, service_port = free_port(), free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.jira_stub:app_from_env", "--factory",
+         "--port", str(stub_port), "--log-level", "warning"],
+        env={**os.environ, "STUB_NUM_ISSUES": str(num_issues)}
+    )
+    service = None
+    try:
+        wait_for(f"http://127.0.0.1:{stub_port}/stub/stats")
+        cache_dir = tempfile.mkdtemp(prefix="blast-radius-startup-")
+        started = time.perf_counter()
+        service = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(service_port), "--log-level", "warning"],
+            env={**os.environ, "JIRA_URL": f"http://127.0.0.1:{stub_port}", "EMBEDDING_CACHE_DIR": cache_dir},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        health_seconds = ready_seconds = None
+        readiness = None
+        while time.perf_counter() - started < timeout:
+            try:
+                if health_seconds is None and httpx.get(f"http://127.0.0.1:{service_port}/health").status_code == 200:
+                    health_seconds = time.perf_counter() - started
+                if health_seconds is not None:
+                    response = httpx.get(f"http://127.0.0.1:{service_port}/ready")
+                    readiness = response.json()
+                    if response.status_code == 200:
+                        ready_seconds = time.perf_counter() - started
+                        break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        return {"health_seconds": health_seconds, "ready_seconds": ready_seconds, "readiness": readiness}
+    finally:
+        for process in (service, stub):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--import-budget-seconds", type=float, default=1.0)
+    parser.add_argument("--health-budget-seconds", type=float, default=3.0)
+    parser.add_argument("--ready-budget-seconds", type=float, default=60.0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    imports = measure_imports()
+    cold_start = measure_cold_start(args.issues, timeout=2 * args.ready_budget_seconds)
+    budgets = {
+        "import_seconds": (imports["import_seconds"], args.import_budget_seconds),
+        "health_seconds": (cold_start["health_seconds"], args.health_budget_seconds),
+        "ready_seconds": (cold_start["ready_seconds"], args.ready_budget_seconds),
+    }
+    report = {
+        "issues": args.issues,
+        "imports": imports,
+        "cold_start": cold_start,
+        "budgets": {
+            name: {"measured": measured, "budget": budget, "ok": measured is not None and measured <= budget}
+            for name, (measured, budget) in budgets.items()
+        },
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if not all(budget["ok"] for budget in report["budgets"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
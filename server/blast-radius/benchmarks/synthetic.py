@@ -0,0 +1,66 @@
+"""
+Deterministic synthetic Jira data for the local Jira stub and benchmarks.
+
+Issues look like what `/rest/api/3/search` returns: `id`, `key` and a `fields` object whose `description` is an
+Atlassian Document Format (ADF) tree with nested paragraphs, lists and marks.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+COMPONENTS = [
+    "auth", "billing", "checkout", "search", "notifications", "payments", "profile", "reporting", "onboarding",
+    "webhooks", "exports", "permissions", "audit-log", "sessions", "rate-limiter", "feature-flags"
+]
+VERBS = ["fails", "times out", "returns stale data", "crashes", "is slow", "double-charges", "drops events",
+         "ignores settings", "leaks memory", "rejects valid input"]
+CONTEXTS = ["on mobile", "for new users", "after login", "under load", "in Safari", "when the cache is cold",
+            "for enterprise tenants", "after a deploy", "during checkout", "for large projects"]
+ISSUE_TYPES = ["Bug", "Task", "Story", "Epic"]
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _sentence(rng: random.Random) -> str:
+    return f"The {rng.choice(COMPONENTS)} service {rng.choice(VERBS)} {rng.choice(CONTEXTS)}."
+
+
+def make_adf(rng: random.Random, depth: int = 3, breadth: int = 3) -> dict:
+    """Builds an ADF document whose lists nest `depth` levels deep."""
+    def text_node() -> dict:
+        node = {"type": "text", "text": _sentence(rng)}
+        if rng.random() < 0.3:
+            node["marks"] = [{"type": rng.choice(["strong", "em", "code"])}]
+        return node
+
+    def paragraph() -> dict:
+        return {"type": "paragraph", "content": [text_node() for _ in range(rng.randint(1, breadth))]}
+
+    def bullet_list(level: int) -> dict:
+        items = []
+        for _ in range(rng.randint(1, breadth)):
+            content = [paragraph()]
+            if level < depth:
+                content.append(bullet_list(level + 1))
+            items.append({"type": "listItem", "content": content})
+        return {"type": "bulletList", "content": items}
+
+    content = [paragraph(), bullet_list(1), paragraph()]
+    return {"type": "doc", "version": 1, "content": content}
+
+
+def make_issue(index: int, project: str = "SYN", seed: int = 0, depth: int = 3) -> dict:
+    rng = random.Random(f"{seed}:{project}:{index}")
+    updated = BASE_TIME + timedelta(minutes=index)
+    return {
+        "id": str(10000 + index),
+        "key": f"{project}-{index + 1}",
+        "fields": {
+            "summary": _sentence(rng),
+            "description": make_adf(rng, depth=depth) if rng.random() < 0.9 else None,
+            "issuetype": {"name": rng.choice(ISSUE_TYPES)},
+            "updated": updated.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+        },
+    }
+
+
+def make_project(num_issues: int, project: str = "SYN", seed: int = 0, depth: int = 3) -> list[dict]:
+    return [make_issue(i, project=project, seed=seed, depth=depth) for i in range(num_issues)]
@@ -0,0 +1,46 @@
+import json
+from typing import Union
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+def loads(data: Union[bytes, str]):
+    """Parses a JSON response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def adf_to_text(document: dict) -> str:
+    """
+    Flattens an Atlassian Document Format tree to plain text, one space between text nodes in document order.
+
+    Walks the tree with an explicit stack of child iterators, so arbitrarily deep documents don't hit the recursion
+    limit, and joins the pieces once at the end instead of concatenating strings as it goes.
+    """
+    pieces = []
+    stack = [iter(document.get("content") or ())]
+    while stack:
+        # Resume the innermost list; descending into a node's children suspends it until they are done
+        for node in stack[-1]:
+            if node.get("type") == "text":
+                pieces.append(node.get("text", ""))
+            children = node.get("content")
+            if children:
+                stack.append(iter(children))
+                break
+        else:
+            stack.pop()
+    return " ".join(pieces).strip()
+
+
+def text_to_adf(text: str) -> dict:
+    """Wraps plain text in a one-paragraph Atlassian Document Format document, as Jira Cloud expects comment bodies."""
+    return {
+        "type": "doc",
+        "version": 1,
+        "content": [{"type": "paragraph", "content": [{"type": "text", "text": text}]}],
+    }
@@ -1,33 +1,221 @@
+import asyncio
+import os
+from typing import Optional
+
 import numpy as np
-from fastapi import FastAPI
-from sentence_transformers import SentenceTransformer
+from fastapi import FastAPI, HTTPException
 import structlog
 from .data_models.jira import JiraIssues
 from .data_models.calculation import CalculationRequestModel, CalculationResponseModel
+from .embedding_cache import EMBEDDING_CACHE_DIR, EmbeddingCache
+from .embedding_file import SharedEmbeddingFile
+from .encoders import ENCODER_BACKEND, LazyEncoder, encoder_id
+from .inference import InferenceScheduler
+from .issue_index import IssueIndex, IssueSearchResult
+from .issue_store import IssueStore
+from .issue_table import IssueTable
+from .metrics import Collected, observe_batch_size, registry, stage
+from .result_cache import RESULT_CACHE_MAX_ENTRIES, SUMMARY_EMBEDDING_CACHE_MAX_ENTRIES, LRUCache, cache_key
+from .sync import JiraSyncer
+from .tenants import DEFAULT_TENANT, Tenant, TenantRegistry, tenant_slug
+from .vector_index import VectorIndex
 
 
 logger = structlog.getLogger(__name__)
 blast_radius_calculation_sub_app = FastAPI()
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Backends produce slightly different vectors, so caches are keyed by the backend as well as the model
+MODEL_ID = encoder_id(MODEL_NAME, ENCODER_BACKEND)
+# Loaded in the background once the app starts (see `start_issue_sync`), so importing this module stays fast
+model = LazyEncoder(MODEL_NAME, ENCODER_BACKEND)
+# Request-path encoding runs in a thread pool, micro-batched across concurrent requests
+inference = InferenceScheduler(model.encode)
+SIMILARITY_THRESHOLD = 0.4
+VECTOR_INDEX_COMPRESSION = os.getenv("VECTOR_INDEX_COMPRESSION") or None
+# With several worker processes, one of them encodes and publishes embeddings that the others memory-map.
+# A compressed index rescores against those mapped full-precision vectors, so it always uses the shared file.
+SHARED_EMBEDDINGS_DIR = os.getenv("SHARED_EMBEDDINGS_DIR") or (
+    os.path.join(EMBEDDING_CACHE_DIR, "shared") if VECTOR_INDEX_COMPRESSION else None
+)
+ISSUE_STORE_DIR = os.getenv("ISSUE_STORE_DIR")
+ISSUE_LOAD_TIMEOUT_SECONDS = float(os.getenv("ISSUE_LOAD_TIMEOUT_SECONDS", "60"))
+# Tenants started with the service rather than on their first request
+PRELOAD_TENANTS = [t for t in os.getenv("PRELOAD_TENANTS", DEFAULT_TENANT).split(",") if t]
 
+# The same summary often arrives more than once (re-runs, retried webhooks, several PR events for one push).
+# Responses are keyed by the index version, so any change to a tenant's issues makes its cached responses unreachable.
+result_cache: LRUCache[CalculationResponseModel] = LRUCache(
+    RESULT_CACHE_MAX_ENTRIES, sizeof=lambda response: len(response.model_dump_json())
+)
+summary_embedding_cache: LRUCache[np.ndarray] = LRUCache(
+    SUMMARY_EMBEDDING_CACHE_MAX_ENTRIES, sizeof=lambda embedding: embedding.nbytes
+)
 
-@blast_radius_calculation_sub_app.post("/calculation")
-async def calculate_blast_radius(
-    request: CalculationRequestModel,  # Receive the body as the CalculationRequestModel
-):
-    # Your logic with the summary and Jira URL
-    issues = JiraIssues().get_all()
 
-    issues_strs = [i.textual_representation for i in issues]
+def tenant_path(base_dir: str, tenant_id: str) -> str:
+    # The default tenant keeps the paths used before there were tenants, so existing caches stay valid
+    if tenant_id == DEFAULT_TENANT:
+        return base_dir
+    return os.path.join(base_dir, "tenants", tenant_slug(tenant_id))
+
+
+def build_index(tenant_id: str, issues: IssueTable) -> IssueIndex:
+    shared_file = SharedEmbeddingFile(
+        tenant_path(SHARED_EMBEDDINGS_DIR, tenant_id),
+        MODEL_ID,
+        dtype=os.getenv("SHARED_EMBEDDINGS_DTYPE", "float16")
+    ) if SHARED_EMBEDDINGS_DIR else None
+
+    return IssueIndex(
+        encode=model.encode,
+        embedding_cache=EmbeddingCache(MODEL_ID, tenant_path(EMBEDDING_CACHE_DIR, tenant_id)),
+        vector_index=VectorIndex(
+            n_probe=int(os.getenv("VECTOR_INDEX_N_PROBE", "8")),
+            min_train_size=int(os.getenv("VECTOR_INDEX_MIN_TRAIN_SIZE", "2048")),
+            exact=os.getenv("VECTOR_INDEX_EXACT", "false").lower() == "true",
+            compression=VECTOR_INDEX_COMPRESSION,
+            rescore_factor=int(os.getenv("VECTOR_INDEX_RESCORE_FACTOR", "4"))
+        ),
+        shared_file=shared_file,
+        poll_seconds=float(os.getenv("SHARED_EMBEDDINGS_POLL_SECONDS", "1")),
+        issues=issues,
+        retrieval=os.getenv("RETRIEVAL_MODE", "dense"),
+        lexical_top_n=int(os.getenv("LEXICAL_TOP_N", "200")),
+        key_shortcircuit=os.getenv("KEY_MENTION_SHORTCIRCUIT", "true").lower() == "true"
+    )
+
+
+async def build_tenant(tenant_id: str) -> Tenant:
+    jira = await JiraIssues.for_user(None if tenant_id == DEFAULT_TENANT else tenant_id)
+
+    if tenant_id == DEFAULT_TENANT:
+        snapshot_path = os.getenv("ISSUE_STORE_PATH")
+    else:
+        snapshot_path = os.path.join(ISSUE_STORE_DIR, f"{tenant_slug(tenant_id)}.json") if ISSUE_STORE_DIR else None
+
+    # Loading a snapshot, mapping shared embeddings and training the IVF layer all block, so keep them off the loop
+    store = await asyncio.to_thread(IssueStore, snapshot_path=snapshot_path)
+    index = await asyncio.to_thread(build_index, tenant_id, store.table)
+    syncer = JiraSyncer(store=store, fetch_issues=jira.get_all, fetch_keys=jira.get_keys)
+    return Tenant(tenant_id, store, index, syncer, jira_url=jira.JIRA_URL, webhook_secret=jira.JIRA_WEBHOOK_SECRET,
+                  jira=jira)
+
+
+tenants = TenantRegistry(build_tenant)
+
+registry.register(Collected(
+    "blast_radius_corpus_issues", "Issues indexed by each resident tenant.", "gauge", ("tenant",),
+    lambda: [((tenant_id,), len(tenant.index)) for tenant_id, tenant in tenants.resident().items()]
+))
+registry.register(Collected(
+    "blast_radius_tenant_bytes", "Memory held by each resident tenant's issues, embeddings and indexes.", "gauge",
+    ("tenant",), lambda: [((tenant_id,), tenant.nbytes) for tenant_id, tenant in tenants.resident().items()]
+))
+registry.register(Collected(
+    "blast_radius_cache_lookups_total", "Result and summary embedding cache lookups.", "counter", ("cache", "result"),
+    lambda: [
+        ((name, outcome), count)
+        for name, cache in (("result", result_cache), ("summary_embedding", summary_embedding_cache))
+        for outcome, count in (("hit", cache.hits), ("miss", cache.misses))
+    ]
+))
+registry.register(Collected(
+    "blast_radius_inference_queue_depth", "Encoder requests waiting for a micro-batch.", "gauge", (),
+    lambda: [((), inference.stats()["queue_depth"])]
+))
+
+
+_startup_tasks: list[asyncio.Task] = []
+
+
+async def start_issue_sync():
+    """
+    Starts the inference workers, and loads the encoder and the tenants kept warm from startup in the background.
+
+    The app serves requests (and `/health`) straight away; `/ready` reports when the background work is done.
+    """
+    inference.start()
+    _startup_tasks.append(asyncio.create_task(_load_encoder()))
+    for tenant_id in PRELOAD_TENANTS:
+        _startup_tasks.append(asyncio.create_task(_preload_tenant(tenant_id)))
+
+
+async def stop_issue_sync():
+    for task in _startup_tasks:
+        task.cancel()
+    await asyncio.gather(*_startup_tasks, return_exceptions=True)
+    _startup_tasks.clear()
+    await tenants.stop()
+    await inference.stop()
+
+
+async def _load_encoder():
+    try:
+        await asyncio.to_thread(model.load)
+    except Exception:
+        # The encoder is not retried, so `/ready` keeps reporting this error until the process restarts
+        logger.exception("Encoder failed to load", model=MODEL_NAME, backend=model.backend)
+
 
-    summary_embedding = model.encode([request.summary])
-    issues_embeddings = model.encode(issues_strs)
+async def _preload_tenant(tenant_id: str):
+    try:
+        await tenants.get(tenant_id)
+    except Exception as e:
+        logger.error("Could not preload tenant", tenant=tenant_id, error=str(e))
 
-    similarities = model.similarity_pairwise(summary_embedding, issues_embeddings).numpy()
 
-    threshold = 0.4
-    indices = np.where(similarities >= threshold)[0]
-    relevant_issues = [issues[i] for i in indices][:request.max_items]
+def readiness() -> dict:
+    """
+    Whether the encoder is loaded and every preloaded tenant has finished its first Jira load.
+
+    `error` says why the service will never become ready, e.g. because the encoder failed to load.
+    """
+    preloaded = {}
+    for tenant_id in PRELOAD_TENANTS:
+        tenant = tenants.peek(tenant_id)
+        preloaded[tenant_id] = tenant is not None and tenant.loaded_at is not None
+    encoder = model.status()
+    return {
+        "ready": model.ready and all(preloaded.values()),
+        "error": f"Encoder failed to load: {encoder['error']}" if encoder["error"] else None,
+        "encoder": encoder,
+        "tenants": preloaded,
+    }
+
+
+async def get_tenant(user_id: Optional[str]) -> Tenant:
+    # Issues are kept warm by the background sync, so Jira is only on the hot path before a tenant's first load
+    tenant_id = user_id or DEFAULT_TENANT
+    try:
+        with stage("tenant"):
+            return await tenants.get(tenant_id, timeout=ISSUE_LOAD_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Jira issues have not been loaded yet")
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def result_key(request: CalculationRequestModel, index: IssueIndex) -> str:
+    return cache_key(request.summary, request.max_items, SIMILARITY_THRESHOLD, MODEL_ID, index.version)
+
+
+async def encode_summaries(summaries: list[str]) -> np.ndarray:
+    """Embeds summaries, encoding only those not in the summary embedding cache."""
+    keys = [cache_key(MODEL_ID, summary) for summary in summaries]
+    embeddings = [summary_embedding_cache.get(key) for key in keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        with stage("encode"):
+            encoded = await inference.encode([summaries[i] for i in missing])
+        for i, embedding in zip(missing, encoded):
+            # A copy, so the cache doesn't keep the rest of the encoder batch alive
+            embeddings[i] = embedding.copy()
+            summary_embedding_cache.put(keys[i], embeddings[i])
+    return np.stack(embeddings)
+
+
+def build_response(request: CalculationRequestModel, result: IssueSearchResult) -> CalculationResponseModel:
+    relevant_issues = [r.issue for r in result.above_threshold][:request.max_items]
 
     # Below is logic for handling when there are 0 "relevant" issues.
     # So instead of pushing directly to Jira, maybe these will be sent to the PR conversation?
@@ -39,8 +227,7 @@ async def calculate_blast_radius(
             logger.info(f'   - {r.key}, {r.summary}, {r.URL}')
 
     else:
-        top_indices = np.argsort(similarities)[::-1][:request.max_items]  # in descending order
-        most_similar_issues = [issues[i] for i in top_indices]
+        most_similar_issues = [r.issue for r in result.top_k]  # in descending order
 
         logger.info(f'No relevant issues found. Returning the top {request.max_items} most similar issues:')
         for issue in most_similar_issues:
@@ -48,3 +235,86 @@ async def calculate_blast_radius(
             CalculationResponseModel(relevant_issues=most_similar_issues)
 
     return CalculationResponseModel(relevant_issues=relevant_issues)
+
+
+@blast_radius_calculation_sub_app.post("/calculation")
+async def calculate_blast_radius(
+    request: CalculationRequestModel,  # Receive the body as the CalculationRequestModel
+):
+    tenant = await get_tenant(request.user_id)
+    with stage("result_cache"):
+        key = result_key(request, tenant.index)
+        cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    summary_embedding = (await encode_summaries([request.summary]))[0]
+    # Top-k and threshold hits come back from one index query, both ordered by similarity
+    with stage("score"):
+        result = await asyncio.to_thread(
+            tenant.index.search,
+            summary_embedding,
+            k=request.max_items,
+            threshold=SIMILARITY_THRESHOLD,
+            max_threshold_hits=request.max_items,
+            text=request.summary
+        )
+
+    with stage("response"):
+        response = build_response(request, result)
+    result_cache.put(key, response)
+    return response
+
+
+@blast_radius_calculation_sub_app.post("/calculation/batch")
+async def calculate_blast_radius_batch(
+    requests: list[CalculationRequestModel],
+) -> list[CalculationResponseModel]:
+    """Scores many summaries at once: one encode call and one matrix product per tenant against its issue embeddings."""
+    if not requests:
+        return []
+    observe_batch_size("request", len(requests))
+
+    positions_by_user: dict[Optional[str], list[int]] = {}
+    for i, request in enumerate(requests):
+        positions_by_user.setdefault(request.user_id, []).append(i)
+    user_tenants = {user_id: await get_tenant(user_id) for user_id in positions_by_user}
+
+    with stage("result_cache"):
+        keys = [result_key(request, user_tenants[request.user_id].index) for request in requests]
+        responses: list[Optional[CalculationResponseModel]] = [result_cache.get(key) for key in keys]
+    missing = [i for i, response in enumerate(responses) if response is None]
+    if not missing:
+        return responses
+
+    summary_embeddings = await encode_summaries([requests[i].summary for i in missing])
+    row_of = {i: row for row, i in enumerate(missing)}
+    for user_id, positions in positions_by_user.items():
+        positions = [i for i in positions if i in row_of]
+        if not positions:
+            continue
+        with stage("score"):
+            tenant_results = await asyncio.to_thread(
+                user_tenants[user_id].index.search_batch,
+                summary_embeddings[[row_of[i] for i in positions]],
+                ks=[requests[i].max_items for i in positions],
+                threshold=SIMILARITY_THRESHOLD,
+                max_threshold_hits=[requests[i].max_items for i in positions],
+                texts=[requests[i].summary for i in positions]
+            )
+        with stage("response"):
+            for i, result in zip(positions, tenant_results):
+                responses[i] = build_response(requests[i], result)
+                result_cache.put(keys[i], responses[i])
+
+    return responses
+
+
+@blast_radius_calculation_sub_app.get("/stats")
+async def get_stats():
+    return {
+        "inference": inference.stats(),
+        "result_cache": result_cache.stats(),
+        "summary_embedding_cache": summary_embedding_cache.stats(),
+        "tenants": tenants.stats(),
+    }
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+import httpx
+import structlog
+
+from .adf import text_to_adf
+from .jira_client import JiraClient
+
+logger = structlog.getLogger(__name__)
+
+JIRA_COMMENT_CONCURRENCY = int(os.getenv("JIRA_COMMENT_CONCURRENCY", "4"))
+# Posted comments remembered per Jira site for deduplication, least recently seen forgotten first
+JIRA_COMMENT_DEDUPE_SIZE = int(os.getenv("JIRA_COMMENT_DEDUPE_SIZE", "10000"))
+
+
+class CommentResult(NamedTuple):
+    issue_key: str
+    posted: bool
+    comment_id: Optional[str] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    # The same text was already posted to, or being posted to, this issue; the other fields describe that post
+    duplicate: bool = False
+
+
+class CommentPublisher:
+    """
+    Posts comments to Jira concurrently through a pooled `JiraClient`.
+
+    `submit` queues a comment and returns at once; at most `max_concurrency` comments are in flight, and rate-limited
+    (429) responses are retried by the client, honouring `Retry-After`. A comment whose text was already posted to
+    the same issue, or is still being posted to it, is not posted again; it resolves to the earlier post's result.
+    Failed posts are forgotten, so submitting the comment again retries it.
+    """
+
+    _shared: dict[JiraClient, "CommentPublisher"] = {}
+
+    def __init__(
+            self,
+            client: JiraClient,
+            max_concurrency: int = JIRA_COMMENT_CONCURRENCY,
+            dedupe_size: int = JIRA_COMMENT_DEDUPE_SIZE
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.dedupe_size = dedupe_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._in_flight: dict[tuple[str, str], asyncio.Task] = {}
+        self._posted: OrderedDict[tuple[str, str], CommentResult] = OrderedDict()
+
+        self.submitted = 0
+        self.duplicates = 0
+        self.posted = 0
+        self.failed = 0
+
+    @classmethod
+    def shared(cls, client: JiraClient) -> "CommentPublisher":
+        """Returns the process-wide publisher for a shared client, so deduplication spans requests."""
+        if client not in cls._shared:
+            cls._shared[client] = cls(client)
+        return cls._shared[client]
+
+    @classmethod
+    async def discard(cls, client: JiraClient):
+        """Drops the publisher of a shared client once the comments it is posting are done."""
+        publisher = cls._shared.pop(client, None)
+        if publisher is not None and publisher._in_flight:
+            await asyncio.gather(*publisher._in_flight.values(), return_exceptions=True)
+
+    def submit(self, issue_key: str, text: str) -> asyncio.Future:
+        """Queues a comment and returns a future resolving to its `CommentResult`; it never raises."""
+        self.submitted += 1
+        dedupe_key = (issue_key, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+        posted = self._posted.get(dedupe_key)
+        if posted is not None:
+            self.duplicates += 1
+            self._posted.move_to_end(dedupe_key)
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(posted._replace(duplicate=True))
+            return future
+
+        task = self._in_flight.get(dedupe_key)
+        if task is not None:
+            self.duplicates += 1
+            return asyncio.ensure_future(self._duplicate_of(task))
+
+        task = asyncio.create_task(self._post(dedupe_key, issue_key, text))
+        self._in_flight[dedupe_key] = task
+        return task
+
+    async def publish(self, comments: Iterable[tuple[str, str]]) -> list[CommentResult]:
+        """Posts `(issue_key, text)` comments and returns one result per comment, in order."""
+        return list(await asyncio.gather(*[self.submit(issue_key, text) for issue_key, text in comments]))
+
+    async def flush(self):
+        """Waits for every queued comment to be posted or to fail."""
+        while self._in_flight:
+            await asyncio.gather(*list(self._in_flight.values()))
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "posted": self.posted,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+        }
+
+    async def _post(self, dedupe_key: tuple[str, str], issue_key: str, text: str) -> CommentResult:
+        try:
+            async with self._semaphore:
+                comment = await self.client.add_comment(issue_key, text_to_adf(text))
+        except httpx.HTTPStatusError as e:
+            result = CommentResult(issue_key, posted=False, status_code=e.response.status_code,
+                                   error=e.response.text[:500])
+        except Exception as e:
+            result = CommentResult(issue_key, posted=False, error=str(e) or type(e).__name__)
+        else:
+            result = CommentResult(issue_key, posted=True, comment_id=comment.get("id"), status_code=201)
+        finally:
+            self._in_flight.pop(dedupe_key, None)
+
+        if result.posted:
+            self.posted += 1
+            self._posted[dedupe_key] = result
+            while len(self._posted) > self.dedupe_size:
+                self._posted.popitem(last=False)
+            logger.info("Comment added successfully", issue_key=issue_key, comment_id=result.comment_id)
+        else:
+            self.failed += 1
+            logger.warning("Failed to add comment", issue_key=issue_key, status_code=result.status_code,
+                           error=result.error)
+        return result
+
+    @staticmethod
+    async def _duplicate_of(task: asyncio.Task) -> CommentResult:
+        return (await asyncio.shield(task))._replace(duplicate=True)
@@ -15,6 +15,11 @@ class CalculationRequestModel(BaseModel):
         description="The maximum number of issues in the Blast Radius to return"
     )
 
+    user_id: Optional[str] = Field(
+        None,
+        description="The user whose Jira site (from their settings) is searched; the default site when omitted"
+    )
+
 
 class CalculationResponseModel(BaseModel):
 
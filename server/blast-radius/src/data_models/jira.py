@@ -1,11 +1,14 @@
 import os
 import asyncio
-import requests
-from requests.auth import HTTPBasicAuth
+from typing import Iterable, Optional
 from pydantic import BaseModel, model_validator
 import structlog
 
+from src.adf import adf_to_text
+from src.comment_publisher import CommentPublisher, CommentResult
 from src.database import DatabaseService
+from src.jira_client import JiraClient
+from src.metrics import stage
 
 logger = structlog.getLogger(__name__)
 
@@ -21,126 +24,128 @@ class JiraIssues:
         @model_validator(mode='before')
         @classmethod
         def process_description(cls, data):
-            def traverse_content(content):
-                raw_text = ""
-                for item in content:
-                    if item['type'] == 'text':
-                        raw_text += item['text'] + ' '
-                    if 'content' in item:
-                        raw_text += traverse_content(item['content'])
-                return raw_text
-
             raw_description = data['description']
             if isinstance(raw_description, dict):
                 # Convert rich-text description to plain text
-                data['description'] = traverse_content(raw_description['content']).strip()
+                data['description'] = adf_to_text(raw_description)
 
             elif raw_description is None:
                 data['description'] = ''
 
             return data
 
+        @classmethod
+        def from_api(cls, issue: dict, jira_url: str) -> "JiraIssues.JiraIssue":
+            """Builds an issue from the JSON object the Jira REST API (search, webhooks) returns."""
+            return cls(
+                issue_id=issue["id"],
+                key=issue["key"],
+                summary=issue["fields"]["summary"],
+                description=issue["fields"].get("description", ""),
+                issue_type=issue["fields"]["issuetype"]["name"],
+                URL=f"{jira_url}/browse/{issue['key']}"  # Construct Jira link
+            )
+
         @property
         def textual_representation(self):
             return f'KEY: {self.key} \n SUMMARY: {self.summary} \n DESCRIPTION: {self.description}'
 
-    def __init__(self):
-        try:
-            self.dbs = DatabaseService()
-            creds = asyncio.run(self.dbs.get_jira_credentials())
-
-        except Exception as e:
-            logger.info("Error with Firebase connection", error=e)
-            creds = {
-                "exists": False,
-                "jira_domain": "",
-                "jira_api_token": "",
-                "jira_email": ""
-            }
-
-        if not creds['exists']:
+    def __init__(self, credentials: Optional[dict] = None):
+        if credentials is None:
+            try:
+                self.dbs = DatabaseService()
+                credentials = asyncio.run(self.dbs.get_jira_credentials())
+
+            except Exception as e:
+                logger.info("Error with Firebase connection", error=e)
+                credentials = self.environment_credentials()
+
+        if not credentials['exists']:
             self.JIRA_URL = os.getenv("JIRA_URL", "https://push-to-prod.atlassian.net")
             self.JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN", "")
             self.JIRA_EMAIL = os.getenv("JIRA_EMAIL", "")
+            self.JIRA_WEBHOOK_SECRET = os.getenv("JIRA_WEBHOOK_SECRET", "")
         else:
-            self.JIRA_URL = creds['jira_domain']
-            self.JIRA_API_TOKEN = creds['jira_api_token']
-            self.JIRA_EMAIL = creds['jira_email']
+            self.JIRA_URL = credentials['jira_domain']
+            self.JIRA_API_TOKEN = credentials['jira_api_token']
+            self.JIRA_EMAIL = credentials['jira_email']
+            self.JIRA_WEBHOOK_SECRET = credentials.get('jira_webhook_secret', '')
 
         self.issues = []
-
-    def get_all(self):
-        url = f"{self.JIRA_URL}/rest/api/3/search"
-        headers = {
-            "Authorization": f"Bearer {self.JIRA_API_TOKEN}",
-            "Content-Type": "application/json"
+        # Pooled and shared across requests, so repeated calls reuse open connections to Jira
+        self.client = JiraClient.shared(self.JIRA_URL, self.JIRA_EMAIL, self.JIRA_API_TOKEN)
+
+    @staticmethod
+    def environment_credentials() -> dict:
+        # `exists: False` makes the constructor fall back to the JIRA_* environment variables
+        return {
+            "exists": False,
+            "jira_domain": "",
+            "jira_api_token": "",
+            "jira_email": "",
+            "jira_webhook_secret": ""
         }
-        params = {"fields": "summary,description,issuetype"}
 
-        auth = HTTPBasicAuth(self.JIRA_EMAIL, self.JIRA_API_TOKEN)
+    @classmethod
+    async def for_user(cls, user_id: Optional[str] = None) -> "JiraIssues":
+        """
+        Connects to the Jira site in `user_id`'s Firestore settings, or the environment's site when `user_id` is None.
+
+        Raises `LookupError` if the user has no Jira credentials, rather than falling back to another site's issues.
+        """
+        if user_id is None:
+            return cls(cls.environment_credentials())
+
+        with stage("credentials"):
+            credentials = await DatabaseService().get_jira_credentials(user_id)
+        if not credentials['exists']:
+            raise LookupError(f"No Jira credentials are configured for user {user_id}")
+        return cls(credentials)
+
+    async def aclose(self):
+        """
+        Gives back the pooled client, e.g. when the tenant syncing this site is evicted.
+
+        The client is only closed, after its pending comments are posted, when no other tenant shares it.
+        """
+        client, self.client = self.client, None
+        if client is not None and JiraClient.release(client):
+            await CommentPublisher.discard(client)
+            await client.aclose()
+
+    async def get_all(self, jql: str = ""):
+        # Walks every page of the search, fetching pages concurrently where Jira's pagination allows it
+        with stage("jira_fetch"):
+            issues = await self.client.search(jql=jql, fields="summary,description,issuetype")
 
-        response = requests.get(url, headers=headers, params=params, auth=auth)
-        response.raise_for_status()
+        # Extract relevant fields
+        with stage("parse"):
+            return [self.JiraIssue.from_api(issue, self.JIRA_URL) for issue in issues]
 
-        issues = response.json().get("issues", [])
+    async def get_keys(self) -> set[str]:
+        # Lists every issue key without pulling descriptions, used to notice deleted issues
+        with stage("jira_fetch"):
+            issues = await self.client.search(fields="updated")
+        return {issue["key"] for issue in issues}
 
-        # Extract relevant fields
-        return [
-            self.JiraIssue(
-                issue_id=issue["id"],
-                key=issue["key"],
-                summary=issue["fields"]["summary"],
-                description=issue["fields"].get("description", ""),
-                issue_type=issue["fields"]["issuetype"]["name"],
-                URL=f"{self.JIRA_URL}/browse/{issue['key']}"  # Construct Jira link
-            )
-            for issue in issues
-        ]
-
-    def add_comment(self, comment_content: str, issue_key: str):
-        url = f"{self.JIRA_URL}/rest/api/3/issue/{issue_key}/comment"
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
-        auth = HTTPBasicAuth(self.JIRA_EMAIL, self.JIRA_API_TOKEN)
-        # Atlassian Document Format (ADF) body
-        # Use Atlassian Document Format (ADF) for Jira Cloud
-        payload = {
-            "body": {
-                "type": "doc",
-                "version": 1,
-                "content": [
-                    {
-                        "type": "paragraph",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": comment_content
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
+    async def add_comment(self, comment_content: str, issue_key: str) -> CommentResult:
+        return (await self.add_comments([(issue_key, comment_content)]))[0]
 
-        response = requests.post(url, headers=headers, auth=auth, json=payload)
+    async def add_comments(self, comments: Iterable[tuple[str, str]]) -> list[CommentResult]:
+        """
+        Posts `(issue_key, comment_content)` comments concurrently and returns one result per comment.
 
-        if response.status_code == 201:
-            logger.info(
-                "Comment added successfully",
-                comment=comment_content,
-                url=url
-            )
-        else:
-            logger.info("Failed to add comment", status_code=response.status_code,response_text=response.text)
+        Identical comments to the same issue are posted once, also across calls, and rate-limited requests are
+        retried; a failure is reported in its comment's result instead of raising.
+        """
+        return await CommentPublisher.shared(self.client).publish(comments)
 
 '''
 Test Code:
 # Initialize connection:
 dbs = JiraIssues()
 # Get issues:
-test_key = dbs.get_all()[0].key
+test_key = asyncio.run(dbs.get_all())[0].key
 # Add comment:
-dbs.add_comment(comment_content="test comment", issue_key=test_key)
+asyncio.run(dbs.add_comment(comment_content="test comment", issue_key=test_key))
 '''
@@ -1,18 +1,22 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-from firebase_admin import initialize_app
+import asyncio
+import concurrent.futures
 import os
 import logging
-from typing import Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Optional
 
-# Initialize logging
-logging.basicConfig(level=logging.DEBUG)
+if TYPE_CHECKING:
+    from firebase_admin import firestore
+
+# Logging is configured by the application entry point (src/main.py), not on import
 logger = logging.getLogger(__name__)
 
 
 # Configuration
 class Config:
-    FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID')
     FIREBASE_COLLECTIONS = {
         'organizations': 'organizations',
         'settings': 'settings',
@@ -20,6 +24,147 @@ class Config:
     }
 
 
+SETTINGS_CACHE_TTL_SECONDS = float(os.getenv('SETTINGS_CACHE_TTL_SECONDS', '300'))
+SETTINGS_CACHE_MAX_ENTRIES = int(os.getenv('SETTINGS_CACHE_MAX_ENTRIES', '1024'))
+# Firestore snapshot listeners push edits into the cache, so TTL expiry is only a fallback
+SETTINGS_CACHE_WATCH = os.getenv('SETTINGS_CACHE_WATCH', 'true').lower() == 'true'
+# Listeners are only kept for the most recently read documents; the rest rely on TTL expiry
+SETTINGS_CACHE_MAX_WATCHES = int(os.getenv('SETTINGS_CACHE_MAX_WATCHES', '128'))
+
+
+class SettingsCache:
+    """
+    Process-wide TTL cache of Firestore documents, shared by every DatabaseService.
+
+    A document is read once (in a worker thread, since the Firestore client blocks) and served from memory until it
+    expires, is evicted in LRU order or is invalidated. Concurrent misses for the same document share one read. With
+    `watch`, a snapshot listener is attached to each document read from Firestore and replaces the entry whenever it
+    changes. Each listener holds a stream open, so only the `max_watches` most recently used documents keep one; the
+    others are refreshed when their TTL expires.
+    """
+
+    def __init__(
+            self,
+            ttl_seconds: float = SETTINGS_CACHE_TTL_SECONDS,
+            max_entries: int = SETTINGS_CACHE_MAX_ENTRIES,
+            watch: bool = SETTINGS_CACHE_WATCH,
+            max_watches: int = SETTINGS_CACHE_MAX_WATCHES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.watch = watch
+        self.max_watches = max_watches
+
+        # Document path -> (expiry time, document data or None if it doesn't exist)
+        self._entries: OrderedDict[str, tuple[float, Optional[dict]]] = OrderedDict()
+        # Document path -> listener, least recently used first
+        self._watches: OrderedDict = OrderedDict()
+        self._in_flight: dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.reads = 0
+        self.invalidations = 0
+
+    async def get(self, doc_ref) -> Optional[dict]:
+        path = doc_ref.path
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(path)
+                if path in self._watches:
+                    self._watches.move_to_end(path)
+                return entry[1]
+
+            future = self._in_flight.get(path)
+            is_reader = future is None
+            if is_reader:
+                self.misses += 1
+                future = self._in_flight[path] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+
+        # A concurrent.futures.Future can be awaited from any event loop, unlike an asyncio one
+        if not is_reader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            data = await asyncio.to_thread(self._read, doc_ref)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(path, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(path, None)
+            self._store(path, data)
+        future.set_result(data)
+        return data
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drops one document (e.g. `settings/<user_id>`), or every document when `path` is None."""
+        with self._lock:
+            paths = list(self._entries) if path is None else [path]
+            for p in paths:
+                if self._entries.pop(p, None) is not None:
+                    self.invalidations += 1
+                self._unwatch(p)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'watched': len(self._watches),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'reads': self.reads,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _read(self, doc_ref) -> Optional[dict]:
+        snapshot = doc_ref.get()
+        with self._lock:
+            self.reads += 1
+            should_watch = self.watch and self.max_watches > 0 and doc_ref.path not in self._watches
+        if should_watch:
+            watch = doc_ref.on_snapshot(partial(self._on_snapshot, doc_ref.path))
+            with self._lock:
+                self._watches[doc_ref.path] = watch
+                while len(self._watches) > self.max_watches:
+                    self._unwatch(next(iter(self._watches)))
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def _on_snapshot(self, path: str, snapshots: list, changes, read_time):
+        # Called from Firestore's listener thread with the document's current state
+        data = snapshots[0].to_dict() if snapshots and snapshots[0].exists else None
+        with self._lock:
+            if path in self._watches:
+                self._store(path, data)
+        logger.debug(f"Settings document changed: {path}")
+
+    def _store(self, path: str, data: Optional[dict]):
+        self._entries[path] = (time.monotonic() + self.ttl_seconds, data)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._unwatch(evicted)
+
+    def _unwatch(self, path: str):
+        watch = self._watches.pop(path, None)
+        if watch is not None:
+            watch.unsubscribe()
+
+
+settings_cache = SettingsCache()
+
+
 # Feature Flags
 class FeatureFlags:
     def __init__(self, pr_summaries_enabled: bool, jira_ticket_enabled: bool):
@@ -35,11 +180,25 @@ class PromptTemplates:
 
 
 class DatabaseService:
-    def __init__(self):
-        # Ensure Firebase credentials and project are set up
-        if not Config.FIREBASE_PROJECT_ID:
+    def __init__(self, db=None, cache: Optional[SettingsCache] = None):
+        # Documents are cached process-wide, so creating a DatabaseService per request stays cheap
+        self.settings_cache = cache or settings_cache
+
+        if db is not None:
+            # An already configured client, e.g. an in-memory stand-in
+            self.db = db
+            return
+
+        # Ensure Firebase credentials and project are set up. Checked here rather than on import, so the service can
+        # start (and report why it isn't ready) without Firebase configured.
+        project_id = os.getenv('FIREBASE_PROJECT_ID')
+        if not project_id:
             raise ValueError('FIREBASE_PROJECT_ID environment variable is required')
 
+        # The Firebase Admin SDK pulls in gRPC and the Google Cloud clients, so it is only imported when first needed
+        import firebase_admin
+        from firebase_admin import credentials, firestore, initialize_app
+
         # Initialize Firebase Admin SDK
         try:
             # Initialize Firebase Admin SDK if it's not already initialized
@@ -48,50 +207,63 @@ class DatabaseService:
             # If no app has been initialized, initialize a new one
             cred = credentials.ApplicationDefault()  # Or use a service account key if needed
             initialize_app(cred, {
-                'projectId': Config.FIREBASE_PROJECT_ID,
+                'projectId': project_id,
             })
-            logger.info(f"Firebase initialized with project ID: {Config.FIREBASE_PROJECT_ID}")
+            logger.info(f"Firebase initialized with project ID: {project_id}")
 
         # Firestore instance
         self.db = firestore.client()
 
-    def get_firestore_instance(self) -> firestore.Client:
+    def get_firestore_instance(self) -> "firestore.Client":
         return self.db
 
+    async def get_user_settings(self, user_id: Optional[str]) -> Optional[Dict]:
+        """The user's settings document, or None if it doesn't exist. Flags, prompts and credentials all derive from it."""
+        if not user_id:
+            return None
+        doc_ref = self.db.collection(Config.FIREBASE_COLLECTIONS['settings']).document(user_id)
+        return await self.settings_cache.get(doc_ref)
+
+    def invalidate_settings(self, user_id: Optional[str] = None):
+        """Forgets a user's cached settings (and the default feature flags when `user_id` is None)."""
+        if user_id is None:
+            self.settings_cache.invalidate()
+        else:
+            self.settings_cache.invalidate(f"{Config.FIREBASE_COLLECTIONS['settings']}/{user_id}")
+
     async def get_jira_credentials(self, user_id: str=None) -> Dict:
 
-        doc_ref = self.db.collection(Config.FIREBASE_COLLECTIONS['settings']).document(user_id)
-        settings_doc = doc_ref.get()
+        data = await self.get_user_settings(user_id)
 
-        if not settings_doc.exists:
+        if data is None:
             logger.debug(f"No Jira credentials found for user: {user_id}")
             return {
                 'exists': False,
                 'jira_email': '',
                 'jira_domain': '',
-                'jira_api_token': ''
+                'jira_api_token': '',
+                'jira_webhook_secret': ''
             }
 
-        data = settings_doc.to_dict()
         logger.debug(f"Retrieved Jira credentials for user: {user_id}")
 
         return {
             'exists': True,
             'jira_email': data.get('jiraEmail', ''),
             'jira_domain': data.get('jiraDomain', ''),
-            'jira_api_token': data.get('jiraApiToken', '')
+            'jira_api_token': data.get('jiraApiToken', ''),
+            'jira_webhook_secret': data.get('jiraWebhookSecret', '')
         }
 
     async def get_default_feature_flags(self) -> FeatureFlags:
         try:
             doc_ref = self.db.collection('config').document('default_feature_flags')
-            doc = doc_ref.get()
+            data = await self.settings_cache.get(doc_ref)
 
-            if not doc.exists:
+            if data is None:
                 logger.debug("No default feature flags found in Firestore, using hardcoded defaults")
                 return FeatureFlags(True, False)
 
-            data = doc.to_dict()
             return FeatureFlags(
                 pr_summaries_enabled=data.get('prSummariesEnabled', True),
                 jira_ticket_enabled=data.get('jiraTicketEnabled', False)
@@ -102,14 +274,12 @@ class DatabaseService:
 
     async def get_feature_flags(self, user_id: str) -> FeatureFlags:
         try:
-            doc_ref = self.db.collection(Config.FIREBASE_COLLECTIONS['settings']).document(user_id)
-            user_settings_doc = doc_ref.get()
+            data = await self.get_user_settings(user_id)
 
-            if not user_settings_doc.exists:
+            if data is None:
                 logger.debug(f"No feature flags found for user: {user_id}, using defaults")
                 return await self.get_default_feature_flags()
 
-            data = user_settings_doc.to_dict()
             logger.debug(f"Retrieved feature flags for user: {user_id}")
 
             default_flags = await self.get_default_feature_flags()
@@ -124,14 +294,12 @@ class DatabaseService:
 
     async def get_prompt_templates(self, user_id: str) -> PromptTemplates:
         try:
-            doc_ref = self.db.collection(Config.FIREBASE_COLLECTIONS['settings']).document(user_id)
-            user_settings_doc = doc_ref.get()
+            data = await self.get_user_settings(user_id)
 
-            if not user_settings_doc.exists:
+            if data is None:
                 logger.debug(f"No custom prompts found for user: {user_id}, using defaults")
                 return PromptTemplates()  # Return default empty templates
 
-            data = user_settings_doc.to_dict()
             templates = PromptTemplates(
                 system_instructions=data.get('systemInstructions'),
                 pr_analysis_prompt=data.get('prAnalysisPrompt')
@@ -142,11 +310,3 @@ class DatabaseService:
         except Exception as e:
             logger.error(f"Failed to retrieve custom prompts for user: {user_id}, {e}")
             return PromptTemplates()
-
-
-# Validate required environment variables
-required_env_vars = ['FIREBASE_PROJECT_ID']
-
-for env_var in required_env_vars:
-    if not os.getenv(env_var):
-        raise ValueError(f"{env_var} environment variable is required")
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Callable, Sequence
+
+import numpy as np
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "blast-radius", "embeddings")
+)
+EMBEDDING_CACHE_SAVE_SECONDS = float(os.getenv("EMBEDDING_CACHE_SAVE_SECONDS", "60"))
+
+
+class EmbeddingCache:
+    """
+    Disk-backed store of Jira issue embeddings for a single model.
+
+    Each vector is keyed by the issue key and remembers a hash of the text (and model name) it was
+    encoded from, so an issue is only sent through the encoder again when it is new or has been edited.
+
+    Writing the file rewrites every entry, so changes are saved at most once per `save_interval_seconds`; `save`
+    writes any that are still pending, e.g. when the index holding the cache is closed.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR,
+                 save_interval_seconds: float = EMBEDDING_CACHE_SAVE_SECONDS):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)}.npz")
+        self.save_interval_seconds = save_interval_seconds
+
+        self._entries: dict[str, tuple[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        # Serializes writes, so an older copy of the entries never replaces a newer one
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        # The first change is saved straight away, as that is usually a tenant's whole initial encode
+        self._last_save = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        # Loaded on first use, so processes that never encode (shared-embedding readers) don't hold a copy
+        self._loaded = False
+
+    def content_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_embeddings(self, issues: Sequence, encode: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns one embedding row per issue, in the same order as `issues`.
+
+        `encode` is only called with the textual representations of issues that are missing from the cache or
+        whose content hash changed since they were last encoded.
+        """
+        self._ensure_loaded()
+        digests = [self.content_hash(issue.textual_representation) for issue in issues]
+
+        with self._lock:
+            stale = [
+                i for i, (issue, digest) in enumerate(zip(issues, digests))
+                if self._entries.get(issue.key, (None,))[0] != digest
+            ]
+            self.hits += len(issues) - len(stale)
+            self.misses += len(stale)
+
+        if stale:
+            fresh = np.asarray(encode([issues[i].textual_representation for i in stale]), dtype=np.float32)
+            with self._lock:
+                for row, i in enumerate(stale):
+                    self._entries[issues[i].key] = (digests[i], fresh[row])
+                self._dirty = True
+            if time.monotonic() - self._last_save >= self.save_interval_seconds:
+                self.save()
+
+        logger.info("Embedding cache lookup", num_issues=len(issues), encoded=len(stale))
+
+        with self._lock:
+            if not issues:
+                return np.empty((0, 0), dtype=np.float32)
+            return np.stack([self._entries[issue.key][1] for issue in issues])
+
+    def discard(self, keys: Sequence[str]):
+        self._ensure_loaded()
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._dirty = True
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(vector.nbytes for _, vector in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def save(self):
+        """Writes the entries to disk if they changed since the last save; blocks on disk I/O."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                keys = list(self._entries)
+                digests = [self._entries[k][0] for k in keys]
+                vectors = np.stack([self._entries[k][1] for k in keys]) if keys else np.empty((0, 0), np.float32)
+                self._dirty = False
+                self._last_save = time.monotonic()
+
+            tmp_path = None
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                # Write to a temporary file first so a crash never leaves a truncated cache behind
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path),
+                                                prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, keys=np.array(keys, dtype=str), digests=np.array(digests, dtype=str), vectors=vectors)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                logger.warning("Could not persist embedding cache", path=self.path, error=str(e))
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self._entries = {
+                    str(key): (str(digest), vector)
+                    for key, digest, vector in zip(data["keys"], data["digests"], data["vectors"])
+                }
+            logger.info("Loaded embedding cache", path=self.path, entries=len(self._entries))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable embedding cache", path=self.path, error=str(e))
+            self._entries = {}
@@ -0,0 +1,145 @@
+import fcntl
+import glob
+import json
+import os
+import re
+import struct
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+MAGIC = b"BRMBEDv1"
+HEADER_ALIGNMENT = 64
+KEEP_VERSIONS = 3
+
+
+class EmbeddingSnapshot(NamedTuple):
+    version: int
+    model: str
+    keys: list[str]
+    digests: list[str]
+    vectors: np.ndarray  # read-only np.memmap of shape (rows, dim)
+
+
+class SharedEmbeddingFile:
+    """
+    Versioned on-disk embedding matrix that every worker process on a host maps read-only with `np.memmap`.
+
+    Each version is one file: an 8-byte magic, a little-endian uint32 header length, a JSON header (model name,
+    dtype, dimension, row count and the row-to-issue-key and content hash mapping), padding to a 64-byte boundary,
+    then the row-major matrix. A single writer, elected with an exclusive `flock`, writes a new version to a temporary
+    file, renames it into place and then atomically replaces the `<model>.current` pointer file. Readers compare the
+    pointer with the version they have mapped and remap when it moves, so nobody needs restarting.
+    """
+
+    def __init__(self, directory: str, model_name: str, dtype: str = "float16"):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported embedding file dtype: {dtype}")
+
+        self.directory = directory
+        self.model_name = model_name
+        self.dtype = dtype
+        self._name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.pointer_path = os.path.join(directory, f"{self._name}.current")
+        self._lock_file = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_file is not None
+
+    def try_become_writer(self) -> bool:
+        """Takes the writer lock if no other process holds it. The lock lasts until `release` or the process exits."""
+        if self._lock_file is None:
+            lock_file = open(os.path.join(self.directory, f"{self._name}.lock"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._lock_file = lock_file
+            except BlockingIOError:
+                lock_file.close()
+        return self.is_writer
+
+    def release(self):
+        """Gives up the writer lock, so another process can take it over."""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def current_version(self) -> int:
+        try:
+            with open(self.pointer_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def publish(self, keys: Sequence[str], digests: Sequence[Optional[str]], vectors: np.ndarray) -> int:
+        if not self.is_writer:
+            raise RuntimeError("Only the process holding the writer lock may publish embeddings")
+
+        version = self.current_version() + 1
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        header = json.dumps({
+            "model": self.model_name,
+            "dtype": self.dtype,
+            "rows": len(keys),
+            "dim": vectors.shape[1] if vectors.ndim == 2 else 0,
+            "keys": list(keys),
+            "digests": [digest or "" for digest in digests],
+        }).encode("utf-8")
+        padding = -(len(MAGIC) + 4 + len(header)) % HEADER_ALIGNMENT
+
+        path = self._version_path(version)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header) + padding) + header + b" " * padding)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        tmp_pointer = f"{self.pointer_path}.tmp"
+        with open(tmp_pointer, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_pointer, self.pointer_path)
+
+        self._remove_old_versions(version)
+        logger.info("Published shared embeddings", version=version, rows=len(keys), path=path)
+        return version
+
+    def open(self, version: Optional[int] = None) -> Optional[EmbeddingSnapshot]:
+        """Maps the given (default: current) version, or returns None if nothing has been published yet."""
+        version = self.current_version() if version is None else version
+        if not version:
+            return None
+
+        path = self._version_path(version)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a shared embedding file")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+
+        offset = len(MAGIC) + 4 + header_length
+        if header["rows"]:
+            vectors = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset,
+                                shape=(header["rows"], header["dim"]))
+        else:
+            vectors = np.empty((0, header["dim"]), dtype=header["dtype"])
+        return EmbeddingSnapshot(version, header["model"], header["keys"], header["digests"], vectors)
+
+    def _version_path(self, version: int) -> str:
+        return os.path.join(self.directory, f"{self._name}.v{version}.emb")
+
+    def _remove_old_versions(self, current: int):
+        # Readers may still have an older version mapped; unlinking it is safe, the pages live until they unmap
+        for path in glob.glob(os.path.join(self.directory, f"{glob.escape(self._name)}.v*.emb")):
+            match = re.search(r"\.v(\d+)\.emb$", path)
+            if match and int(match.group(1)) <= current - KEEP_VERSIONS:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
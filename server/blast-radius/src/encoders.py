@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import structlog
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = structlog.getLogger(__name__)
+
+# torch: full-precision PyTorch (reference)
+# torch-int8: PyTorch with linear layers dynamically quantized to int8, no extra dependencies
+# onnx: ONNX Runtime, exported from the PyTorch weights if the model repository ships no ONNX file
+# onnx-int8: ONNX Runtime with the model repository's dynamically int8-quantized ONNX file
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+ONNX_INT8_FILE_NAME = os.getenv("ONNX_INT8_FILE_NAME", "onnx/model_quint8_avx2.onnx")
+# Encode a few texts right after loading, so the first request doesn't pay for lazy kernel and tokenizer set-up
+ENCODER_WARMUP = os.getenv("ENCODER_WARMUP", "true").lower() == "true"
+WARMUP_TEXTS = ["KEY: WARM-1 \n SUMMARY: Warm up the encoder \n DESCRIPTION: First encode after loading."] * 4
+
+
+def encoder_id(model_name: str, backend: str) -> str:
+    """Identifies the vectors an encoder produces, e.g. for keying cached embeddings."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_encoder(model_name: str, backend: str = ENCODER_BACKEND) -> "SentenceTransformer":
+    """Loads `model_name` on the selected inference backend; every backend exposes the same `encode` API."""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {', '.join(ENCODER_BACKENDS)}")
+
+    # sentence-transformers imports torch (and transformers), which takes seconds, so only when a model is loaded
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        model = SentenceTransformer(model_name)
+
+    elif backend == "torch-int8":
+        import torch
+
+        # Dynamic quantization only has CPU kernels
+        model = SentenceTransformer(model_name, device="cpu")
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    else:
+        model_kwargs = {"file_name": ONNX_INT8_FILE_NAME} if backend == "onnx-int8" else None
+        try:
+            model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        except ImportError as e:
+            raise ImportError(
+                f"The {backend} encoder backend needs ONNX Runtime: pip install 'optimum[onnxruntime]'"
+            ) from e
+
+    logger.info("Loaded encoder", model=model_name, backend=backend)
+    return model
+
+
+class LazyEncoder:
+    """
+    Encoder that is loaded on first use, or ahead of it by calling `load` from a background thread.
+
+    `encode` blocks until the model is loaded (loading it in the calling thread if nobody has started yet), so it can
+    be handed to the inference scheduler and issue indexes before the model exists. A failed load is re-raised by
+    every `encode` call and reported by `status` rather than retried.
+    """
+
+    def __init__(self, model_name: str, backend: str = ENCODER_BACKEND, warmup: bool = ENCODER_WARMUP):
+        self.model_name = model_name
+        self.backend = backend
+        self.warmup = warmup
+        self._model: Optional["SentenceTransformer"] = None
+        self._error: Optional[Exception] = None
+        self._lock = threading.Lock()
+
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> "SentenceTransformer":
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._model is None:
+                try:
+                    started = time.perf_counter()
+                    model = load_encoder(self.model_name, self.backend)
+                    self.load_seconds = time.perf_counter() - started
+                    if self.warmup:
+                        started = time.perf_counter()
+                        model.encode(WARMUP_TEXTS)
+                        self.warmup_seconds = time.perf_counter() - started
+                except Exception as e:
+                    self._error = e
+                    logger.error("Could not load encoder", model=self.model_name, backend=self.backend, error=str(e))
+                    raise
+                self._model = model
+                logger.info("Encoder ready", load_seconds=self.load_seconds, warmup_seconds=self.warmup_seconds)
+        return self._model
+
+    def encode(self, texts, **kwargs):
+        return self.load().encode(texts, **kwargs)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "backend": self.backend,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": None if self._error is None else str(self._error),
+        }
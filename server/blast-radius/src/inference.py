@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+import structlog
+
+from .metrics import observe_batch_size, stage
+
+logger = structlog.getLogger(__name__)
+
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+
+
+def histogram_bucket(value: int) -> str:
+    """Power-of-two histogram bucket label, e.g. 5 -> "<=8"."""
+    return f"<={1 << max(0, value - 1).bit_length()}"
+
+
+class InferenceScheduler:
+    """
+    Runs encoder calls in a thread pool, gathering texts from concurrent requests into micro-batches.
+
+    A batch is sent to the encoder once it holds `max_batch_size` texts or its first request has waited
+    `max_wait_ms`, whichever comes first; each caller gets its own rows back through a future. A request larger
+    than `max_batch_size` is encoded as one batch on its own.
+    """
+
+    def __init__(
+            self,
+            encode: Callable[[list[str]], np.ndarray],
+            max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+            workers: int = INFERENCE_WORKERS
+    ):
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.workers = workers
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: list[asyncio.Task] = []
+
+        self.batches = 0
+        self.texts = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = Counter()
+        self.queue_depth_histogram = Counter()
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        if not self._tasks:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items(), key=lambda b: int(b[0][2:]))),
+            "queue_depth_histogram": dict(sorted(self.queue_depth_histogram.items(), key=lambda b: int(b[0][2:]))),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+    async def _next_batch(self) -> list[tuple[list[str], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        self.queue_depth_histogram[histogram_bucket(self._queue.qsize())] += 1
+        return batch
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+
+            try:
+                with stage("model_encode"):
+                    embeddings = await loop.run_in_executor(self._executor, self._encode, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            self.batch_size_histogram[histogram_bucket(len(texts))] += 1
+            observe_batch_size("encoder", len(texts))
+
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(item_texts)])
+                offset += len(item_texts)
@@ -0,0 +1,341 @@
+import itertools
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Sequence
+
+import numpy as np
+import structlog
+
+from .embedding_cache import EmbeddingCache
+from .embedding_file import SharedEmbeddingFile
+from .issue_table import IssueTable
+from .lexical_index import LexicalIndex, mentioned_keys
+from .metrics import stage
+from .vector_index import SearchResult, VectorIndex
+
+logger = structlog.getLogger(__name__)
+
+# Process-wide, so an index rebuilt after its tenant was evicted never reuses a version number
+_versions = itertools.count(1)
+
+RETRIEVAL_MODES = ("dense", "prefilter", "rrf")
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+class ScoredIssue(NamedTuple):
+    issue: object  # JiraIssues.JiraIssue
+    score: float
+
+
+class IssueSearchResult(NamedTuple):
+    top_k: list[ScoredIssue]
+    above_threshold: list[ScoredIssue]
+
+
+class IssueIndex:
+    """
+    Keeps a `VectorIndex` in step with a set of Jira issues.
+
+    Issues are tagged in the vector index with the content hash of their textual representation, so applying an
+    issue that has not changed is a dictionary lookup and only new or edited issues reach the encoder.
+
+    With a `SharedEmbeddingFile`, the process holding the file's writer lock encodes issues and publishes the vectors
+    after every change; every other process only tracks issue metadata and searches a read-only memory map of the
+    latest published version, checked for updates at most every `poll_seconds`. At the same interval a reader tries
+    to take over the lock, so when the writer's index is closed (its tenant evicted, or its process gone) another
+    process encodes the issues that changed in the meantime, in a background thread, and keeps publishing.
+
+    Search results are resolved to issues through an `IssueTable`. Pass the table of the `IssueStore` the index
+    follows to share it instead of keeping a second copy of every issue.
+
+    `version` changes whenever the issues or vectors the index searches change, so it can key cached search results.
+
+    With a `retrieval` mode other than `dense`, a BM25 `LexicalIndex` over issue key, summary and description is kept
+    as well and searches that pass the query text use it:
+
+    - `prefilter`: only the `lexical_top_n` best lexical matches are scored against the query embedding; a query
+      sharing no term with any issue falls back to dense search.
+    - `rrf`: dense and lexical rankings are fused by reciprocal rank; threshold hits are still decided by cosine
+      similarity.
+
+    In both modes, when `key_shortcircuit` is set and the query text names issue keys the index holds, those issues
+    are returned directly without scoring anything else.
+    """
+
+    def __init__(
+            self,
+            encode: Callable[[list[str]], np.ndarray],
+            embedding_cache: EmbeddingCache,
+            vector_index: VectorIndex,
+            shared_file: Optional[SharedEmbeddingFile] = None,
+            poll_seconds: float = 1.0,
+            issues: Optional[IssueTable] = None,
+            retrieval: str = "dense",
+            lexical_top_n: int = 200,
+            key_shortcircuit: bool = True
+    ):
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {retrieval!r}, expected one of {', '.join(RETRIEVAL_MODES)}")
+
+        self.encode = encode
+        self.embedding_cache = embedding_cache
+        self.vector_index = vector_index
+        self.shared_file = shared_file
+        self.poll_seconds = poll_seconds
+        self.is_writer = shared_file is None or shared_file.try_become_writer()
+        self.shared_version = 0
+        self.version = next(_versions)
+        self._last_poll = 0.0
+        # A shared table is kept up to date by its owner; a private one by `upsert` and `delete`
+        self._owns_issues = issues is None
+        self._issues = IssueTable() if issues is None else issues
+        self._lock = threading.Lock()
+        # Serializes changes to the vectors, so a writer takeover's catch-up and store updates don't interleave
+        self._update_lock = threading.RLock()
+
+        self.retrieval = retrieval
+        self.lexical_top_n = lexical_top_n
+        self.key_shortcircuit = key_shortcircuit
+        self.lexical_index = LexicalIndex() if retrieval != "dense" else None
+
+        if not self.is_writer:
+            self._reload_shared()
+
+    def __len__(self):
+        return len(self._issues)
+
+    def sync(self, issues: Sequence):
+        """Makes the index hold exactly `issues`, dropping anything that is no longer present."""
+        with self._update_lock:
+            current = {issue.key for issue in issues}
+            with self._lock:
+                known = set(self._issues.keys()) | set(self.vector_index.keys())
+            removed = [key for key in known if key not in current]
+            self.delete(removed)
+            self.upsert(issues)
+            self.embedding_cache.save()
+
+    def close(self):
+        """
+        Saves pending embedding cache changes and gives up the shared file's writer lock, so a reader process takes
+        over publishing.
+        """
+        with self._update_lock:
+            self.embedding_cache.save()
+            if self.shared_file is not None and self.is_writer:
+                self.shared_file.release()
+                self.is_writer = False
+
+    def upsert(self, issues: Sequence):
+        with self._update_lock:
+            self._upsert(issues)
+
+    def _upsert(self, issues: Sequence):
+        if not self.is_writer:
+            # Vectors come from the writer process through the shared file
+            self._upsert_issues(issues)
+            self._bump_version(issues)
+            return
+
+        digests = [self.embedding_cache.content_hash(issue.textual_representation) for issue in issues]
+        changed = [
+            (issue, digest) for issue, digest in zip(issues, digests)
+            if self.vector_index.tag(issue.key) != digest
+        ]
+
+        self._upsert_issues(issues)
+
+        if changed:
+            with stage("index_encode"):
+                embeddings = self.embedding_cache.get_embeddings([issue for issue, _ in changed], self.encode)
+            self.vector_index.upsert_many(
+                [issue.key for issue, _ in changed],
+                embeddings,
+                tags=[digest for _, digest in changed]
+            )
+            logger.info("Updated issue index", changed=len(changed), size=len(self.vector_index))
+            self._publish()
+        self._bump_version(issues)
+
+    def delete(self, keys: Sequence[str]):
+        if not keys:
+            return
+        with self._update_lock:
+            self._delete(keys)
+
+    def _delete(self, keys: Sequence[str]):
+        if self._owns_issues:
+            with self._lock:
+                for key in keys:
+                    self._issues.delete(key)
+        if self.is_writer:
+            self.vector_index.delete_many(keys)
+            self.embedding_cache.discard(keys)
+            self._publish()
+        if self.lexical_index is not None:
+            self.lexical_index.delete(keys)
+        self._bump_version(keys)
+
+    def on_store_change(self, upserted: list, deleted: list[str]):
+        """`IssueStore` listener that applies the store's changes to the index."""
+        self.delete(deleted)
+        self.upsert(upserted)
+
+    def search(
+            self,
+            query_embedding: np.ndarray,
+            k: Optional[int],
+            threshold: float,
+            exact: bool = None,
+            max_threshold_hits: Optional[int] = None,
+            text: Optional[str] = None
+    ) -> IssueSearchResult:
+        """
+        `max_threshold_hits` caps how many threshold hits are resolved to issues; all top-k hits always are.
+
+        `text` is the query the embedding was made from, used by the hybrid retrieval modes.
+        """
+        self._poll_shared()
+        if self.lexical_index is None or text is None:
+            result = self.vector_index.search(query_embedding, k, threshold, exact=exact)
+        else:
+            result = self._hybrid_search(query_embedding, text, k, threshold)
+        with self._lock:
+            return self._resolve(result, max_threshold_hits)
+
+    def search_batch(
+            self,
+            query_embeddings: np.ndarray,
+            ks: Sequence[Optional[int]],
+            threshold: float,
+            max_threshold_hits: Optional[Sequence[Optional[int]]] = None,
+            texts: Optional[Sequence[str]] = None
+    ) -> list[IssueSearchResult]:
+        self._poll_shared()
+        if self.lexical_index is None or texts is None:
+            results = self.vector_index.search_batch(query_embeddings, ks, threshold)
+        else:
+            # Each query has its own candidate set, so there is no shared matrix product to batch
+            results = [
+                self._hybrid_search(query_embedding, text, k, threshold)
+                for query_embedding, text, k in zip(query_embeddings, texts, ks)
+            ]
+        limits = max_threshold_hits if max_threshold_hits is not None else [None] * len(results)
+        with self._lock:
+            return [self._resolve(result, limit) for result, limit in zip(results, limits)]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.vector_index),
+            "version": self.version,
+            "exact": self.vector_index.exact,
+            "compression": self.vector_index.compression,
+            "nbytes": self.vector_index.nbytes,
+            "shared_version": self.shared_version if self.shared_file else None,
+            "shared_writer": self.is_writer if self.shared_file else None,
+            "retrieval": self.retrieval,
+            "lexical_index": self.lexical_index.stats() if self.lexical_index is not None else None,
+        }
+
+    def _hybrid_search(self, query_embedding: np.ndarray, text: str, k: Optional[int], threshold: float) -> SearchResult:
+        if self.key_shortcircuit:
+            mentioned = [key for key in mentioned_keys(text) if key in self._issues]
+            if mentioned:
+                # Named issues are relevant whatever their similarity; keep the order they were mentioned in
+                scores = dict(self.vector_index.score_keys(query_embedding, mentioned))
+                hits = [(key, scores.get(key, 1.0)) for key in mentioned][:k]
+                return SearchResult(top_k=hits, above_threshold=hits)
+
+        lexical = [key for key, _ in self.lexical_index.search(text, self.lexical_top_n)]
+        if self.retrieval == "prefilter":
+            if not lexical:
+                return self.vector_index.search(query_embedding, k, threshold)
+            scored = self.vector_index.score_keys(query_embedding, lexical)
+            return SearchResult(top_k=scored[:k], above_threshold=[hit for hit in scored if hit[1] >= threshold])
+
+        # No `k` asks for every candidate, which the dense search gives for `None` as well
+        dense = self.vector_index.search(query_embedding, None if k is None else max(k, self.lexical_top_n), threshold)
+        scores = dict(dense.above_threshold)
+        scores.update(dense.top_k)
+        scores.update(self.vector_index.score_keys(query_embedding, [key for key in lexical if key not in scores]))
+
+        fused: dict[str, float] = {}
+        for ranking in ([key for key, _ in dense.top_k], lexical):
+            for rank, key in enumerate(ranking):
+                if key in scores:
+                    fused[key] = fused.get(key, 0.0) + 1 / (RRF_K + rank + 1)
+        order = sorted(fused, key=fused.get, reverse=True)
+
+        above_threshold = [(key, scores[key]) for key in order if scores[key] >= threshold]
+        # Threshold hits ranked too low by both lists to be fused still count
+        above_threshold += [(key, score) for key, score in dense.above_threshold if key not in fused]
+        return SearchResult(top_k=[(key, scores[key]) for key in order[:k]], above_threshold=above_threshold)
+
+    def _bump_version(self, changes: Sequence):
+        # After the change is applied, so a search that saw part of it is never cached under the new version
+        if changes:
+            self.version = next(_versions)
+
+    def _upsert_issues(self, issues: Sequence):
+        if self.lexical_index is not None:
+            self.lexical_index.upsert(issues)
+        if self._owns_issues:
+            with self._lock:
+                for issue in issues:
+                    self._issues.upsert(issue)
+
+    def _resolve(self, result, max_threshold_hits: Optional[int] = None) -> IssueSearchResult:
+        # Issues are only materialised for returned hits; one deleted since the vector search is simply left out
+        def scored(hits: list[tuple[str, float]], limit: Optional[int]) -> list[ScoredIssue]:
+            issues = []
+            for key, score in hits:
+                if limit is not None and len(issues) >= limit:
+                    break
+                issue = self._issues.get(key)
+                if issue is not None:
+                    issues.append(ScoredIssue(issue, score))
+            return issues
+
+        return IssueSearchResult(
+            top_k=scored(result.top_k, None),
+            above_threshold=scored(result.above_threshold, max_threshold_hits),
+        )
+
+    def _publish(self):
+        if self.shared_file is not None and self.is_writer:
+            keys, digests, vectors = self.vector_index.export()
+            self.shared_version = self.shared_file.publish(keys, digests, vectors)
+            if self.vector_index.compression is not None:
+                # Serve from the memory map as well, so only the compressed codes stay in private memory
+                self._reload_shared()
+
+    def _poll_shared(self):
+        if self.is_writer or time.monotonic() - self._last_poll < self.poll_seconds:
+            return
+        self._last_poll = time.monotonic()
+        if self.shared_file.current_version() != self.shared_version:
+            self._reload_shared()
+        if self.shared_file.try_become_writer():
+            # Polled on the request path, so the catch-up encoding runs in the background
+            threading.Thread(target=self._take_over, name="issue-index-takeover", daemon=True).start()
+
+    def _take_over(self):
+        with self._update_lock:
+            # Searches keep serving the mapped vectors until the catch-up has published
+            self._reload_shared()
+            self.is_writer = True
+            logger.info("Took over publishing shared embeddings", version=self.shared_version)
+            with self._lock:
+                issues = self._issues.issues()
+            # Issues changed while nobody was writing have stale or missing vectors; publishing follows any change
+            self.sync(issues)
+
+    def _reload_shared(self):
+        snapshot = self.shared_file.open()
+        if snapshot is None:
+            return
+        self.vector_index.load(snapshot.keys, snapshot.vectors, tags=snapshot.digests)
+        self.shared_version = snapshot.version
+        self.version = next(_versions)
+        logger.info("Loaded shared embeddings", version=snapshot.version, rows=len(snapshot.keys))
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+import structlog
+
+from .data_models.jira import JiraIssues
+from .issue_table import IssueTable
+
+logger = structlog.getLogger(__name__)
+
+ChangeListener = Callable[[list, list[str]], None]
+
+
+class IssueStore:
+    """
+    In-memory copy of a Jira project's issues, kept warm by `JiraSyncer`.
+
+    Listeners registered with `add_listener` are called with `(upserted_issues, deleted_keys)` after every change,
+    which is how the embedding index follows the store. Writers are serialized up to and including that call, so
+    listeners see changes in the order they were made. When `snapshot_path` is set the issues and the last sync time
+    are written to disk by `mark_synced` whenever something changed since the previous snapshot, so a restarted
+    process can resume with an incremental sync.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.last_sync_time: Optional[float] = None
+        self.version = 0
+
+        # Columnar, so a large project doesn't keep a pydantic model alive per issue
+        self._issues = IssueTable()
+        self._listeners: list[ChangeListener] = []
+        self._lock = threading.RLock()
+        # Held while a change is applied and its listeners run; readers only take `_lock`, so they never wait on the
+        # index work listeners do
+        self._write_lock = threading.RLock()
+        self._dirty = False
+
+        if snapshot_path:
+            self._load()
+
+    def __len__(self):
+        return len(self._issues)
+
+    def __contains__(self, key: str):
+        return key in self._issues
+
+    @property
+    def table(self) -> IssueTable:
+        return self._issues
+
+    def get(self, key: str) -> Optional[JiraIssues.JiraIssue]:
+        return self._issues.get(key)
+
+    def all(self) -> list[JiraIssues.JiraIssue]:
+        with self._lock:
+            return self._issues.issues()
+
+    def keys(self) -> set[str]:
+        with self._lock:
+            return set(self._issues.keys())
+
+    def add_listener(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def upsert(self, issues: Sequence[JiraIssues.JiraIssue]):
+        with self._write_lock:
+            with self._lock:
+                changed = [issue for issue in issues if not self._issues.matches(issue)]
+                for issue in changed:
+                    self._issues.upsert(issue)
+            self._changed(changed, [])
+
+    def delete(self, keys: Sequence[str]):
+        with self._write_lock:
+            with self._lock:
+                deleted = [key for key in keys if self._issues.delete(key)]
+            self._changed([], deleted)
+
+    def mark_synced(self, sync_time: float):
+        """Records a sync and, if the issues changed since the last snapshot, writes a new one; blocks on disk I/O."""
+        self.last_sync_time = sync_time
+        if self._dirty:
+            self._save()
+
+    def staleness_seconds(self) -> Optional[float]:
+        """Seconds since the store last caught up with Jira, or None if it never has."""
+        return None if self.last_sync_time is None else time.time() - self.last_sync_time
+
+    def status(self) -> dict:
+        return {
+            "issues": len(self),
+            "version": self.version,
+            "nbytes": self._issues.nbytes,
+            "last_sync_time": self.last_sync_time,
+            "staleness_seconds": self.staleness_seconds(),
+        }
+
+    def _changed(self, upserted: list, deleted: list[str]):
+        if not upserted and not deleted:
+            return
+        with self._lock:
+            self.version += 1
+            self._dirty = True
+        for listener in self._listeners:
+            listener(upserted, deleted)
+
+    def _save(self):
+        if not self.snapshot_path:
+            return
+
+        with self._lock:
+            snapshot = {
+                "last_sync_time": self.last_sync_time,
+                "issues": list(self._issues.records()),
+            }
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            self._dirty = True
+            logger.warning("Could not write issue store snapshot", path=self.snapshot_path, error=str(e))
+
+    def _load(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            for data in snapshot["issues"]:
+                self._issues.upsert_record(**data)
+            self.last_sync_time = snapshot["last_sync_time"]
+            logger.info("Loaded issue store snapshot", path=self.snapshot_path, issues=len(self._issues))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable issue store snapshot", path=self.snapshot_path, error=str(e))
+            self._issues = IssueTable()
+            self.last_sync_time = None
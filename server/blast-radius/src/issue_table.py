@@ -0,0 +1,177 @@
+import sys
+import threading
+from array import array
+from typing import Iterator, Optional
+
+from .data_models.jira import JiraIssues
+
+# Compact once more than this share of the text buffer belongs to deleted or overwritten rows
+GARBAGE_RATIO = 0.5
+
+
+class IssueTable:
+    """
+    Columnar store of Jira issues that keeps no Python object per issue.
+
+    Issue ids sit in an int64 array, issue types and URL prefixes are dictionary-encoded into small integer codes, and
+    summaries and descriptions are UTF-8 encoded into one shared byte buffer addressed by three offsets per row. Rows
+    are only turned back into `JiraIssue` models (without re-validation) when asked for, e.g. for the handful of
+    issues a calculation returns. Deleted rows are reused, and the text buffer is compacted once it is mostly garbage.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = array("q")
+        self._type_codes = array("I")
+        self._url_codes = array("I")
+        # Summary start, description start and description end in `_text` for every row
+        self._offsets = array("q")
+        self._text = bytearray()
+        self._garbage = 0
+
+        self._keys: list[Optional[str]] = []
+        self._rows: dict[str, int] = {}
+        self._free_rows: list[int] = []
+
+        self._types: list[str] = []
+        self._type_lookup: dict[str, int] = {}
+        # A URL is stored as its prefix code when it ends with the issue key ("<site>/browse/<key>"), else whole
+        self._url_prefixes: list[tuple[str, bool]] = []
+        self._url_lookup: dict[tuple[str, bool], int] = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key: str):
+        return key in self._rows
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def get(self, key: str) -> Optional[JiraIssues.JiraIssue]:
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else JiraIssues.JiraIssue.model_construct(**self._record(row))
+
+    def issues(self) -> list[JiraIssues.JiraIssue]:
+        with self._lock:
+            return [JiraIssues.JiraIssue.model_construct(**self._record(row)) for row in self._rows.values()]
+
+    def records(self) -> Iterator[dict]:
+        """Yields every issue as a plain dict of `JiraIssue` fields."""
+        with self._lock:
+            rows = list(self._rows.values())
+        for row in rows:
+            with self._lock:
+                if self._keys[row] is not None:
+                    yield self._record(row)
+
+    def matches(self, issue: JiraIssues.JiraIssue) -> bool:
+        """Whether the stored row for `issue.key` holds exactly this issue."""
+        with self._lock:
+            row = self._rows.get(issue.key)
+            return row is not None and self._record(row) == {
+                "issue_id": issue.issue_id,
+                "key": issue.key,
+                "summary": issue.summary,
+                "description": issue.description,
+                "issue_type": issue.issue_type,
+                "URL": issue.URL,
+            }
+
+    def upsert(self, issue: JiraIssues.JiraIssue):
+        self.upsert_record(issue_id=issue.issue_id, key=issue.key, summary=issue.summary,
+                           description=issue.description, issue_type=issue.issue_type, URL=issue.URL)
+
+    def upsert_record(self, issue_id: int, key: str, summary: str, description: str, issue_type: str, URL: str):
+        summary_bytes = summary.encode("utf-8")
+        description_bytes = description.encode("utf-8")
+        url_prefix = (URL[:-len(key)], True) if URL.endswith(key) else (URL, False)
+
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._allocate_row(key)
+            else:
+                self._garbage += self._offsets[3 * row + 2] - self._offsets[3 * row]
+
+            start = len(self._text)
+            self._text += summary_bytes
+            self._text += description_bytes
+            self._offsets[3 * row:3 * row + 3] = array("q", [
+                start, start + len(summary_bytes), start + len(summary_bytes) + len(description_bytes)
+            ])
+            self._ids[row] = int(issue_id)
+            self._type_codes[row] = self._code(issue_type, self._types, self._type_lookup)
+            self._url_codes[row] = self._code(url_prefix, self._url_prefixes, self._url_lookup)
+
+            self._maybe_compact()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return False
+            self._keys[row] = None
+            self._garbage += self._offsets[3 * row + 2] - self._offsets[3 * row]
+            self._offsets[3 * row:3 * row + 3] = array("q", [0, 0, 0])
+            self._free_rows.append(row)
+            self._maybe_compact()
+            return True
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table, including key strings and the key-to-row mapping."""
+        with self._lock:
+            arrays = sum(a.itemsize * len(a) for a in (self._ids, self._type_codes, self._url_codes, self._offsets))
+            keys = sum(sys.getsizeof(key) for key in self._rows) + sys.getsizeof(self._rows) + sys.getsizeof(self._keys)
+            return arrays + len(self._text) + keys
+
+    def _record(self, row: int) -> dict:
+        start, middle, end = self._offsets[3 * row:3 * row + 3]
+        key = self._keys[row]
+        url_prefix, ends_with_key = self._url_prefixes[self._url_codes[row]]
+        return {
+            "issue_id": self._ids[row],
+            "key": key,
+            "summary": self._text[start:middle].decode("utf-8"),
+            "description": self._text[middle:end].decode("utf-8"),
+            "issue_type": self._types[self._type_codes[row]],
+            "URL": url_prefix + key if ends_with_key else url_prefix,
+        }
+
+    @staticmethod
+    def _code(value, values: list, lookup: dict) -> int:
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(values)
+            values.append(value)
+        return code
+
+    def _allocate_row(self, key: str) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._keys[row] = key
+        else:
+            row = len(self._keys)
+            self._keys.append(key)
+            self._ids.append(0)
+            self._type_codes.append(0)
+            self._url_codes.append(0)
+            self._offsets.extend((0, 0, 0))
+        self._rows[key] = row
+        return row
+
+    def _maybe_compact(self):
+        if self._garbage <= GARBAGE_RATIO * len(self._text):
+            return
+
+        text = bytearray()
+        for row in self._rows.values():
+            start, middle, end = self._offsets[3 * row:3 * row + 3]
+            new_start = len(text)
+            text += self._text[start:end]
+            self._offsets[3 * row:3 * row + 3] = array("q", [new_start, new_start + middle - start, len(text)])
+        self._text = text
+        self._garbage = 0
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import random
+from typing import Optional
+
+import httpx
+import structlog
+
+from .adf import loads
+
+logger = structlog.getLogger(__name__)
+
+JIRA_PAGE_SIZE = int(os.getenv("JIRA_PAGE_SIZE", "100"))
+JIRA_MAX_CONCURRENCY = int(os.getenv("JIRA_MAX_CONCURRENCY", "8"))
+JIRA_MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", "5"))
+# "offset" walks /rest/api/3/search with startAt/maxResults, "token" walks /rest/api/3/search/jql with nextPageToken
+JIRA_PAGINATION = os.getenv("JIRA_PAGINATION", "offset")
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# A gateway error on a write may come after Jira applied it, so writes are only retried when it certainly did not
+RETRYABLE_WRITE_STATUS_CODES = {429, 503}
+
+
+class JiraClient:
+    """
+    Async Jira REST client that keeps one pooled HTTP connection pool per Jira site and credentials.
+
+    Search results are read page by page. With offset pagination the first page reports the total, so the remaining
+    pages are requested concurrently (bounded by `max_concurrency`). Token pagination has to follow the chain of
+    `nextPageToken`s and is therefore sequential. Rate-limited (429) and unavailable responses are retried with
+    exponential backoff, honouring `Retry-After` when Jira sends it.
+
+    Clients handed out by `shared` are reference counted: every holder gives its client back with `release`, and only
+    the last one closes it, so one tenant being evicted doesn't close a connection pool others still use.
+    """
+
+    _shared: dict[tuple, "JiraClient"] = {}
+
+    def __init__(
+            self,
+            base_url: str,
+            email: str,
+            api_token: str,
+            page_size: int = JIRA_PAGE_SIZE,
+            max_concurrency: int = JIRA_MAX_CONCURRENCY,
+            max_retries: int = JIRA_MAX_RETRIES,
+            pagination: str = JIRA_PAGINATION,
+            timeout: float = 30.0,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if pagination not in ("offset", "token"):
+            raise ValueError(f"Unknown Jira pagination mode: {pagination}")
+
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.pagination = pagination
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=httpx.BasicAuth(email, api_token),
+            headers={"Accept": "application/json"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._holders = 0
+
+    @classmethod
+    def shared(cls, base_url: str, email: str, api_token: str) -> "JiraClient":
+        """
+        Returns the process-wide client for this Jira site and credentials, creating it on first use.
+
+        Every call takes a hold on the client that must be given back with `release`.
+        """
+        key = (base_url, email, api_token)
+        if key not in cls._shared:
+            cls._shared[key] = cls(base_url, email, api_token)
+        client = cls._shared[key]
+        client._holders += 1
+        return client
+
+    @classmethod
+    def release(cls, client: "JiraClient") -> bool:
+        """
+        Gives back a hold taken by `shared` and returns whether it was the last one.
+
+        The last holder's release unregisters the client, so the next `shared` call for its site opens a new one, and
+        that holder then closes it with `aclose`.
+        """
+        client._holders -= 1
+        if client._holders > 0:
+            return False
+        for key, shared in list(cls._shared.items()):
+            if shared is client:
+                del cls._shared[key]
+        return True
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def request(
+            self,
+            method: str,
+            path: str,
+            retry_on: set[int] = RETRYABLE_STATUS_CODES,
+            **kwargs
+    ) -> httpx.Response:
+        """Sends a request, retrying rate-limited and unavailable (`retry_on`) responses with backoff."""
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                response = await self._http.request(method, path, **kwargs)
+
+            if response.status_code not in retry_on or attempt == self.max_retries:
+                response.raise_for_status()
+                return response
+
+            delay = self._retry_delay(response, attempt)
+            logger.info("Jira request throttled, backing off", status_code=response.status_code, path=path,
+                        attempt=attempt + 1, delay=delay)
+            await asyncio.sleep(delay)
+
+    async def add_comment(self, issue_key: str, body: dict) -> dict:
+        """Posts an ADF comment on `issue_key` and returns the created comment."""
+        response = await self.request(
+            "POST", f"/rest/api/3/issue/{issue_key}/comment",
+            retry_on=RETRYABLE_WRITE_STATUS_CODES, json={"body": body}
+        )
+        return loads(response.content)
+
+    async def search(self, jql: str = "", fields: str = "summary,description,issuetype") -> list[dict]:
+        """Returns the raw issue objects for every page of `jql`."""
+        if self.pagination == "token":
+            return await self._search_by_token(jql, fields)
+        return await self._search_by_offset(jql, fields)
+
+    async def _search_by_offset(self, jql: str, fields: str) -> list[dict]:
+        async def fetch_page(start_at: int, max_results: int) -> dict:
+            response = await self.request("GET", "/rest/api/3/search", params={
+                "jql": jql, "fields": fields, "startAt": start_at, "maxResults": max_results
+            })
+            return loads(response.content)
+
+        first = await fetch_page(0, self.page_size)
+        issues = list(first.get("issues", []))
+        total = first.get("total", len(issues))
+        # Jira may cap maxResults below what was asked for, so page by what it actually returned
+        page_size = first.get("maxResults") or len(issues)
+        if not page_size or len(issues) >= total:
+            return issues
+
+        pages = await asyncio.gather(*[
+            fetch_page(start_at, page_size) for start_at in range(len(issues), total, page_size)
+        ])
+        for page in pages:
+            issues.extend(page.get("issues", []))
+
+        logger.info("Fetched Jira issues", total=total, fetched=len(issues), pages=len(pages) + 1)
+        return issues
+
+    async def _search_by_token(self, jql: str, fields: str) -> list[dict]:
+        issues = []
+        params = {"jql": jql, "fields": fields, "maxResults": self.page_size}
+        pages = 0
+        while True:
+            page = loads((await self.request("GET", "/rest/api/3/search/jql", params=params)).content)
+            issues.extend(page.get("issues", []))
+            pages += 1
+            if page.get("isLast", True) or not page.get("nextPageToken"):
+                break
+            params["nextPageToken"] = page["nextPageToken"]
+
+        logger.info("Fetched Jira issues", fetched=len(issues), pages=pages)
+        return issues
+
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+        # Exponential backoff with jitter so concurrent page requests don't retry in lockstep
+        return min(0.5 * 2 ** attempt, 30.0) * (0.5 + random.random() / 2)
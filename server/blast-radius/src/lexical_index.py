@@ -0,0 +1,129 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Sequence
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Jira issue keys: a project key of capitals, digits and underscores, a dash and the issue number
+ISSUE_KEY_PATTERN = re.compile(r"\b[A-Z][A-Z0-9_]+-\d+\b")
+
+# Rough CPython cost of one posting (dict slot, boxed term frequency) and one distinct term, for `nbytes`
+_POSTING_BYTES = 100
+_TERM_BYTES = 150
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def mentioned_keys(text: str) -> list[str]:
+    """Issue keys written in `text`, in order of first mention."""
+    return list(dict.fromkeys(ISSUE_KEY_PATTERN.findall(text)))
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over issue key, summary and description, updated one issue at a time.
+
+    Postings map every term to the documents containing it and the term's frequency there, so a query only touches
+    the documents sharing a term with it. Terms found in more than `max_df_ratio` of the documents ("the",
+    "service") add next to nothing to a BM25 score but would touch most postings, so queries skip them. Document ids
+    are small integers, reused after deletes, to keep the postings compact.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self._lock = threading.Lock()
+
+        self._postings: dict[str, dict[int, int]] = {}
+        self._doc_ids: dict[str, int] = {}
+        self._doc_keys: list = []
+        self._doc_terms: list = []  # Distinct terms of every document, to remove its postings again
+        self._doc_lengths: list[int] = []
+        self._free_ids: list[int] = []
+        self._total_length = 0
+        self._num_postings = 0
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def upsert(self, issues: Sequence):
+        with self._lock:
+            for issue in issues:
+                self._remove(issue.key)
+                terms = Counter(tokenize(f"{issue.key} {issue.summary} {issue.description}"))
+                doc_id = self._allocate(issue.key)
+                for term, frequency in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = frequency
+                self._doc_terms[doc_id] = tuple(terms)
+                self._doc_lengths[doc_id] = length = sum(terms.values())
+                self._total_length += length
+                self._num_postings += len(terms)
+
+    def delete(self, keys: Sequence[str]):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def search(self, text: str, n: int) -> list[tuple[str, float]]:
+        """The `n` best BM25 matches for `text` as (key, score) pairs, best first."""
+        terms = set(tokenize(text))
+        with self._lock:
+            num_docs = len(self._doc_ids)
+            if not num_docs or n <= 0:
+                return []
+            average_length = self._total_length / num_docs
+
+            scores: dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings or len(postings) > self.max_df_ratio * num_docs:
+                    continue
+                idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            best = heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+            return [(self._doc_keys[doc_id], score) for doc_id, score in best]
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated memory held by the postings."""
+        return self._num_postings * _POSTING_BYTES + len(self._postings) * _TERM_BYTES
+
+    def stats(self) -> dict:
+        return {"documents": len(self._doc_ids), "terms": len(self._postings), "postings": self._num_postings,
+                "nbytes": self.nbytes}
+
+    def _allocate(self, key: str) -> int:
+        if self._free_ids:
+            doc_id = self._free_ids.pop()
+            self._doc_keys[doc_id] = key
+        else:
+            doc_id = len(self._doc_keys)
+            self._doc_keys.append(key)
+            self._doc_terms.append(())
+            self._doc_lengths.append(0)
+        self._doc_ids[key] = doc_id
+        return doc_id
+
+    def _remove(self, key: str):
+        doc_id = self._doc_ids.pop(key, None)
+        if doc_id is None:
+            return
+        for term in self._doc_terms[doc_id]:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._num_postings -= len(self._doc_terms[doc_id])
+        self._total_length -= self._doc_lengths[doc_id]
+        self._doc_keys[doc_id] = None
+        self._doc_terms[doc_id] = ()
+        self._doc_lengths[doc_id] = 0
+        self._free_ids.append(doc_id)
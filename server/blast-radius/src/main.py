@@ -1,14 +1,45 @@
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .calculate import blast_radius_calculation_sub_app
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .calculate import blast_radius_calculation_sub_app, readiness, start_issue_sync, stop_issue_sync
+from .metrics import ServerTimingMiddleware, registry
+from .webhooks import jira_webhook_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "DEBUG"))
+    # Mounted sub-apps don't get lifespan events, so the background Jira sync is started here
+    await start_issue_sync()
+    yield
+    # Stopping a tenant applies its buffered webhook events first
+    await stop_issue_sync()
 
-app = FastAPI()
 
+app = FastAPI(lifespan=lifespan)
+# Only wraps requests when SERVER_TIMING_ENABLED is set
+app.add_middleware(ServerTimingMiddleware)
+
+blast_radius_calculation_sub_app.include_router(jira_webhook_router, prefix="/webhooks")
 app.mount("/blast-radius", blast_radius_calculation_sub_app)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def ready_check():
+    # Unlike /health, only succeeds once the encoder is loaded and the preloaded tenants' issues are indexed
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "Blast Radius API is running"}
\ No newline at end of file
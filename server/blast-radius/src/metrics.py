@@ -0,0 +1,174 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Seconds; Prometheus client defaults extended down to 100 µs for index scoring and cache lookups
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 10_000, 100_000, 1_000_000)
+
+# Stage durations of the request being handled, set by `ServerTimingMiddleware` when Server-Timing is enabled
+_request_timings: contextvars.ContextVar[Optional[dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, safe to observe from worker threads."""
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float], labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._lock = threading.Lock()
+        # Label values -> per-bucket counts (the last one is +Inf), sum of observations
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Gauge or counter whose samples are read from the service's own statistics at scrape time."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labels: tuple[str, ...],
+                 collect: Callable[[], Iterable[tuple[tuple, float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4) of every registered metric."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "blast_radius_stage_seconds",
+    "Time spent in each stage of loading issues and answering calculations.",
+    LATENCY_BUCKETS,
+    labels=("stage",)
+))
+batch_size = registry.register(Histogram(
+    "blast_radius_batch_size",
+    "Size of encoder micro-batches (kind=encoder) and of /calculation/batch requests (kind=request).",
+    SIZE_BUCKETS,
+    labels=("kind",)
+))
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times the enclosed block as stage `name` in `blast_radius_stage_seconds` and, when Server-Timing is enabled, in
+    the current request's `Server-Timing` header. Does nothing when neither is enabled.
+    """
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        if METRICS_ENABLED:
+            stage_seconds.observe(seconds, name)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+
+def observe_batch_size(kind: str, size: int):
+    if METRICS_ENABLED:
+        batch_size.observe(size, kind)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that reports the stages timed during a request in a `Server-Timing` response header
+    (`encode;dur=3.1, score;dur=0.4, total;dur=4.2`, durations in milliseconds).
+    """
+
+    def __init__(self, app, enabled: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+                entries.append(f"total;dur={(time.perf_counter() - started) * 1000:.2f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
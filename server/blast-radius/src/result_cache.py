@@ -0,0 +1,76 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "4096"))
+SUMMARY_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_EMBEDDING_CACHE_MAX_ENTRIES", "4096"))
+
+
+def cache_key(*parts) -> str:
+    """Digest of `parts`, so long summaries aren't kept alive as dictionary keys."""
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded mapping that forgets the least recently used entry first, with hit and memory accounting.
+
+    `sizeof` estimates an entry's size in bytes when it is stored. A cache with `max_entries=0` stores nothing.
+    Only used from the event loop, so it takes no locks.
+    """
+
+    def __init__(self, max_entries: int, sizeof: Callable[[V], int] = lambda value: 0):
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self._entries: OrderedDict[Hashable, tuple[V, int]] = OrderedDict()
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: V):
+        if self.max_entries <= 0:
+            return
+        size = self.sizeof(value)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous[1]
+        self._entries[key] = (value, size)
+        self.nbytes += size
+
+        while len(self._entries) > self.max_entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "nbytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
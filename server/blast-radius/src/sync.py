@@ -0,0 +1,118 @@
+import asyncio
+import math
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import structlog
+
+from .issue_store import IssueStore
+
+logger = structlog.getLogger(__name__)
+
+JIRA_SYNC_INTERVAL_SECONDS = float(os.getenv("JIRA_SYNC_INTERVAL_SECONDS", "60"))
+# Every n-th sync also lists all issue keys, which is how deletions are noticed between webhooks
+JIRA_RECONCILE_EVERY = int(os.getenv("JIRA_RECONCILE_EVERY", "10"))
+
+
+class JiraSyncer:
+    """
+    Background task that keeps an `IssueStore` in step with Jira.
+
+    The first run loads every issue. Later runs only ask Jira for issues updated since the previous sync (with a
+    minute of overlap, since JQL dates have minute precision), and every `reconcile_every` runs the full list of
+    issue keys is compared with the store to drop deleted issues. Store updates, and the index work their listeners
+    do, run in a worker thread so the event loop keeps serving requests.
+    """
+
+    def __init__(
+            self,
+            store: IssueStore,
+            fetch_issues: Callable[[str], Awaitable[list]],
+            fetch_keys: Callable[[], Awaitable[set[str]]],
+            interval_seconds: float = JIRA_SYNC_INTERVAL_SECONDS,
+            reconcile_every: int = JIRA_RECONCILE_EVERY
+    ):
+        self.store = store
+        self.fetch_issues = fetch_issues
+        self.fetch_keys = fetch_keys
+        self.interval_seconds = interval_seconds
+        self.reconcile_every = reconcile_every
+
+        # Awaited after every successful sync, e.g. to check the tenant memory budget as the store grows
+        self.on_synced: Optional[Callable[[], Awaitable[None]]] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._loaded = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_until_loaded(self, timeout: Optional[float] = None):
+        """Blocks until the store holds a full copy of the project, which is immediate after the first sync."""
+        if self.store.last_sync_time is not None:
+            return
+        await asyncio.wait_for(self._loaded.wait(), timeout)
+
+    async def sync_once(self):
+        started = time.time()
+
+        if self.store.last_sync_time is None:
+            issues = await self.fetch_issues("")
+            stale = self.store.keys() - {issue.key for issue in issues}
+            await asyncio.to_thread(self.store.upsert, issues)
+            await asyncio.to_thread(self.store.delete, list(stale))
+            logger.info("Full Jira sync finished", issues=len(issues), seconds=time.time() - started)
+        else:
+            minutes = math.ceil((started - self.store.last_sync_time) / 60) + 1
+            issues = await self.fetch_issues(f"updated >= -{minutes}m ORDER BY updated ASC")
+            await asyncio.to_thread(self.store.upsert, issues)
+
+            deleted = []
+            if self.reconcile_every and self.runs % self.reconcile_every == 0:
+                deleted = list(self.store.keys() - await self.fetch_keys())
+                await asyncio.to_thread(self.store.delete, deleted)
+            logger.info("Incremental Jira sync finished", updated=len(issues), deleted=len(deleted),
+                        seconds=time.time() - started)
+
+        # Writing the snapshot serializes the whole store, so it is kept off the event loop too
+        await asyncio.to_thread(self.store.mark_synced, started)
+        self.runs += 1
+        self._loaded.set()
+
+    def status(self) -> dict:
+        return {
+            **self.store.status(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "interval_seconds": self.interval_seconds,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_once()
+                self.last_error = None
+                if self.on_synced is not None:
+                    await self.on_synced()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error("Jira sync failed, serving the last known issues", error=str(e))
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import structlog
+
+from .inference import histogram_bucket
+from .issue_index import IssueIndex
+from .issue_store import IssueStore
+from .sync import JiraSyncer
+from .webhook_coalescer import WebhookCoalescer
+
+logger = structlog.getLogger(__name__)
+
+# The tenant served when a request names no user, backed by the Jira site configured in the environment
+DEFAULT_TENANT = "default"
+TENANT_MEMORY_BUDGET_MB = float(os.getenv("TENANT_MEMORY_BUDGET_MB", "2048"))
+
+
+def tenant_slug(tenant_id: str) -> str:
+    """File-system safe form of a tenant id, for per-tenant cache and snapshot paths."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", tenant_id)
+
+
+class Tenant:
+    """
+    One Jira site's issue store, embedding index, background sync and webhook buffer.
+
+    `jira_url` is the site's configured base URL, which issue links are built from, and `webhook_secret` the secret
+    its Jira webhook signs events with; webhooks for a tenant without one are rejected. `jira` is the site's
+    connection (anything with an async `aclose`), closed when the tenant stops.
+    """
+
+    def __init__(self, tenant_id: str, store: IssueStore, index: IssueIndex, syncer: JiraSyncer, jira_url: str = "",
+                 webhook_secret: str = "", jira=None):
+        self.tenant_id = tenant_id
+        self.store = store
+        self.index = index
+        self.syncer = syncer
+        self.jira_url = jira_url
+        self.webhook_secret = webhook_secret
+        self.jira = jira
+        self.coalescer = WebhookCoalescer(store)
+
+        self.created_at = time.monotonic()
+        self.loaded_at: Optional[float] = None
+        self.last_used = self.created_at
+
+    @property
+    def nbytes(self) -> int:
+        lexical = self.index.lexical_index.nbytes if self.index.lexical_index is not None else 0
+        return self.store.table.nbytes + self.index.vector_index.nbytes + self.index.embedding_cache.nbytes + lexical
+
+    async def start(self):
+        """Indexes any issues restored from disk and starts keeping the issue store in step with Jira."""
+        self.store.add_listener(self.index.on_store_change)
+        if len(self.store):
+            await asyncio.to_thread(self.index.sync, self.store.all())
+        self.syncer.start()
+
+    async def stop(self):
+        """Applies buffered webhook events, stops syncing and releases the shared file lock and the Jira connection."""
+        try:
+            await self.coalescer.flush()
+        except Exception as e:
+            logger.error("Dropped buffered webhook events of a stopping tenant", tenant=self.tenant_id, error=str(e))
+        await self.syncer.stop()
+        self.index.close()
+        if self.jira is not None:
+            await self.jira.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "issue_store": self.syncer.status(),
+            "embedding_cache": self.index.embedding_cache.stats(),
+            "vector_index": self.index.stats(),
+            "nbytes": self.nbytes,
+            "idle_seconds": time.monotonic() - self.last_used,
+        }
+
+
+class TenantRegistry:
+    """
+    Tenants built lazily on first use and evicted least recently used first under a memory budget.
+
+    `build` creates a tenant that has not been started. Once a tenant finishes its first Jira load, and after each of
+    its syncs, the registry stops and drops the least recently used loaded tenants until the combined size of their
+    issues, embeddings and indexes fits `memory_budget_bytes` again; the tenant just loaded or synced is never
+    evicted. An evicted tenant keeps its
+    embedding cache and issue snapshot on disk, so loading it again is mostly an incremental sync.
+    """
+
+    def __init__(
+            self,
+            build: Callable[[str], Awaitable[Tenant]],
+            memory_budget_bytes: int = int(TENANT_MEMORY_BUDGET_MB * 1024 * 1024)
+    ):
+        self._build = build
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self._tenants: OrderedDict[str, Tenant] = OrderedDict()
+        self._build_locks: dict[str, asyncio.Lock] = {}
+
+        self.hits = 0
+        self.cold_loads = 0
+        self.evictions = 0
+        self.cold_load_seconds_total = 0.0
+        self.cold_load_seconds_max = 0.0
+        self.cold_load_histogram = Counter()
+
+    def peek(self, tenant_id: str) -> Optional[Tenant]:
+        """Returns the tenant if it is resident, without building it or counting as a use."""
+        return self._tenants.get(tenant_id)
+
+    def resident(self) -> dict[str, Tenant]:
+        return dict(self._tenants)
+
+    async def start(self, tenant_id: str) -> Tenant:
+        """Builds and starts the tenant if it isn't resident, without waiting for its first load."""
+        tenant = self._tenants.get(tenant_id)
+        if tenant is not None:
+            return tenant
+
+        async with self._build_locks.setdefault(tenant_id, asyncio.Lock()):
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                tenant = await self._build(tenant_id)
+                # Syncs grow a tenant's store and index, so the budget is checked after each of them too
+                tenant.syncer.on_synced = lambda: self._evict(keep=tenant_id)
+                await tenant.start()
+                self._tenants[tenant_id] = tenant
+                logger.info("Started tenant", tenant=tenant_id, resident=len(self._tenants))
+            return tenant
+
+    async def get(self, tenant_id: str, timeout: Optional[float] = None) -> Tenant:
+        """
+        Returns the tenant once its issues are loaded, building it first if needed.
+
+        Raises `asyncio.TimeoutError` if the first load takes longer than `timeout`; the tenant keeps loading.
+        """
+        if tenant_id in self._tenants:
+            self.hits += 1
+        tenant = await self.start(tenant_id)
+        tenant.last_used = time.monotonic()
+        self._tenants.move_to_end(tenant_id)
+
+        await tenant.syncer.wait_until_loaded(timeout=timeout)
+        if tenant.loaded_at is None:
+            tenant.loaded_at = time.monotonic()
+            seconds = tenant.loaded_at - tenant.created_at
+            self.cold_loads += 1
+            self.cold_load_seconds_total += seconds
+            self.cold_load_seconds_max = max(self.cold_load_seconds_max, seconds)
+            self.cold_load_histogram[histogram_bucket(int(seconds * 1000))] += 1
+            logger.info("Loaded tenant", tenant=tenant_id, seconds=seconds, nbytes=tenant.nbytes)
+            await self._evict(keep=tenant_id)
+        return tenant
+
+    async def stop(self):
+        while self._tenants:
+            _, tenant = self._tenants.popitem(last=False)
+            await tenant.stop()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tenant.nbytes for tenant in self._tenants.values())
+
+    def stats(self) -> dict:
+        return {
+            "resident": len(self._tenants),
+            "nbytes": self.nbytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "hits": self.hits,
+            "cold_loads": self.cold_loads,
+            "evictions": self.evictions,
+            "cold_load_seconds_mean": self.cold_load_seconds_total / self.cold_loads if self.cold_loads else 0.0,
+            "cold_load_seconds_max": self.cold_load_seconds_max,
+            "cold_load_ms_histogram": dict(sorted(self.cold_load_histogram.items(), key=lambda b: int(b[0][2:]))),
+            "tenants": {tenant_id: tenant.stats() for tenant_id, tenant in self._tenants.items()},
+        }
+
+    async def _evict(self, keep: str):
+        while self.nbytes > self.memory_budget_bytes:
+            # Oldest first; tenants still on their first load are about to be used, so leave them alone
+            victim = next(
+                (tenant_id for tenant_id, tenant in self._tenants.items()
+                 if tenant_id != keep and tenant.loaded_at is not None),
+                None
+            )
+            if victim is None:
+                return
+            tenant = self._tenants.pop(victim)
+            await tenant.stop()
+            self.evictions += 1
+            logger.info("Evicted tenant", tenant=victim, nbytes=tenant.nbytes, resident=len(self._tenants))
@@ -0,0 +1,528 @@
+import threading
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+import structlog
+
+logger = structlog.getLogger(__name__)
+
+COMPRESSIONS = ("int8", "binary")
+
+# np.bitwise_count needs numpy 2.0
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class SearchResult(NamedTuple):
+    # Both lists hold (key, cosine similarity) pairs, best match first
+    top_k: list[tuple[str, float]]
+    above_threshold: list[tuple[str, float]]
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index keyed by Jira issue key.
+
+    Vectors are normalised on insert, so scoring is a single matrix-vector product. Small corpora are searched
+    exhaustively. Once the index holds `min_train_size` vectors it trains an IVF (inverted file) layer: every
+    vector is filed under its nearest k-means centroid and approximate queries only score the `n_probe`
+    closest lists. Passing `exact=True` to `search` always scores every vector, which is what recall is
+    measured against.
+
+    With `compression` set, a compact code of every vector is kept as well: `int8` (one byte per dimension plus a
+    per-vector scale) or `binary` (one sign bit per dimension). Queries score the codes first and only rescore the
+    surviving candidates against the full-precision rows, so those can live in a memory map that is paged in on
+    demand. The int8 pass keeps every row whose error bound could place it in the top k or above the threshold, so
+    results match uncompressed search; the binary pass rescores the `rescore_factor * k` best rows and every row
+    within `binary_margin` of the threshold, which is approximate.
+    """
+
+    def __init__(
+            self,
+            n_probe: int = 8,
+            min_train_size: int = 2048,
+            exact: bool = False,
+            kmeans_iterations: int = 10,
+            seed: int = 0,
+            compression: Optional[str] = None,
+            rescore_factor: int = 4,
+            binary_margin: float = 0.1
+    ):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r}, expected one of {', '.join(COMPRESSIONS)}")
+
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.exact = exact
+        self.kmeans_iterations = kmeans_iterations
+        self.compression = compression
+        self.rescore_factor = rescore_factor
+        self.binary_margin = binary_margin
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim), rows past `_size` are unused
+        self._size = 0
+        self._row_keys: list[Optional[str]] = []
+        self._row_tags: list[Optional[str]] = []
+        self._rows: dict[str, int] = {}
+        self._free_rows: list[int] = []
+
+        # Compressed codes, parallel to `_vectors` when `compression` is set
+        self._codes: Optional[np.ndarray] = None
+        self._code_steps: Optional[np.ndarray] = None  # int8 quantisation step per row
+
+        # IVF layer, empty until trained
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists: list[set[int]] = []
+        self._list_arrays: list[Optional[np.ndarray]] = []
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key: str):
+        return key in self._rows
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def tag(self, key: str) -> Optional[str]:
+        """Returns the opaque tag (e.g. a content hash) stored alongside `key`, if any."""
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else self._row_tags[row]
+
+    def upsert(self, key: str, vector: np.ndarray, tag: Optional[str] = None):
+        self.upsert_many([key], np.asarray(vector)[None, :], [tag])
+
+    def upsert_many(self, keys: Sequence[str], vectors: np.ndarray, tags: Optional[Sequence[Optional[str]]] = None):
+        if not len(keys):
+            return
+        vectors = self._normalise(np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1))
+        tags = tags if tags is not None else [None] * len(keys)
+
+        with self._lock:
+            if self._vectors is not None and vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+            self._make_writable()
+            rows = np.empty(len(keys), dtype=np.int64)
+            for i, (key, tag) in enumerate(zip(keys, tags)):
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._allocate_row(vectors.shape[1])
+                    self._rows[key] = row
+                    self._row_keys[row] = key
+                self._row_tags[row] = tag
+                rows[i] = row
+
+            self._vectors[rows] = vectors
+            if self.compression is not None:
+                self._codes[rows], steps = self._compress(vectors)
+                if steps is not None:
+                    self._code_steps[rows] = steps
+            if self._centroids is not None:
+                self._assign(rows)
+
+            self._maybe_train()
+
+    def delete(self, key: str) -> bool:
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys: Sequence[str]) -> int:
+        deleted = 0
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is None:
+                    continue
+                self._row_keys[row] = None
+                self._row_tags[row] = None
+                self._unassign(row)
+                self._free_rows.append(row)
+                deleted += 1
+        return deleted
+
+    def load(self, keys: Sequence[str], vectors: np.ndarray, tags: Optional[Sequence[Optional[str]]] = None):
+        """
+        Replaces the whole index with `vectors`, which must already be normalised.
+
+        The array is used as-is rather than copied, so a read-only `np.memmap` (float16 or float32) stays shared with
+        other processes. It is only copied into private memory if the index is later modified.
+        """
+        with self._lock:
+            self._vectors = vectors
+            self._size = len(keys)
+            self._row_keys = list(keys)
+            self._row_tags = list(tags) if tags is not None else [None] * len(keys)
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._free_rows = []
+            if self.compression is not None:
+                self._codes, self._code_steps = self._compress_blocks(vectors)
+
+            self._centroids = None
+            self._assignments = np.full(len(keys), -1, dtype=np.int32)
+            self._lists = []
+            self._list_arrays = []
+            self._trained_size = 0
+            self._maybe_train()
+
+    def export(self) -> tuple[list[str], list[Optional[str]], np.ndarray]:
+        """Returns the keys, tags and (normalised) vectors of every live row."""
+        with self._lock:
+            rows = self._live_rows()
+            vectors = self._vectors[rows] if len(rows) else np.empty((0, self.dim or 0), dtype=np.float32)
+            return [self._row_keys[r] for r in rows], [self._row_tags[r] for r in rows], vectors
+
+    @property
+    def nbytes(self) -> int:
+        """Private memory held by vectors and codes; a memory-mapped vector matrix is shared and not counted."""
+        total = 0
+        if self._vectors is not None and not isinstance(self._vectors, np.memmap):
+            total += self._vectors.nbytes
+        for array in (self._codes, self._code_steps):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+    def score_keys(self, query: np.ndarray, keys: Sequence[str]) -> list[tuple[str, float]]:
+        """Exact cosine similarity of `query` to each of `keys` held by the index, best first."""
+        query = self._normalise(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            present = [key for key in keys if key in self._rows]
+            if not present:
+                return []
+            rows = np.fromiter((self._rows[key] for key in present), dtype=np.int64, count=len(present))
+            scores = self._vectors[rows].astype(np.float32, copy=False) @ query
+            order = np.argsort(-scores, kind="stable")
+            return [(present[i], float(scores[i])) for i in order]
+
+    def search(
+            self,
+            query: np.ndarray,
+            k: Optional[int],
+            threshold: float,
+            exact: Optional[bool] = None
+    ) -> SearchResult:
+        """
+        Returns the `k` most similar keys and every key scoring at least `threshold` in a single pass.
+
+        In approximate mode both lists are restricted to the probed IVF lists.
+        """
+        query = self._normalise(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        exact = self.exact if exact is None else exact
+
+        with self._lock:
+            if not self._rows:
+                return SearchResult([], [])
+
+            if exact or (self._centroids is None and self.compression is None):
+                rows = np.arange(self._size)
+                scores = self._score_all(query[None, :])[0]
+            else:
+                rows = np.arange(self._size) if self._centroids is None else self._candidate_rows(query)
+                if self.compression is None:
+                    scores = self._vectors[rows].astype(np.float32, copy=False) @ query
+                else:
+                    approx, slack = self._approximate_scores(query[None, :], rows)
+                    rows = rows[self._select_candidates(approx[0], slack[0], k, threshold)]
+                    rows, scores = self._rescore(query, rows)
+            keys = self._row_keys
+
+            # Deleted rows score -inf in exact mode, so never take more than the number of live rows
+            k = min(len(rows), len(self._rows), len(rows) if k is None else k)
+            top = self._top_k(scores, k)
+            hit_positions = np.flatnonzero(scores >= threshold)
+            hit_positions = hit_positions[np.argsort(-scores[hit_positions], kind="stable")]
+
+            return SearchResult(
+                top_k=[(keys[rows[i]], float(scores[i])) for i in top],
+                above_threshold=[(keys[rows[i]], float(scores[i])) for i in hit_positions],
+            )
+
+    def search_batch(
+            self,
+            queries: np.ndarray,
+            ks: Sequence[Optional[int]],
+            threshold: float,
+            max_scores_per_chunk: int = 1 << 23
+    ) -> list[SearchResult]:
+        """
+        Exact search for many queries at once, returning one `SearchResult` per query in the same order.
+
+        Each chunk of queries is scored against every vector with a single matrix product, and per-row top-k uses
+        `argpartition` so only the head of each row is sorted. `max_scores_per_chunk` bounds the score matrix size.
+        A compressed index scores the chunk against the codes instead and rescores each query's candidates.
+        """
+        queries = self._normalise(np.asarray(queries, dtype=np.float32).reshape(len(ks), -1))
+
+        with self._lock:
+            if not self._rows:
+                return [SearchResult([], []) for _ in ks]
+
+            num_live = len(self._rows)
+            ks = [num_live if k is None else max(0, min(k, num_live)) for k in ks]
+            chunk_size = max(1, max_scores_per_chunk // self._size)
+
+            results = []
+            if self.compression is not None and not self.exact:
+                rows = np.arange(self._size)
+                for start in range(0, len(ks), chunk_size):
+                    chunk = queries[start:start + chunk_size]
+                    approx, slack = self._approximate_scores(chunk, rows)
+                    for query, row_approx, row_slack, k in zip(chunk, approx, slack, ks[start:start + chunk_size]):
+                        candidates = self._select_candidates(row_approx, row_slack, k, threshold)
+                        candidates, scores = self._rescore(query, candidates)
+                        top = self._top_k(scores, min(k, len(candidates)))
+                        hits = np.flatnonzero(scores >= threshold)
+                        hits = hits[np.argsort(-scores[hits], kind="stable")]
+                        results.append(SearchResult(
+                            top_k=[(self._row_keys[candidates[i]], float(scores[i])) for i in top],
+                            above_threshold=[(self._row_keys[candidates[i]], float(scores[i])) for i in hits],
+                        ))
+                return results
+
+            for start in range(0, len(ks), chunk_size):
+                chunk_ks = ks[start:start + chunk_size]
+                scores = self._score_all(queries[start:start + chunk_size])
+                top = self._top_k_rows(scores, max(chunk_ks))
+
+                for row_scores, row_top, k in zip(scores, top, chunk_ks):
+                    hits = np.flatnonzero(row_scores >= threshold)
+                    hits = hits[np.argsort(-row_scores[hits], kind="stable")]
+                    results.append(SearchResult(
+                        top_k=[(self._row_keys[j], float(row_scores[j])) for j in row_top[:k]],
+                        above_threshold=[(self._row_keys[j], float(row_scores[j])) for j in hits],
+                    ))
+            return results
+
+    def measure_recall(self, queries: np.ndarray, k: int) -> float:
+        """Average recall@k of approximate search against exact search for the given query vectors."""
+        recalls = []
+        for query in np.atleast_2d(queries):
+            exact = {key for key, _ in self.search(query, k, threshold=np.inf, exact=True).top_k}
+            approx = {key for key, _ in self.search(query, k, threshold=np.inf, exact=False).top_k}
+            if exact:
+                recalls.append(len(exact & approx) / len(exact))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < len(scores):
+            # argpartition avoids sorting the whole score vector when only the head is needed
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    @staticmethod
+    def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+        """Row-wise `_top_k` for a 2-D score matrix."""
+        if k <= 0:
+            return np.empty((len(scores), 0), dtype=np.int64)
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1)
+
+    def _allocate_row(self, dim: int) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+
+        if self._vectors is None:
+            self._vectors = np.empty((64, dim), dtype=np.float32)
+            self._assignments = np.full(64, -1, dtype=np.int32)
+            if self.compression is not None:
+                self._codes, self._code_steps = self._compress(np.zeros((64, dim), dtype=np.float32))
+        elif self._size == len(self._vectors):
+            capacity = 2 * len(self._vectors)
+            vectors = np.empty((capacity, dim), dtype=np.float32)
+            vectors[:self._size] = self._vectors[:self._size]
+            self._vectors = vectors
+            self._assignments = np.concatenate(
+                [self._assignments, np.full(capacity - len(self._assignments), -1, dtype=np.int32)]
+            )
+            if self.compression is not None:
+                codes = np.zeros((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+                codes[:self._size] = self._codes[:self._size]
+                self._codes = codes
+                if self._code_steps is not None:
+                    steps = np.zeros(capacity, dtype=np.float32)
+                    steps[:self._size] = self._code_steps[:self._size]
+                    self._code_steps = steps
+
+        row = self._size
+        self._size += 1
+        self._row_keys.append(None)
+        self._row_tags.append(None)
+        return row
+
+    def _live_rows(self) -> np.ndarray:
+        return np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+
+    def _score_all(self, queries: np.ndarray, block_rows: int = 16384) -> np.ndarray:
+        """
+        Scores `queries` against every row, with deleted rows set to -inf.
+
+        float16 storage is upcast one block of rows at a time, so a shared half-precision matrix is never copied whole.
+        """
+        vectors = self._vectors[:self._size]
+        if vectors.dtype == np.float32:
+            scores = queries @ vectors.T
+        else:
+            scores = np.empty((len(queries), self._size), dtype=np.float32)
+            for start in range(0, self._size, block_rows):
+                block = vectors[start:start + block_rows].astype(np.float32)
+                scores[:, start:start + block_rows] = queries @ block.T
+
+        if self._free_rows:
+            scores[:, self._free_rows] = -np.inf
+        return scores
+
+    def _compress(self, vectors: np.ndarray) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """Codes (and int8 quantisation steps) for normalised float vectors."""
+        vectors = vectors.astype(np.float32, copy=False)
+        if self.compression == "binary":
+            return np.packbits(vectors > 0, axis=1), None
+        steps = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        return np.rint(vectors / steps[:, None]).astype(np.int8), steps.astype(np.float32)
+
+    def _compress_blocks(self, vectors: np.ndarray, block_rows: int = 16384):
+        # Memory-mapped input is read one block at a time rather than upcast whole
+        blocks = [self._compress(vectors[start:start + block_rows]) for start in range(0, len(vectors), block_rows)]
+        if not blocks:
+            return self._compress(np.zeros((0, vectors.shape[1]), dtype=np.float32))
+        codes = np.concatenate([codes for codes, _ in blocks])
+        steps = None if self.compression == "binary" else np.concatenate([steps for _, steps in blocks])
+        return codes, steps
+
+    def _approximate_scores(
+            self,
+            queries: np.ndarray,
+            rows: np.ndarray,
+            block_rows: int = 16384
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Scores `queries` against the codes of `rows`, returning the estimates and how far each may be off.
+
+        For int8 the slack is a hard bound: each dimension is off by at most half a step, so the dot product is off by
+        at most `step * |query|_1 / 2`. For binary it is `binary_margin`, which only covers typical errors.
+        """
+        approx = np.empty((len(queries), len(rows)), dtype=np.float32)
+        if self.compression == "binary":
+            packed = np.packbits(queries > 0, axis=1)
+            popcount = np.bitwise_count if hasattr(np, "bitwise_count") else _POPCOUNT.__getitem__
+            for start in range(0, len(rows), block_rows):
+                codes = self._codes[rows[start:start + block_rows]]
+                for i, query_bits in enumerate(packed):
+                    hamming = popcount(codes ^ query_bits).sum(axis=1, dtype=np.int32)
+                    # Sign bits agree on a fraction 1 - angle / pi of dimensions for random vectors
+                    approx[i, start:start + block_rows] = np.cos(np.pi * hamming / self.dim)
+            slack = np.full_like(approx, self.binary_margin)
+        else:
+            steps = self._code_steps[rows]
+            for start in range(0, len(rows), block_rows):
+                codes = self._codes[rows[start:start + block_rows]].astype(np.float32)
+                approx[:, start:start + block_rows] = queries @ codes.T
+            approx *= steps
+            slack = np.abs(queries).sum(axis=1, keepdims=True) * steps / 2
+
+        if self._free_rows:
+            approx[:, np.isin(rows, self._free_rows)] = -np.inf
+        return approx, slack
+
+    def _select_candidates(self, approx: np.ndarray, slack: np.ndarray, k: Optional[int], threshold: float) -> np.ndarray:
+        """Positions into `approx` worth rescoring for a top-`k` and `threshold` query."""
+        live = np.isfinite(approx)
+        keep = live & (approx + slack >= threshold)
+        num_live = int(live.sum())
+        k = num_live if k is None else min(k, num_live)
+
+        if k > 0 and self.compression == "int8":
+            # Anything whose upper bound reaches the k-th best lower bound could still be in the exact top k
+            lower = approx - slack
+            kth = np.partition(lower, len(lower) - k)[len(lower) - k]
+            keep |= live & (approx + slack >= kth)
+        elif k > 0:
+            keep[self._top_k(approx, min(num_live, k * self.rescore_factor))] = True
+        return np.flatnonzero(keep)
+
+    def _rescore(self, query: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Sorted rows read a memory-mapped matrix in file order
+        rows = np.sort(rows)
+        return rows, self._vectors[rows].astype(np.float32, copy=False) @ query
+
+    def _make_writable(self):
+        # Copy-on-write for matrices handed to `load`, e.g. read-only memory maps
+        if self._vectors is not None and (not self._vectors.flags.writeable or self._vectors.dtype != np.float32):
+            self._vectors = np.array(self._vectors, dtype=np.float32)
+
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        probe = self._top_k(self._centroids @ query, min(self.n_probe, len(self._centroids)))
+        for list_id in probe:
+            if self._list_arrays[list_id] is None:
+                self._list_arrays[list_id] = np.fromiter(self._lists[list_id], dtype=np.int64)
+        return np.concatenate([self._list_arrays[list_id] for list_id in probe])
+
+    def _maybe_train(self):
+        # (Re)train once the corpus reaches the training size, and again whenever it has grown 4x since
+        num_vectors = len(self._rows)
+        if num_vectors < self.min_train_size or num_vectors < 4 * self._trained_size:
+            return
+
+        rows = self._live_rows()
+        n_lists = max(1, int(np.sqrt(num_vectors)))
+        sample = rows if len(rows) <= 64 * n_lists else self._rng.choice(rows, 64 * n_lists, replace=False)
+        data = self._vectors[sample].astype(np.float32)
+
+        centroids = data[self._rng.choice(len(data), n_lists, replace=False)]
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = data[labels == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+            centroids = self._normalise(centroids)
+
+        self._centroids = centroids
+        self._lists = [set() for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._assignments[:] = -1
+        self._assign(rows)
+        self._trained_size = num_vectors
+        logger.info("Trained IVF index", num_vectors=num_vectors, n_lists=n_lists)
+
+    def _assign(self, rows: np.ndarray, block_rows: int = 16384):
+        if not len(rows):
+            return
+        labels = np.concatenate([
+            np.argmax(self._vectors[rows[start:start + block_rows]].astype(np.float32) @ self._centroids.T, axis=1)
+            for start in range(0, len(rows), block_rows)
+        ])
+        for row, list_id in zip(rows, labels):
+            self._unassign(row)
+            self._lists[list_id].add(int(row))
+            self._list_arrays[list_id] = None
+            self._assignments[row] = list_id
+
+    def _unassign(self, row: int):
+        list_id = self._assignments[row] if row < len(self._assignments) else -1
+        if list_id >= 0:
+            self._lists[list_id].discard(int(row))
+            self._list_arrays[list_id] = None
+            self._assignments[row] = -1
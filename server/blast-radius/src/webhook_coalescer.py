@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import structlog
+
+from .data_models.jira import JiraIssues
+from .issue_store import IssueStore
+
+logger = structlog.getLogger(__name__)
+
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "2"))
+WEBHOOK_MAX_DELAY_SECONDS = float(os.getenv("WEBHOOK_MAX_DELAY_SECONDS", "10"))
+
+
+class WebhookCoalescer:
+    """
+    Buffers Jira issue events and applies only the latest state of each issue to the store.
+
+    A burst of events (e.g. a bulk edit) is flushed once no new event has arrived for `debounce_seconds`, or at the
+    latest `max_delay_seconds` after the first buffered event, so an issue edited many times in a row is re-encoded
+    once. Events a failed flush did not apply are buffered again and retried after `debounce_seconds`.
+    """
+
+    def __init__(
+            self,
+            store: IssueStore,
+            debounce_seconds: float = WEBHOOK_DEBOUNCE_SECONDS,
+            max_delay_seconds: float = WEBHOOK_MAX_DELAY_SECONDS
+    ):
+        self.store = store
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+        # Issue key -> latest issue, or None when the latest event was a deletion
+        self._pending: dict[str, Optional[JiraIssues.JiraIssue]] = {}
+        self._first_event_time = 0.0
+        self._last_event_time = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.received = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.failures = 0
+
+    def submit(self, key: str, issue: Optional[JiraIssues.JiraIssue]):
+        now = time.monotonic()
+        if not self._pending:
+            self._first_event_time = now
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = issue
+        self._last_event_time = now
+        self.received += 1
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_when_settled())
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        upserted = [issue for issue in pending.values() if issue is not None]
+        deleted = [key for key, issue in pending.items() if issue is None]
+        try:
+            # Store listeners re-encode changed issues, so keep that work off the event loop
+            await asyncio.to_thread(self.store.upsert, upserted)
+            await asyncio.to_thread(self.store.delete, deleted)
+        except BaseException:
+            self.failures += 1
+            # Re-applying an upsert that did go through is a no-op; events that arrived meanwhile are newer and win
+            if not self._pending:
+                self._first_event_time = time.monotonic()
+            self._pending = {**pending, **self._pending}
+            raise
+        self.applied += len(pending)
+        logger.info("Applied Jira webhook events", upserted=len(upserted), deleted=len(deleted))
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "failures": self.failures,
+            "pending": len(self._pending),
+        }
+
+    async def _flush_when_settled(self):
+        while self._pending:
+            now = time.monotonic()
+            deadline = min(self._last_event_time + self.debounce_seconds,
+                           self._first_event_time + self.max_delay_seconds)
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to apply Jira webhook events, retrying", error=str(e),
+                             pending=len(self._pending))
+                await asyncio.sleep(self.debounce_seconds)
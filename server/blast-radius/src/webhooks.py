@@ -0,0 +1,64 @@
+import hashlib
+import hmac
+import json
+from typing import Optional
+
+import structlog
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+
+from .calculate import tenants
+from .data_models.jira import JiraIssues
+from .tenants import DEFAULT_TENANT
+
+logger = structlog.getLogger(__name__)
+jira_webhook_router = APIRouter()
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str):
+    """Checks the `X-Hub-Signature` header Jira signs the webhook's events with, using the tenant's secret."""
+    if not secret:
+        raise HTTPException(status_code=403, detail="No webhook secret is configured for this tenant")
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(signature, expected):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+
+@jira_webhook_router.post("/jira", status_code=202)
+async def receive_jira_webhook(request: Request, tenant: str = DEFAULT_TENANT):
+    # Tenants that aren't loaded catch up with an incremental sync when they next are
+    resident = tenants.peek(tenant)
+    if resident is None:
+        return {"accepted": False, "reason": f"Tenant {tenant!r} is not loaded"}
+
+    body = await request.body()
+    verify_signature(body, request.headers.get("X-Hub-Signature"), resident.webhook_secret)
+
+    try:
+        payload = json.loads(body)
+        event = payload.get("webhookEvent", "")
+        raw_issue = payload["issue"]
+        key = raw_issue["key"]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Expected a Jira issue webhook payload")
+
+    coalescer = resident.coalescer
+
+    if event == "jira:issue_deleted":
+        coalescer.submit(key, None)
+    elif event in ("jira:issue_created", "jira:issue_updated"):
+        try:
+            # Links point at the tenant's configured site, never at a URL taken from the payload
+            issue = JiraIssues.JiraIssue.from_api(raw_issue, resident.jira_url)
+        except (ValidationError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Could not parse Jira issue: {e}")
+        coalescer.submit(issue.key, issue)
+    else:
+        return {"accepted": False, "reason": f"Ignored event {event!r}"}
+
+    return {"accepted": True, "pending": coalescer.stats()["pending"]}
+
+
+@jira_webhook_router.get("/jira/stats")
+async def get_webhook_stats():
+    return {tenant_id: tenant.coalescer.stats() for tenant_id, tenant in tenants.resident().items()}
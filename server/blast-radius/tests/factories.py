@@ -0,0 +1,21 @@
+"""Small Jira objects and a stand-in encoder for tests."""
+import hashlib
+
+import numpy as np
+
+from src.data_models.jira import JiraIssues
+
+
+def make_issue(number: int, summary: str = "Checkout fails", description: str = "",
+               issue_type: str = "Bug") -> JiraIssues.JiraIssue:
+    return JiraIssues.JiraIssue(issue_id=number, key=f"PROJ-{number}", summary=summary, description=description,
+                                issue_type=issue_type, URL=f"https://jira.example.com/browse/PROJ-{number}")
+
+
+def hash_encode(texts: list[str], dim: int = 16) -> np.ndarray:
+    """Deterministic stand-in for the sentence encoder: unit vectors seeded by a hash of each text."""
+    vectors = np.stack([
+        np.random.default_rng(int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)).standard_normal(dim)
+        for text in texts
+    ]) if texts else np.empty((0, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32) if texts else vectors
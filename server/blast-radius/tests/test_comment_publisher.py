@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+
+from benchmarks.jira_stub import create_app
+from src.comment_publisher import CommentPublisher
+from src.jira_client import JiraClient
+
+
+def publish(stub, batches: list[list[tuple[str, str]]], **kwargs) -> tuple[list[list], CommentPublisher]:
+    async def run():
+        client = JiraClient("https://jira.example.com", "bot@example.com", "token",
+                            transport=httpx.ASGITransport(app=stub))
+        publisher = CommentPublisher(client, **kwargs)
+        try:
+            return [await publisher.publish(batch) for batch in batches], publisher
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_the_same_comment_is_posted_once_per_issue():
+    stub = create_app(num_issues=5)
+    (first, second), publisher = publish(stub, [
+        [("SYN-1", "Related: PROJ-2"), ("SYN-1", "Related: PROJ-2"), ("SYN-2", "Related: PROJ-2")],
+        [("SYN-1", "Related: PROJ-2")],
+    ])
+
+    assert [result.duplicate for result in first] == [False, True, False]
+    assert first[1].comment_id == first[0].comment_id
+    assert second[0].duplicate and second[0].comment_id == first[0].comment_id
+    assert len(stub.state.comments) == 2
+    assert publisher.stats() == {"submitted": 4, "duplicates": 2, "posted": 2, "failed": 0, "in_flight": 0}
+
+
+def test_rate_limited_posts_are_retried():
+    stub = create_app(num_issues=5, comment_rate_limit_every=2, retry_after=0.01)
+    (results,), publisher = publish(stub, [[(f"SYN-{i}", "Looks related") for i in range(1, 5)]], max_concurrency=2)
+
+    assert all(result.posted for result in results)
+    assert len(stub.state.comments) == 4
+    assert stub.state.requests["comments_throttled"] > 0
+    assert publisher.failed == 0
+
+
+def test_failed_posts_are_reported_and_can_be_retried():
+    stub = create_app(num_issues=5, comment_rate_limit_every=1, retry_after=0)
+
+    async def run():
+        client = JiraClient("https://jira.example.com", "bot@example.com", "token", max_retries=1,
+                            transport=httpx.ASGITransport(app=stub))
+        publisher = CommentPublisher(client)
+        try:
+            failed = await publisher.submit("SYN-1", "Looks related")
+            return failed, publisher._posted
+        finally:
+            await client.aclose()
+
+    failed, posted = asyncio.run(run())
+    assert not failed.posted and failed.status_code == 429
+    assert not posted
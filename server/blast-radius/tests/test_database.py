@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from benchmarks.firestore_stub import InMemoryFirestore, make_settings
+from src.database import DatabaseService, SettingsCache
+
+
+def service(cache: SettingsCache, num_users: int = 3) -> tuple[DatabaseService, InMemoryFirestore]:
+    db = InMemoryFirestore(make_settings(num_users))
+    return DatabaseService(db=db, cache=cache), db
+
+
+def test_settings_are_read_once_per_document():
+    db_service, db = service(SettingsCache(watch=False))
+
+    async def run():
+        await asyncio.gather(*(db_service.get_jira_credentials("user-1") for _ in range(20)))
+        return await db_service.get_prompt_templates("user-1")
+
+    templates = asyncio.run(run())
+    assert templates.system_instructions == "Instructions for user 1"
+    assert db.reads == 1
+
+
+def test_edits_reach_the_cache_through_the_listener():
+    cache = SettingsCache(ttl_seconds=3600)
+    db_service, db = service(cache)
+
+    async def run():
+        await db_service.get_prompt_templates("user-0")
+        db.collection("settings").document("user-0").update({"systemInstructions": "Edited"})
+        return await db_service.get_prompt_templates("user-0")
+
+    assert asyncio.run(run()).system_instructions == "Edited"
+    assert cache.reads == 1
+
+
+def test_invalidate_rereads_the_document():
+    cache = SettingsCache(watch=False)
+    db_service, db = service(cache)
+
+    async def run():
+        await db_service.get_jira_credentials("user-0")
+        db.collection("settings").document("user-0").update({"jiraDomain": "https://moved.atlassian.net"})
+        db_service.invalidate_settings("user-0")
+        return await db_service.get_jira_credentials("user-0")
+
+    assert asyncio.run(run())["jira_domain"] == "https://moved.atlassian.net"
+    assert cache.invalidations == 1
+    assert db.reads == 2
+
+
+def test_entries_expire_after_the_ttl():
+    db_service, db = service(SettingsCache(ttl_seconds=0.05, watch=False))
+
+    async def run():
+        await db_service.get_jira_credentials("user-2")
+        db.collection("settings").document("user-2").update({"jiraEmail": "new@example.com"})
+        cached = await db_service.get_jira_credentials("user-2")
+        time.sleep(0.06)
+        return cached, await db_service.get_jira_credentials("user-2")
+
+    cached, refreshed = asyncio.run(run())
+    assert cached["jira_email"] == "user-2@example.com"
+    assert refreshed["jira_email"] == "new@example.com"
+    assert db.reads == 2
+
+
+def test_listeners_are_capped_to_the_most_recently_used_documents():
+    cache = SettingsCache(max_watches=2)
+    db_service, db = service(cache, num_users=5)
+
+    async def run():
+        for user in ("user-0", "user-1", "user-2"):
+            await db_service.get_jira_credentials(user)
+        await db_service.get_jira_credentials("user-1")
+        await db_service.get_jira_credentials("user-3")
+
+    asyncio.run(run())
+    assert cache.stats()["watched"] == 2
+    assert set(cache._watches) == {"settings/user-1", "settings/user-3"}
+    assert sum(len(watches) for watches in db._listeners.values()) == 2
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache
+
+from .factories import hash_encode, make_issue
+
+
+def count_saves(monkeypatch) -> list:
+    saves = []
+    original = np.savez
+
+    def savez(*args, **kwargs):
+        saves.append(threading.get_ident())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(np, "savez", savez)
+    return saves
+
+
+def test_changes_are_saved_in_batches(tmp_path, monkeypatch):
+    cache = EmbeddingCache("test-model", str(tmp_path), save_interval_seconds=3600)
+    saves = count_saves(monkeypatch)
+
+    cache.get_embeddings([make_issue(1)], hash_encode)
+    for number in range(2, 6):
+        cache.get_embeddings([make_issue(number)], hash_encode)
+    cache.get_embeddings([make_issue(1)], hash_encode)
+    assert len(saves) == 1
+
+    cache.save()
+    cache.save()
+    assert len(saves) == 2
+
+    reloaded = EmbeddingCache("test-model", str(tmp_path))
+    reloaded.get_embeddings([make_issue(number) for number in range(1, 6)], hash_encode)
+    assert reloaded.stats()["hits"] == 5
+
+
+def test_concurrent_saves_use_their_own_temporary_files(tmp_path):
+    cache = EmbeddingCache("test-model", str(tmp_path), save_interval_seconds=0)
+    errors = []
+
+    def encode_and_save(offset: int):
+        try:
+            for number in range(offset, offset + 20):
+                cache.get_embeddings([make_issue(number)], hash_encode)
+                cache.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=encode_and_save, args=(offset,)) for offset in range(0, 160, 20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+    reloaded = EmbeddingCache("test-model", str(tmp_path))
+    reloaded.get_embeddings([make_issue(number) for number in range(160)], hash_encode)
+    assert reloaded.stats()["hits"] == 160
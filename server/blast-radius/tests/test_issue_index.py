@@ -0,0 +1,35 @@
+import pytest
+
+from src.embedding_cache import EmbeddingCache
+from src.issue_index import IssueIndex
+from src.vector_index import VectorIndex
+
+from .factories import hash_encode, make_issue
+
+SUMMARIES = ["Checkout fails with expired card", "Payment gateway timeout", "Search results are slow",
+             "Dark mode colours", "Gateway returns 502 during checkout"]
+
+
+@pytest.fixture(params=["rrf", "prefilter"])
+def index(request, tmp_path):
+    index = IssueIndex(encode=hash_encode, embedding_cache=EmbeddingCache("test-model", str(tmp_path)),
+                       vector_index=VectorIndex(), retrieval=request.param)
+    index.upsert([make_issue(number, summary) for number, summary in enumerate(SUMMARIES, start=1)])
+    return index
+
+
+def test_hybrid_search_without_k_returns_every_candidate(index):
+    query = hash_encode(["checkout gateway"])[0]
+    result = index.search(query, k=None, threshold=-1.0, text="checkout gateway")
+    limited = index.search(query, k=1, threshold=-1.0, text="checkout gateway")
+
+    expected = len(SUMMARIES) if index.retrieval == "rrf" else 3
+    assert len(result.top_k) == expected
+    assert len(limited.top_k) == 1
+
+
+def test_hybrid_batch_search_without_k(index):
+    queries = hash_encode(["checkout gateway", "dark mode"])
+    results = index.search_batch(queries, ks=[None, 2], threshold=-1.0, texts=["checkout gateway", "dark mode"])
+    assert len(results[0].top_k) == (len(SUMMARIES) if index.retrieval == "rrf" else 3)
+    assert len(results[1].top_k) <= 2
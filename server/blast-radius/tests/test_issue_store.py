@@ -0,0 +1,46 @@
+import os
+import threading
+import time
+
+from src.issue_store import IssueStore
+from tests.factories import make_issue
+
+
+def test_snapshot_is_written_only_when_issues_changed(tmp_path):
+    path = str(tmp_path / "store.json")
+    store = IssueStore(snapshot_path=path)
+    store.upsert([make_issue(1), make_issue(2)])
+    store.mark_synced(100.0)
+    written = os.stat(path).st_mtime_ns
+
+    # A sync that brings nothing new leaves the snapshot alone
+    store.upsert([make_issue(1)])
+    store.mark_synced(200.0)
+    assert os.stat(path).st_mtime_ns == written
+
+    store.upsert([make_issue(1, "Checkout times out")])
+    store.mark_synced(300.0)
+    restored = IssueStore(snapshot_path=path)
+    assert restored.get("PROJ-1").summary == "Checkout times out"
+    assert restored.last_sync_time == 300.0
+
+
+def test_listeners_see_changes_in_the_order_they_were_made():
+    store = IssueStore()
+    seen = []
+
+    def slow_listener(upserted, deleted):
+        # The first change is slow to index; the second must still reach the listener after it
+        if upserted and upserted[0].summary == "first":
+            time.sleep(0.1)
+        seen.extend([issue.summary for issue in upserted] + [f"-{key}" for key in deleted])
+
+    store.add_listener(slow_listener)
+    first = threading.Thread(target=store.upsert, args=([make_issue(1, "first")],))
+    first.start()
+    time.sleep(0.02)
+    store.upsert([make_issue(1, "second")])
+    first.join()
+
+    assert seen == ["first", "second"]
+    assert store.get("PROJ-1").summary == "second"
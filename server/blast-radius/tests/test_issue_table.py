@@ -0,0 +1,50 @@
+from src.issue_table import IssueTable
+
+from .factories import make_issue
+
+
+def test_rows_round_trip_to_issues():
+    table = IssueTable()
+    issue = make_issue(1, summary="Crash on Ünïcode input", description="Steps: paste ✓")
+    table.upsert(issue)
+
+    assert "PROJ-1" in table
+    assert table.get("PROJ-1") == issue
+    assert table.matches(issue)
+    assert list(table.records()) == [issue.model_dump()]
+    assert table.get("PROJ-2") is None
+
+
+def test_upsert_overwrites_and_delete_reuses_rows():
+    table = IssueTable()
+    for number in range(1, 4):
+        table.upsert(make_issue(number))
+    table.upsert(make_issue(2, summary="Checkout fails on retry"))
+
+    assert len(table) == 3
+    assert table.get("PROJ-2").summary == "Checkout fails on retry"
+    assert not table.matches(make_issue(2))
+
+    assert table.delete("PROJ-1")
+    assert not table.delete("PROJ-1")
+    table.upsert(make_issue(4, issue_type="Story"))
+    assert sorted(table.keys()) == ["PROJ-2", "PROJ-3", "PROJ-4"]
+    assert table.get("PROJ-4").issue_type == "Story"
+    assert len(table._keys) == 3
+
+
+def test_urls_not_ending_with_the_key_are_kept_whole():
+    table = IssueTable()
+    issue = make_issue(1).model_copy(update={"URL": "https://jira.example.com/issues/1"})
+    table.upsert(issue)
+    assert table.get("PROJ-1").URL == "https://jira.example.com/issues/1"
+
+
+def test_rewrites_are_compacted_away():
+    table = IssueTable()
+    table.upsert(make_issue(1))
+    before = table.nbytes
+    for i in range(100):
+        table.upsert(make_issue(1, description=f"revision {i}"))
+    assert len(table._text) < 2 * len(make_issue(1, description="revision 99").description + "Checkout fails") + 1
+    assert table.nbytes < before + 200
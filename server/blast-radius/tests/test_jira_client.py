@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.jira_stub import create_app
+from src.jira_client import JiraClient
+
+
+def client_for(stub, **kwargs) -> JiraClient:
+    return JiraClient("https://jira.example.com", "bot@example.com", "token",
+                      transport=httpx.ASGITransport(app=stub), **kwargs)
+
+
+def search(client: JiraClient) -> list[dict]:
+    async def run():
+        try:
+            return await client.search()
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("pagination", ["offset", "token"])
+def test_search_reads_every_page(pagination):
+    stub = create_app(num_issues=250, max_results_cap=40)
+    issues = search(client_for(stub, page_size=100, pagination=pagination))
+
+    assert len(issues) == 250
+    assert len({issue["key"] for issue in issues}) == 250
+    # Jira capped the page size at 40, so 7 pages were needed either way
+    assert stub.state.requests["total"] == 7
+
+
+def test_throttled_requests_are_retried_after_the_given_delay():
+    stub = create_app(num_issues=30, max_results_cap=10, rate_limit_every=2, retry_after=0.05)
+    client = client_for(stub, page_size=10, max_concurrency=1, pagination="token")
+
+    started = time.monotonic()
+    issues = search(client)
+    elapsed = time.monotonic() - started
+
+    assert len(issues) == 30
+    assert stub.state.requests["throttled"] >= 2
+    assert stub.state.requests["total"] == 3 + stub.state.requests["throttled"]
+    assert elapsed >= 0.05 * stub.state.requests["throttled"]
+    assert JiraClient._retry_delay(httpx.Response(429, headers={"Retry-After": "0.05"}), attempt=3) == 0.05
+
+
+def test_requests_fail_once_retries_run_out():
+    stub = create_app(num_issues=5, rate_limit_every=1, retry_after=0)
+    with pytest.raises(httpx.HTTPStatusError):
+        search(client_for(stub, max_retries=2))
+    assert stub.state.requests["total"] == 3
@@ -0,0 +1,39 @@
+from src.lexical_index import LexicalIndex, mentioned_keys
+
+from .factories import make_issue
+
+
+def make_index() -> LexicalIndex:
+    index = LexicalIndex()
+    index.upsert([
+        make_issue(1, summary="Checkout fails with expired card", description="Payment gateway returns 402"),
+        make_issue(2, summary="Search results are slow", description="Elasticsearch query takes seconds"),
+        make_issue(3, summary="Dark mode colours", description="Contrast too low in settings"),
+        make_issue(4, summary="Gateway timeout on payment", description="Payment gateway times out"),
+    ])
+    return index
+
+
+def test_bm25_ranks_documents_sharing_rare_terms_first():
+    index = make_index()
+    keys = [key for key, _ in index.search("payment gateway timeout", n=3)]
+    assert keys[0] == "PROJ-4"
+    assert set(keys) == {"PROJ-1", "PROJ-4"}
+    assert index.search("payment", n=0) == []
+    assert index.search("unrelated words", n=5) == []
+
+
+def test_updates_and_deletes_change_the_postings():
+    index = make_index()
+    index.upsert([make_issue(3, summary="Elasticsearch cluster red")])
+    assert {key for key, _ in index.search("elasticsearch", n=5)} == {"PROJ-2", "PROJ-3"}
+    assert index.search("contrast", n=5) == []
+
+    index.delete(["PROJ-2", "PROJ-3", "PROJ-9"])
+    assert len(index) == 2
+    assert index.search("elasticsearch", n=5) == []
+    assert index.stats()["documents"] == 2
+
+
+def test_mentioned_keys_keeps_first_mention_order():
+    assert mentioned_keys("Fixes PROJ-12, see also AB_2-7 and PROJ-12 again; not proj-3 or X-1") == ["PROJ-12", "AB_2-7"]
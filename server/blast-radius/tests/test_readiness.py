@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import calculate
+from src.encoders import LazyEncoder
+from src.main import app
+
+
+@pytest.fixture
+def broken_encoder(monkeypatch):
+    encoder = LazyEncoder("test-model", backend="missing", warmup=False)
+    monkeypatch.setattr(calculate, "model", encoder)
+    return encoder
+
+
+def test_failed_encoder_load_is_logged_and_reported(broken_encoder, capsys):
+    asyncio.run(calculate._load_encoder())
+    assert "Encoder failed to load" in capsys.readouterr().out
+
+    response = TestClient(app).get("/ready")
+    assert response.status_code == 503
+    status = response.json()
+    assert not status["ready"]
+    assert status["error"] == f"Encoder failed to load: {status['encoder']['error']}"
+    assert "Unknown encoder backend 'missing'" in status["encoder"]["error"]
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+from src.data_models.jira import JiraIssues
+from src.embedding_cache import EmbeddingCache
+from src.embedding_file import SharedEmbeddingFile
+from src.issue_index import IssueIndex
+from src.issue_store import IssueStore
+from src.jira_client import JiraClient
+from src.sync import JiraSyncer
+from src.tenants import Tenant, TenantRegistry
+from src.vector_index import VectorIndex
+from tests.factories import hash_encode, make_issue
+
+
+class FakeJira:
+    def __init__(self, issues: list):
+        self.issues = issues
+        self.closed = False
+
+    async def get_all(self, jql: str = ""):
+        return list(self.issues)
+
+    async def get_keys(self):
+        return {issue.key for issue in self.issues}
+
+    async def aclose(self):
+        self.closed = True
+
+
+def make_index(tmp_path, name: str, shared_dir=None, issues=None) -> IssueIndex:
+    shared_file = SharedEmbeddingFile(str(shared_dir), "test-model") if shared_dir else None
+    return IssueIndex(encode=hash_encode, embedding_cache=EmbeddingCache("test-model", str(tmp_path / name)),
+                      vector_index=VectorIndex(), shared_file=shared_file, poll_seconds=0, issues=issues)
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_evicted_tenant_releases_its_lock_and_jira_client(tmp_path):
+    jiras = {"a": FakeJira([make_issue(1)]), "b": FakeJira([make_issue(2)])}
+
+    async def build(tenant_id: str) -> Tenant:
+        store = IssueStore()
+        index = make_index(tmp_path, tenant_id, shared_dir=tmp_path / "shared" / tenant_id, issues=store.table)
+        syncer = JiraSyncer(store, jiras[tenant_id].get_all, jiras[tenant_id].get_keys, interval_seconds=0.05)
+        return Tenant(tenant_id, store, index, syncer, jira=jiras[tenant_id])
+
+    async def run():
+        registry = TenantRegistry(build, memory_budget_bytes=10 ** 9)
+        a = await registry.get("a")
+        await registry.get("b")
+        assert a.index.is_writer
+
+        # Tenant b's project grows past the budget on a later sync; the least recently used tenant goes
+        registry.memory_budget_bytes = registry.nbytes + 1
+        jiras["b"].issues = [make_issue(n, f"Issue {n} " * 20) for n in range(2, 200)]
+        await wait_for(lambda: registry.peek("a") is None)
+        evictions = registry.evictions
+        await registry.stop()
+        return a, evictions
+
+    a, evictions = asyncio.run(run())
+
+    assert evictions == 1
+    assert jiras["a"].closed
+    assert not a.index.is_writer
+    # The lock is free again for another process
+    assert SharedEmbeddingFile(str(tmp_path / "shared" / "a"), "test-model").try_become_writer()
+
+
+def test_reader_takes_over_when_the_writer_closes(tmp_path):
+    shared = tmp_path / "shared"
+    writer = make_index(tmp_path, "writer", shared_dir=shared)
+    writer.upsert([make_issue(1)])
+    reader = make_index(tmp_path, "reader", shared_dir=shared)
+    reader.upsert([make_issue(1)])  # As its own store would
+    assert not reader.is_writer and "PROJ-1" in reader.vector_index
+
+    # Changed while the reader only tracks metadata, then the writer goes away
+    reader.upsert([make_issue(2)])
+    assert "PROJ-2" not in reader.vector_index
+    writer.close()
+
+    query = hash_encode(["anything"])[0]
+    reader.search(query, k=5, threshold=0.0)
+    deadline = time.monotonic() + 5
+    while not ("PROJ-2" in reader.vector_index and reader.shared_version > 1):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert reader.is_writer
+    assert SharedEmbeddingFile(str(shared), "test-model").open().keys == ["PROJ-1", "PROJ-2"]
+
+
+def test_a_jira_client_shared_by_two_tenants_stays_open_until_both_close():
+    credentials = {"exists": True, "jira_domain": "https://shared.atlassian.net", "jira_email": "bot@example.com",
+                   "jira_api_token": "token"}
+
+    async def run():
+        first, second = JiraIssues(credentials), JiraIssues(credentials)
+        client = first.client
+        assert second.client is client
+
+        await first.aclose()
+        await first.aclose()
+        still_open = not client._http.is_closed
+        await second.aclose()
+        reopened = JiraClient.shared("https://shared.atlassian.net", "bot@example.com", "token")
+        JiraClient.release(reopened)
+        await reopened.aclose()
+        return client, still_open, reopened
+
+    client, still_open, reopened = asyncio.run(run())
+    assert still_open
+    assert client._http.is_closed
+    assert reopened is not client
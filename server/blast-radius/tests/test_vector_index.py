@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.vector_index import VectorIndex
+
+DIM = 32
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def filled(n: int = 500, **kwargs) -> tuple[VectorIndex, np.ndarray]:
+    index = VectorIndex(**kwargs)
+    vectors = random_vectors(n)
+    index.upsert_many([f"PROJ-{i}" for i in range(n)], vectors)
+    return index, vectors
+
+
+def test_exact_search_returns_the_closest_vectors_and_everything_above_the_threshold():
+    index, vectors = filled(50)
+    result = index.search(vectors[7], k=3, threshold=0.999)
+    assert result.top_k[0][0] == "PROJ-7"
+    assert result.top_k[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(result.top_k) == 3
+    assert [key for key, _ in result.above_threshold] == ["PROJ-7"]
+
+
+def test_ivf_search_finds_the_query_itself():
+    index, vectors = filled(min_train_size=200, n_probe=4)
+    assert index._centroids is not None
+    for i in range(0, 500, 50):
+        assert index.search(vectors[i], k=1, threshold=1.0).top_k[0][0] == f"PROJ-{i}"
+    assert index.measure_recall(vectors[:20], k=5) > 0.5
+
+
+def test_upsert_replaces_and_delete_removes():
+    index, vectors = filled(20)
+    index.upsert("PROJ-3", vectors[5], tag="v2")
+    assert len(index) == 20
+    assert index.tag("PROJ-3") == "v2"
+    assert {key for key, _ in index.search(vectors[5], k=2, threshold=1.0).top_k} == {"PROJ-3", "PROJ-5"}
+
+    assert index.delete("PROJ-5")
+    assert not index.delete("PROJ-5")
+    assert "PROJ-5" not in index
+    assert [key for key, _ in index.search(vectors[5], k=20, threshold=0.999).above_threshold] == ["PROJ-3"]
+    assert len(index.search(vectors[0], k=None, threshold=1.0).top_k) == 19
+
+
+def test_search_batch_matches_single_searches():
+    index, _ = filled(100)
+    queries = random_vectors(5, seed=3)
+    ks = [1, 3, None, 0, 100]
+    for query, k, result in zip(queries, ks, index.search_batch(queries, ks, threshold=0.2)):
+        single = index.search(query, k=k, threshold=0.2)
+        assert [key for key, _ in result.top_k] == [key for key, _ in single.top_k]
+        assert [key for key, _ in result.above_threshold] == [key for key, _ in single.above_threshold]
+
+
+@pytest.mark.parametrize("compression", ["int8", "binary"])
+def test_compressed_search_finds_near_duplicates(compression):
+    index, vectors = filled(compression=compression)
+    noise = 0.05 * random_vectors(10, seed=1)
+    for i, query in zip(range(0, 500, 50), vectors[::50] + noise):
+        assert index.search(query, k=1, threshold=1.0).top_k[0][0] == f"PROJ-{i}"
+
+
+def test_int8_top_k_matches_exact_search():
+    index, _ = filled(compression="int8")
+    exact, _ = filled()
+    for query in random_vectors(10, seed=1):
+        assert [key for key, _ in index.search(query, k=5, threshold=1.0).top_k] == \
+            [key for key, _ in exact.search(query, k=5, threshold=1.0).top_k]
+
+
+def test_int8_search_keeps_every_row_above_the_threshold():
+    index, _ = filled(compression="int8")
+    exact, _ = filled()
+    query = random_vectors(1, seed=2)[0]
+    assert index.search(query, k=5, threshold=0.3).above_threshold == pytest.approx(
+        exact.search(query, k=5, threshold=0.3).above_threshold, abs=1e-3)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.calculate import tenants
+from src.issue_store import IssueStore
+from src.main import app
+from src.tenants import Tenant
+from src.webhook_coalescer import WebhookCoalescer
+from tests.factories import make_issue
+
+SECRET = "tenant-secret"
+
+
+def payload(event: str = "jira:issue_updated") -> bytes:
+    return json.dumps({
+        "webhookEvent": event,
+        "issue": {
+            "id": "7",
+            "key": "PROJ-7",
+            "self": "https://attacker.example.com/rest/api/3/issue/7",
+            "fields": {"summary": "Checkout fails", "description": None, "issuetype": {"name": "Bug"}},
+        },
+    }).encode()
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def tenant():
+    # Only the parts of a tenant the webhook touches
+    resident = Tenant("acme", IssueStore(), index=None, syncer=None, jira_url="https://acme.atlassian.net",
+                      webhook_secret=SECRET)
+    resident.coalescer = WebhookCoalescer(resident.store, debounce_seconds=60, max_delay_seconds=60)
+    tenants._tenants["acme"] = resident
+    yield resident
+    tenants._tenants.pop("acme", None)
+
+
+def post(body: bytes, signature: str = None, tenant_id: str = "acme"):
+    headers = {"X-Hub-Signature": signature} if signature else {}
+    return TestClient(app).post(f"/blast-radius/webhooks/jira?tenant={tenant_id}", content=body, headers=headers)
+
+
+def test_signed_event_is_buffered_with_a_link_to_the_tenants_site(tenant):
+    body = payload()
+    response = post(body, sign(body))
+
+    assert response.status_code == 202
+    assert response.json() == {"accepted": True, "pending": 1}
+    assert tenant.coalescer._pending["PROJ-7"].URL == "https://acme.atlassian.net/browse/PROJ-7"
+
+
+def test_unsigned_and_badly_signed_events_are_rejected(tenant):
+    body = payload()
+    assert post(body).status_code == 401
+    assert post(body, sign(body, "another-secret")).status_code == 401
+    assert tenant.coalescer.stats()["received"] == 0
+
+
+def test_tenant_without_a_secret_rejects_every_event(tenant):
+    tenant.webhook_secret = ""
+    body = payload()
+    assert post(body, sign(body, "")).status_code == 403
+    assert tenant.coalescer.stats()["received"] == 0
+
+
+def test_failed_flush_keeps_its_events():
+    store = IssueStore()
+    failures = [RuntimeError("index unavailable")]
+
+    def flaky_listener(upserted, deleted):
+        if failures:
+            raise failures.pop()
+
+    store.add_listener(flaky_listener)
+    coalescer = WebhookCoalescer(store, debounce_seconds=60, max_delay_seconds=60)
+
+    async def run():
+        coalescer.submit("PROJ-1", make_issue(1))
+        coalescer.submit("PROJ-2", None)
+        with pytest.raises(RuntimeError):
+            await coalescer.flush()
+        pending_after_failure = coalescer.stats()["pending"]
+        await coalescer.flush()
+        coalescer._flush_task.cancel()
+        return pending_after_failure
+
+    assert asyncio.run(run()) == 2
+    assert coalescer.stats()["pending"] == 0
+    assert coalescer.stats()["failures"] == 1
+    assert "PROJ-1" in store
+
+
+def test_a_burst_of_events_is_applied_once_it_settles():
+    store = IssueStore()
+    applied = []
+    store.add_listener(lambda upserted, deleted: applied.append(([issue.key for issue in upserted], list(deleted))))
+    coalescer = WebhookCoalescer(store, debounce_seconds=0.05, max_delay_seconds=1)
+
+    async def run():
+        for revision in range(5):
+            coalescer.submit("PROJ-1", make_issue(1, summary=f"Revision {revision}"))
+        coalescer.submit("PROJ-2", make_issue(2))
+        coalescer.submit("PROJ-2", None)
+        await asyncio.sleep(0.02)
+        assert not applied
+        await coalescer._flush_task
+
+    asyncio.run(run())
+    assert store.get("PROJ-1").summary == "Revision 4"
+    assert "PROJ-2" not in store
+    assert coalescer.stats() == {"received": 7, "coalesced": 5, "applied": 2, "failures": 0, "pending": 0}
@@ -289,9 +289,11 @@ export class AppService {
       const PRFilesAsRawCode  = JSON.stringify(await getPRFilesAsRawCode(context, this.logger));
 
       this.logger.info("Synthesizing");
+      const { diffPreprocessing } = await this.databaseService.getPromptTemplates(userId);
       const synthesisSummary: ComparisonSummary = await this.syntropyService.generateSynthesisSummary(
             PRFilesAsRawCode,
-            JSON.stringify(blastRadiusResponse)
+            JSON.stringify(blastRadiusResponse),
+            diffPreprocessing
       );
 
       await this.ticketService.addComment(
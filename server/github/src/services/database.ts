@@ -2,6 +2,7 @@ import { initializeApp, getApps } from 'firebase-admin/app';
 import { getFirestore, Firestore } from 'firebase-admin/firestore';
 import { config } from '../config/index.js';
 import { Logger } from '../utils/logger.js';
+import { DiffPreprocessingRules } from '../types/index.js';
 
 /**
  * Feature flags interface
@@ -17,6 +18,7 @@ export interface FeatureFlags {
 export interface PromptTemplates {
   systemInstructions?: string;
   prAnalysisPrompt?: string;
+  diffPreprocessing?: DiffPreprocessingRules;
 }
 
 export class DatabaseService {
@@ -178,6 +180,7 @@ export class DatabaseService {
       // Only include fields if they exist in the database
       if (data?.systemInstructions) templates.systemInstructions = data.systemInstructions;
       if (data?.prAnalysisPrompt) templates.prAnalysisPrompt = data.prAnalysisPrompt;
+      if (data?.diffPreprocessing) templates.diffPreprocessing = data.diffPreprocessing;
       
       this.logger.debug(`Retrieved custom prompts for user: ${userId}`);
       return templates;
@@ -3,6 +3,7 @@ import {config} from "../config/index.js";
 import axios from "axios";
 import {
     ComparisonSummary,
+    DiffPreprocessingRules,
     ServiceResponse,
     SyntropyCodeSummary,
     SyntropyRequirementsSummary
@@ -27,13 +28,17 @@ export class SyntropyService {
     });
   }
 
-  async summarizeCode(toAnalyze: string): ServiceResponse<SyntropyCodeSummary> {
+  async summarizeCode(
+      toAnalyze: string,
+      preprocessing?: DiffPreprocessingRules
+  ): ServiceResponse<SyntropyCodeSummary> {
     const client = await this.getAuthenticatedClient();
     const response = await client.post(
       `${config.urls.syntropy}/syntropy/code/summarize`,
       //  "http://localhost:8083/syntropy/code/summarize",
       {
         diffs: toAnalyze,
+        preprocessing: preprocessing,
       }
     );
     return response.data;
@@ -67,9 +72,13 @@ export class SyntropyService {
     return response.data;
   }
 
-  async generateSynthesisSummary(codeToSummarize: string, requirements: string): ServiceResponse<ComparisonSummary>{
+  async generateSynthesisSummary(
+      codeToSummarize: string,
+      requirements: string,
+      preprocessing?: DiffPreprocessingRules
+  ): ServiceResponse<ComparisonSummary>{
       const [codeSummary, requirementsSummary] = await Promise.all([
-          this.summarizeCode(codeToSummarize),
+          this.summarizeCode(codeToSummarize, preprocessing),
           this.summarizeRequirements(requirements)
         ]);
 
@@ -53,6 +53,21 @@ export type SyntropyCodeSummary = {
 
 }
 
+// Overrides of Syntropy's rules for dropping noise (lockfiles, generated code, ...) from diffs before prompting
+export type DiffPreprocessingRules = {
+  enabled?: boolean
+  drop_lockfiles?: boolean
+  drop_generated?: boolean
+  drop_vendored?: boolean
+  drop_minified?: boolean
+  drop_binary?: boolean
+  drop_whitespace_only_hunks?: boolean
+  context_lines?: number | null
+  max_file_tokens?: number | null
+  exclude_paths?: string[]
+  include_paths?: string[]
+}
+
 export type SyntropyRequirementsSummary = {
   core_business_functionality: string
   structural_and_modular_requirements: string
@@ -0,0 +1,92 @@
+"""
+Local stand-in for the Gemini API's `generateContent` endpoint, for load tests and benchmarks without API keys or
+quota.
+
+Run it with `uvicorn benchmarks.fake_llm:app_from_env --factory --port 8095` and point syntropy at it with
+`GEMINI_BASE_URL=http://localhost:8095 GEMINI_API_KEY=fake`. Every response is a JSON document that fills the
+request's `responseSchema` with placeholder text, so it parses into the caller's Pydantic model. The fake can be
+tuned through environment variables:
+
+- `FAKE_LLM_LATENCY_MS`: latency of every call (default 500)
+- `FAKE_LLM_LATENCY_PER_1K_CHARS_MS`: extra latency per 1000 prompt characters, as prompt processing (default 0)
+- `FAKE_LLM_FAILURE_EVERY`: answer every n-th call with a 503 (default 0, disabled)
+
+`GET /stub/stats` reports the number of calls, prompt characters and the most calls that were in flight at once;
+`POST /stub/reset` clears them.
+"""
+import asyncio
+import json
+import os
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def fill_schema(schema: dict, path: str = "value"):
+    """A value matching a Gemini `Schema` (as sent in `generationConfig.responseSchema`)."""
+    kind = str(schema.get("type", "STRING")).upper()
+    if kind == "OBJECT":
+        return {name: fill_schema(prop, name) for name, prop in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [fill_schema(schema.get("items", {}), path)]
+    if kind in ("INTEGER", "NUMBER"):
+        return 0
+    if kind == "BOOLEAN":
+        return False
+    return f"Fake {path.replace('_', ' ')}."
+
+
+def create_app(latency_ms: float = 500, latency_per_1k_chars_ms: float = 0, failure_every: int = 0) -> FastAPI:
+    fake = FastAPI()
+    fake.state.calls = Counter()
+    fake.state.in_flight = 0
+
+    @fake.post("/{api_version}/models/{model}:generateContent")
+    async def generate_content(api_version: str, model: str, request: Request):
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content["parts"])
+        calls = fake.state.calls
+        calls["total"] += 1
+        calls[f"model:{model}"] += 1
+        calls["prompt_chars"] += len(prompt)
+
+        fake.state.in_flight += 1
+        calls["max_in_flight"] = max(calls["max_in_flight"], fake.state.in_flight)
+        try:
+            await asyncio.sleep((latency_ms + latency_per_1k_chars_ms * len(prompt) / 1000) / 1000)
+        finally:
+            fake.state.in_flight -= 1
+
+        if failure_every and calls["total"] % failure_every == 0:
+            calls["failed"] += 1
+            return JSONResponse({"error": {"code": 503, "message": "Fake overload", "status": "UNAVAILABLE"}},
+                                status_code=503)
+
+        schema = body.get("generationConfig", {}).get("responseSchema", {"type": "STRING"})
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": json.dumps(fill_schema(schema))}], "role": "model"},
+                "finishReason": "STOP",
+            }],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4},
+        }
+
+    @fake.get("/stub/stats")
+    async def stats():
+        return {**fake.state.calls, "in_flight": fake.state.in_flight}
+
+    @fake.post("/stub/reset")
+    async def reset():
+        fake.state.calls.clear()
+        return {"reset": True}
+
+    return fake
+
+
+def app_from_env() -> FastAPI:
+    return create_app(
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "500")),
+        latency_per_1k_chars_ms=float(os.getenv("FAKE_LLM_LATENCY_PER_1K_CHARS_MS", "0")),
+        failure_every=int(os.getenv("FAKE_LLM_FAILURE_EVERY", "0"))
+    )
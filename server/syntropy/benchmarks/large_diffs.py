@@ -0,0 +1,96 @@
+"""
+Latency of summarizing large synthetic diffs in one LLM call versus map-reduce over chunks.
+
+Runs `summarize_code` in-process against the local fake LLM (`benchmarks/fake_llm.py`), whose latency grows with the
+prompt length (`--llm-latency-per-1k-chars-ms`) like a real model's prompt processing does. For every diff size the
+single-call path (no chunking) is compared with map-reduce at the configured chunk budget and parallelism:
+
+    poetry run python -m benchmarks.large_diffs --files 20 100 400 --chunk-tokens 16000 --output large_diffs.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.load_test import free_port, wait_for
+from benchmarks.synthetic_diffs import make_diff
+from src.components.code_summarizer import summarize_code
+from src.components.diff_chunks import estimate_tokens, split_diff
+from src.components.llm import LLMClient
+from src.components.response_cache import ResponseCache
+
+
+async def run(diffs: str, llm_url: str, chunk_tokens: int, max_parallel_chunks: int) -> dict:
+    httpx.post(f"{llm_url}/stub/reset")
+    llm = LLMClient(api_key="fake", base_url=llm_url)
+    try:
+        llm.client()
+        started = time.perf_counter()
+        await summarize_code(diffs, llm, ResponseCache(directory=None), chunk_tokens=chunk_tokens,
+                             max_parallel_chunks=max_parallel_chunks)
+        seconds = time.perf_counter() - started
+    finally:
+        await llm.aclose()
+    calls = httpx.get(f"{llm_url}/stub/stats").json()
+    return {"seconds": seconds, "llm_calls": calls["total"], "prompt_chars": calls["prompt_chars"],
+            "max_in_flight": calls["max_in_flight"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--hunks-per-file", type=int, default=4)
+    parser.add_argument("--chunk-tokens", type=int, default=16000)
+    parser.add_argument("--max-parallel-chunks", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=1000)
+    parser.add_argument("--llm-latency-per-1k-chars-ms", type=float, default=20)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    llm_port = free_port()
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_llm:app_from_env", "--factory",
+         "--port", str(llm_port), "--log-level", "warning"],
+        env={**os.environ, "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+             "FAKE_LLM_LATENCY_PER_1K_CHARS_MS": str(args.llm_latency_per_1k_chars_ms)}
+    )
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    results = []
+    try:
+        wait_for(f"{llm_url}/stub/stats")
+        for num_files in args.files:
+            diffs = make_diff(num_files, args.hunks_per_file)
+            result = {
+                "files": num_files,
+                "diff_tokens": estimate_tokens(diffs),
+                "chunks": len(split_diff(diffs, args.chunk_tokens)),
+                # A budget above the diff's size takes the single-call path
+                "single_call": asyncio.run(run(diffs, llm_url, estimate_tokens(diffs) + 1, 1)),
+                "map_reduce": asyncio.run(run(diffs, llm_url, args.chunk_tokens, args.max_parallel_chunks)),
+            }
+            result["speedup"] = result["single_call"]["seconds"] / result["map_reduce"]["seconds"]
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        llm.terminate()
+        llm.wait()
+
+    report = {
+        "config": {"hunks_per_file": args.hunks_per_file, "chunk_tokens": args.chunk_tokens,
+                   "max_parallel_chunks": args.max_parallel_chunks, "llm_latency_ms": args.llm_latency_ms,
+                   "llm_latency_per_1k_chars_ms": args.llm_latency_per_1k_chars_ms},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
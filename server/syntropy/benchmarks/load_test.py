@@ -0,0 +1,139 @@
+"""
+Concurrent throughput of the syntropy service against a local fake LLM (`benchmarks/fake_llm.py`).
+
+Starts the fake LLM and one uvicorn worker of `src.main:app` pointed at it, then sends the same number of requests to
+the code, requirements and comparison endpoints at each concurrency level. With the LLM calls awaited on one shared
+client, throughput should grow with concurrency until `LLM_MAX_CONCURRENCY` calls are in flight:
+
+    poetry run python -m benchmarks.load_test --concurrency 1 4 16 64 --llm-latency-ms 500 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from src.components.code_summarizer import StructuredSummary
+from src.components.requirements_summarizer import ProductRequirementsSummary
+
+
+def make_request(i: int) -> tuple[str, dict]:
+    """The i-th request, cycling through the endpoints; every one is distinct, so none is served from the cache."""
+    code_summary = {field: f"Handles user authentication, case {i}." for field in StructuredSummary.model_fields}
+    requirements_summary = {field: "Users must be able to log in." for field in ProductRequirementsSummary.model_fields}
+    requests = (
+        ("/syntropy/code/summarize", {"diffs": f"diff --git a/app.py b/app.py\n+def handler_{i}():\n+    pass\n"}),
+        ("/syntropy/requirements/summarize", {"requirements": f"Users log in and run calculation {i}."}),
+        ("/syntropy/comparison/summarize", {"code_summary": code_summary, "requirements_summary": requirements_summary}),
+    )
+    return requests[i % len(requests)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+async def run_level(base_url: str, concurrency: int, num_requests: int, offset: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def send(path: str, payload: dict):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(path, json=payload)
+                latencies.append(time.perf_counter() - started)
+                failures += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*[send(*make_request(offset + i)) for i in range(num_requests)])
+        seconds = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "failures": failures,
+        "throughput_rps": num_requests / seconds,
+        "latency_ms": {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+                       "max": float(ms.max())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-level", type=int, default=None,
+                        help="Requests sent at each level (default: 4x the concurrency, at least 12)")
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--llm-max-concurrency", type=int, default=16)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    llm_port, service_port = free_port(), free_port()
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_llm:app_from_env", "--factory",
+         "--port", str(llm_port), "--log-level", "warning"],
+        env={**os.environ, "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms)}
+    )]
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(service_port), "--log-level", "warning"],
+            env={**os.environ, "GEMINI_BASE_URL": f"http://127.0.0.1:{llm_port}", "GEMINI_API_KEY": "fake",
+                 "LLM_MAX_CONCURRENCY": str(args.llm_max_concurrency), "RESPONSE_CACHE_DIR": ""},
+            stdout=subprocess.DEVNULL
+        ))
+        wait_for(f"http://127.0.0.1:{service_port}/ready")
+
+        levels = []
+        for concurrency in args.concurrency:
+            num_requests = args.requests_per_level or max(4 * concurrency, 12)
+            offset = sum(level["requests"] for level in levels)
+            levels.append(asyncio.run(run_level(f"http://127.0.0.1:{service_port}", concurrency, num_requests, offset)))
+            print(json.dumps(levels[-1]), file=sys.stderr)
+        llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stub/stats").json()
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    baseline = levels[0]["throughput_rps"] / levels[0]["concurrency"]
+    for level in levels:
+        # 1.0 when throughput grows linearly with concurrency from the first level
+        level["scaling_efficiency"] = level["throughput_rps"] / (baseline * level["concurrency"])
+    report = {
+        "config": {"llm_latency_ms": args.llm_latency_ms, "llm_max_concurrency": args.llm_max_concurrency},
+        "levels": levels,
+        "fake_llm": llm_stats,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Tokens and summarization latency saved by diff preprocessing, on synthetic pull requests with typical noise.
+
+Every scenario mixes source changes with noise (lockfile bumps, a minified bundle, binary files, a re-indented file),
+is preprocessed with the default rules and then summarized in-process against the local fake LLM
+(`benchmarks/fake_llm.py`), once as sent and once preprocessed:
+
+    poetry run python -m benchmarks.preprocessing --output preprocessing.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.large_diffs import run
+from benchmarks.load_test import free_port, wait_for
+from benchmarks.synthetic_diffs import (
+    make_binary_diff, make_diff, make_lockfile_diff, make_minified_diff, make_reindent_diff
+)
+from src.components.code_summarizer import CODE_SUMMARY_CHUNK_TOKENS, CODE_SUMMARY_MAX_PARALLEL_CHUNKS
+from src.components.diff_preprocessing import preprocess_diff
+
+SCENARIOS = {
+    "source_only": lambda: make_diff(20),
+    "dependency_bump": lambda: make_diff(2) + make_lockfile_diff(1500) + make_lockfile_diff(300, "poetry.lock"),
+    "feature_with_assets": lambda: (
+        make_diff(10) + make_lockfile_diff(400) + make_minified_diff() + make_binary_diff()
+        + make_binary_diff("static/hero.jpg") + make_reindent_diff("web/legacy/settings.js")
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--llm-latency-ms", type=float, default=1000)
+    parser.add_argument("--llm-latency-per-1k-chars-ms", type=float, default=20)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    llm_port = free_port()
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_llm:app_from_env", "--factory",
+         "--port", str(llm_port), "--log-level", "warning"],
+        env={**os.environ, "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+             "FAKE_LLM_LATENCY_PER_1K_CHARS_MS": str(args.llm_latency_per_1k_chars_ms)}
+    )
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    results = []
+    try:
+        wait_for(f"{llm_url}/stub/stats")
+        for name in args.scenarios:
+            diffs = SCENARIOS[name]()
+            started = time.perf_counter()
+            processed, report = preprocess_diff(diffs)
+            preprocess_ms = (time.perf_counter() - started) * 1000
+            result = {
+                "scenario": name,
+                "tokens_before": report.tokens_before,
+                "tokens_after": report.tokens_after,
+                "reduction": 1 - report.tokens_after / report.tokens_before,
+                "dropped_files": report.dropped_files,
+                "dropped_hunks": report.dropped_hunks,
+                "collapsed_lines": report.collapsed_lines,
+                "preprocess_ms": preprocess_ms,
+                "raw": asyncio.run(run(diffs, llm_url, CODE_SUMMARY_CHUNK_TOKENS, CODE_SUMMARY_MAX_PARALLEL_CHUNKS)),
+                "preprocessed": asyncio.run(
+                    run(processed, llm_url, CODE_SUMMARY_CHUNK_TOKENS, CODE_SUMMARY_MAX_PARALLEL_CHUNKS)),
+            }
+            result["speedup"] = result["raw"]["seconds"] / result["preprocessed"]["seconds"]
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        llm.terminate()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Synthetic unified diffs of Python source files, for benchmarks that don't need a real repository."""
+import random
+
+IDENTIFIERS = ("user", "session", "account", "invoice", "payment", "order", "report", "token", "cache", "request")
+
+
+def make_file_diff(path: str, num_hunks: int, lines_per_hunk: int = 30, seed: int = 0) -> str:
+    rng = random.Random(f"{path}:{seed}")
+    lines = [
+        f"diff --git a/{path} b/{path}",
+        f"index {rng.getrandbits(28):07x}..{rng.getrandbits(28):07x} 100644",
+        f"--- a/{path}",
+        f"+++ b/{path}",
+    ]
+    for hunk in range(num_hunks):
+        start = 1 + hunk * (lines_per_hunk + 40)
+        lines.append(f"@@ -{start},{lines_per_hunk} +{start},{lines_per_hunk} @@ def handler_{hunk}():")
+        for i in range(lines_per_hunk):
+            name, other = rng.choice(IDENTIFIERS), rng.choice(IDENTIFIERS)
+            prefix = rng.choices(" +-", weights=(3, 2, 1))[0]
+            lines.append(f"{prefix}    {name}_{i} = load_{other}({name}_id, retries={rng.randint(1, 5)})")
+    return "\n".join(lines) + "\n"
+
+
+def make_diff(num_files: int, hunks_per_file: int = 4, lines_per_hunk: int = 30, seed: int = 0) -> str:
+    return "".join(
+        make_file_diff(f"src/package_{i % 7}/module_{i}.py", hunks_per_file, lines_per_hunk, seed)
+        for i in range(num_files)
+    )
+
+
+def make_lockfile_diff(num_packages: int, path: str = "package-lock.json", seed: int = 0) -> str:
+    """A dependency bump rewriting every package's entry in an npm lockfile."""
+    rng = random.Random(f"{path}:{seed}")
+    lines = [f"diff --git a/{path} b/{path}", "index 1a2b3c4..5d6e7f8 100644", f"--- a/{path}", f"+++ b/{path}",
+             f"@@ -1,{num_packages * 4} +1,{num_packages * 4} @@"]
+    for i in range(num_packages):
+        old, new = f"{rng.randint(1, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}", f"{rng.randint(1, 9)}.0.0"
+        lines += [
+            f'     "node_modules/package-{i}": {{',
+            f'-      "version": "{old}",',
+            f'+      "version": "{new}",',
+            f'-      "integrity": "sha512-{rng.getrandbits(256):064x}",',
+            f'+      "integrity": "sha512-{rng.getrandbits(256):064x}",',
+            "     },",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def make_minified_diff(path: str = "static/app.min.js", chars: int = 40000, seed: int = 0) -> str:
+    rng = random.Random(f"{path}:{seed}")
+    body = ";".join(f"var {rng.choice(IDENTIFIERS)}{i}=load({i})" for i in range(chars // 20))[:chars]
+    return f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n" \
+           f"@@ -1 +1 @@\n-{body[::-1]}\n+{body}\n"
+
+
+def make_binary_diff(path: str = "static/logo.png") -> str:
+    return f"diff --git a/{path} b/{path}\nindex 3333333..4444444 100644\nBinary files a/{path} and b/{path} differ\n"
+
+
+def make_reindent_diff(path: str, num_lines: int = 200) -> str:
+    """A file re-indented from two to four spaces, without any other change."""
+    lines = [f"diff --git a/{path} b/{path}", "index 5555555..6666666 100644", f"--- a/{path}", f"+++ b/{path}",
+             f"@@ -1,{num_lines} +1,{num_lines} @@"]
+    lines += [f"-  value_{i} = compute({i})" for i in range(num_lines)]
+    lines += [f"+    value_{i} = compute({i})" for i in range(num_lines)]
+    return "\n".join(lines) + "\n"
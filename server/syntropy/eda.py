@@ -9,6 +9,7 @@ import requests
 CODE_SUMMARIZATION_URL = "http://localhost:8080/syntropy/code/summarize"
 REQUIREMENTS_SUMMARIZATION_URL = "http://localhost:8080/syntropy/requirements/summarize"
 COMPARISON_SUMMARIZATION_URL = "http://localhost:8080/syntropy/comparison/summarize"
+PIPELINE_URL = "http://localhost:8080/syntropy/pipeline"
 
 # Create results directory
 RESULTS_DIR = "dataset_results"
@@ -40,38 +41,22 @@ with open("dataset.csv", "r", newline='', encoding='utf-8') as file:
         result_path = os.path.join(RESULTS_DIR, dataset_pair_id)
         os.makedirs(result_path, exist_ok=True)
 
-        print('Hitting the code summarization endpoint...')
-        # Hit the code summarization endpoint
-        code_response = requests.post(CODE_SUMMARIZATION_URL, json={"diffs": code_block})
-        code_summary = code_response.json()
-        with open(os.path.join(result_path, "code_summarization.json"), "w", encoding='utf-8') as f:
-            json.dump(code_summary, f, indent=2)
-
-        print('Done.')
-
-        print('Hitting the requirements summarization endpoint...')
-        # Hit the requirements summarization endpoint
-        requirements_response = requests.post(REQUIREMENTS_SUMMARIZATION_URL, json={"requirements": requirements})
-        requirements_summary = requirements_response.json()
-        with open(os.path.join(result_path, "requirements_summarization.json"), "w", encoding='utf-8') as f:
-            json.dump(requirements_summary, f, indent=2)
-
-        print('Done.')
-
-        print('Hitting the comparison summarization endpoint...')
-        # Hit the comparison summarization endpoint
-        comparison_response = requests.post(
-            COMPARISON_SUMMARIZATION_URL,
-            json={
-                "code_summary": code_summary,
-                "requirements_summary": requirements_summary
-            }
-        )
-        comparison_summary = comparison_response.json()
-        with open(os.path.join(result_path, "comparison_summarization.json"), "w", encoding='utf-8') as f:
-            json.dump(comparison_summary, f, indent=2)
-
-        print('Done.')
+        print('Hitting the pipeline endpoint...')
+        # One request runs both summarizations concurrently and then the comparison
+        pipeline_response = requests.post(PIPELINE_URL, json={"diffs": code_block, "requirements": requirements})
+        pipeline = pipeline_response.json()
+        for stage, file_name in (
+                ("code_summary", "code_summarization.json"),
+                ("requirements_summary", "requirements_summarization.json"),
+                ("comparison", "comparison_summarization.json"),
+        ):
+            if pipeline.get(stage) is not None:
+                with open(os.path.join(result_path, file_name), "w", encoding='utf-8') as f:
+                    json.dump(pipeline[stage], f, indent=2)
+        with open(os.path.join(result_path, "pipeline_timings.json"), "w", encoding='utf-8') as f:
+            json.dump({"timings_ms": pipeline.get("timings_ms"), "errors": pipeline.get("errors")}, f, indent=2)
+
+        print(f'Done in {pipeline.get("timings_ms", {}).get("total", 0):.0f} ms.', pipeline.get("errors") or '')
 
         time.sleep(5)
 
@@ -9,14 +9,47 @@ TODO:
         - Gemini: https://ai.google.dev/gemini-api/docs/structured-output?lang=python
 """
 
+import asyncio
+import json
 import os
+from typing import NamedTuple, Optional
+
 from pydantic import BaseModel, Field
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from fastapi.routing import APIRouter
-from google import genai
+
+from .diff_chunks import FileChunk, estimate_tokens, split_diff, split_files
+from .diff_preprocessing import DIFF_TOKENS_HEADER, PreprocessingRules, preprocess_diff
+from .llm import LLMClient, get_llm
+from .response_cache import CACHE_HEADER, ResponseCache, bypass_requested, cached, get_response_cache
 
 code_summarization_app = APIRouter()
 
+MODEL = "gemini-1.5-pro-latest"
+# Part of every cached summary's key: bump it whenever the prompts below change
+PROMPT_VERSION = 1
+# Diffs above this size are summarized in chunks of at most this size and the chunk summaries merged
+CODE_SUMMARY_CHUNK_TOKENS = int(os.getenv("CODE_SUMMARY_CHUNK_TOKENS", "16000"))
+# Chunks of one diff summarized at once, on top of the client-wide `LLM_MAX_CONCURRENCY`
+CODE_SUMMARY_MAX_PARALLEL_CHUNKS = int(os.getenv("CODE_SUMMARY_MAX_PARALLEL_CHUNKS", "4"))
+
+FILE_REUSE_HEADER = "X-Syntropy-File-Reuse"
+
+FOCUS_AREAS = """
+    - Core business functionality and how the code contributes to the product.
+    - Code structure, modularity, and maintainability.
+    - Performance and scalability, identifying bottlenecks.
+    - Data handling, validation, and integrity mechanisms.
+    - Error handling and user impact.
+    - Efficiency in product use cases.
+    - Readability, maintainability, and team collaboration.
+    - Testing coverage and adherence to product requirements.
+    - External dependencies and their role in integration.
+    - Security concerns in the context of product use.
+    - Compliance with regulatory requirements.
+    - Adherence to coding standards and best practices.
+"""
+
 
 class StructuredSummary(BaseModel):
     code_functionality_and_business_logic: str = Field(
@@ -57,35 +90,184 @@ class StructuredSummary(BaseModel):
 
 class PRModel(BaseModel):
     diffs: str
+    # Summarize file by file and reuse the cached summaries of files unchanged since an earlier push
+    incremental: bool = False
+    # Overrides of the rules for dropping lockfiles, generated code and other noise from the diff, e.g. a user's
+    # settings; the defaults apply when left out
+    preprocessing: Optional[PreprocessingRules] = None
 
 
-@code_summarization_app.post("/summarize", response_model=StructuredSummary)
-async def generate_code_summary(pr_data: PRModel) -> StructuredSummary:
-    prompt = f"""
+def code_prompt(diffs: str) -> str:
+    return f"""
     Analyze the provided code diff and return a structured JSON summary focusing on:
+    {FOCUS_AREAS}
+    Here is the code diff:
+    {diffs}
+    """
 
-    - Core business functionality and how the code contributes to the product.
-    - Code structure, modularity, and maintainability.
-    - Performance and scalability, identifying bottlenecks.
-    - Data handling, validation, and integrity mechanisms.
-    - Error handling and user impact.
-    - Efficiency in product use cases.
-    - Readability, maintainability, and team collaboration.
-    - Testing coverage and adherence to product requirements.
-    - External dependencies and their role in integration.
-    - Security concerns in the context of product use.
-    - Compliance with regulatory requirements.
-    - Adherence to coding standards and best practices.
 
-    Here is the code diff:
-    {pr_data.diffs}
+def chunk_prompt(chunk: str) -> str:
+    return f"""
+    The following is one part of a larger code diff, split up because of its size. Analyze this part only and
+    return a structured JSON summary focusing on:
+    {FOCUS_AREAS}
+    Leave a category brief when this part has nothing to say about it; the summaries of all parts are merged later.
+
+    Here is the part of the code diff:
+    {chunk}
+    """
+
+
+def reduce_prompt(summaries: list[StructuredSummary]) -> str:
+    parts = json.dumps([summary.model_dump() for summary in summaries], indent=1)
+    return f"""
+    The following structured JSON summaries each describe one part of the same code diff. Merge them into a single
+    structured JSON summary of the whole change, with the same categories, focusing on:
+    {FOCUS_AREAS}
+    Combine what the parts say about each category, drop repetition, and keep every concrete finding (bottlenecks,
+    security risks, missing tests) that any part reports.
+
+    Here are the summaries of the parts:
+    {parts}
+    """
+
+
+async def summarize_code(diffs: str, llm: LLMClient, cache: ResponseCache, bypass: bool = False,
+                         chunk_tokens: int = CODE_SUMMARY_CHUNK_TOKENS,
+                         max_parallel_chunks: int = CODE_SUMMARY_MAX_PARALLEL_CHUNKS) -> tuple[StructuredSummary, str]:
+    """
+    The structured summary of `diffs` and whether it came from the cache (`hit`, `miss` or `bypass`).
+
+    Diffs of up to `chunk_tokens` are summarized in one call. Larger ones are split into chunks under that budget,
+    the chunks summarized concurrently (at most `max_parallel_chunks` at once) and their summaries merged.
+    """
+    if estimate_tokens(diffs) <= chunk_tokens:
+        def generate():
+            return llm.generate(MODEL, code_prompt(diffs), StructuredSummary)
+    else:
+        def generate():
+            return map_reduce_summary(diffs, llm, cache, bypass, chunk_tokens, max_parallel_chunks)
+
+    return await cached(cache, "code", MODEL, PROMPT_VERSION, StructuredSummary, diffs, generate, bypass=bypass)
+
+
+async def map_reduce_summary(diffs: str, llm: LLMClient, cache: ResponseCache, bypass: bool, chunk_tokens: int,
+                             max_parallel_chunks: int) -> StructuredSummary:
+    semaphore = asyncio.Semaphore(max_parallel_chunks)
+
+    async def summarize_chunk(chunk: str) -> StructuredSummary:
+        async with semaphore:
+            # Cached one by one, so a retry after a failed chunk only repeats that chunk
+            summary, _ = await cached(cache, "code_chunk", MODEL, PROMPT_VERSION, StructuredSummary, chunk,
+                                      lambda: llm.generate(MODEL, chunk_prompt(chunk), StructuredSummary),
+                                      bypass=bypass)
+            return summary
+
+    summaries = await asyncio.gather(*[summarize_chunk(chunk) for chunk in split_diff(diffs, chunk_tokens)])
+    return await merge_summaries(list(summaries), llm, chunk_tokens, semaphore)
+
+
+async def merge_summaries(summaries: list[StructuredSummary], llm: LLMClient, max_tokens: int,
+                          semaphore: asyncio.Semaphore) -> StructuredSummary:
+    """Merges `summaries` in groups that fit `max_tokens`, level by level, until one summary is left."""
+    async def merge(group: list[StructuredSummary]) -> StructuredSummary:
+        async with semaphore:
+            return await llm.generate(MODEL, reduce_prompt(group), StructuredSummary)
+
+    while len(summaries) > 1:
+        groups, group, size = [], [], 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary.model_dump_json())
+            if len(group) >= 2 and size + tokens > max_tokens:
+                groups.append(group)
+                group, size = [], 0
+            group.append(summary)
+            size += tokens
+        if len(group) == 1 and groups:
+            groups[-1].append(group[0])
+        else:
+            groups.append(group)
+        summaries = list(await asyncio.gather(*[merge(group) for group in groups]))
+    return summaries[0]
+
+
+class FileReuse(NamedTuple):
+    files: int  # Files, or pieces of large files, in the diff
+    reused: int  # Of which the summary came from the cache
+
+    @property
+    def ratio(self) -> float:
+        return self.reused / self.files if self.files else 1.0
+
+    def header(self) -> str:
+        return f"files={self.files}; reused={self.reused}; ratio={self.ratio:.2f}"
+
+
+async def summarize_code_incrementally(
+        diffs: str,
+        llm: LLMClient,
+        cache: ResponseCache,
+        bypass: bool = False,
+        chunk_tokens: int = CODE_SUMMARY_CHUNK_TOKENS,
+        max_parallel_chunks: int = CODE_SUMMARY_MAX_PARALLEL_CHUNKS
+) -> tuple[StructuredSummary, str, FileReuse]:
     """
-    print(pr_data.diffs)
-
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    response = client.models.generate_content(
-        model="gemini-1.5-pro-latest",
-        contents=prompt,
-        config={"response_mime_type": "application/json", "response_schema": StructuredSummary},
-    )
-    return response.parsed
+    The structured summary of `diffs` built from a summary per file, how it was served and how many file summaries
+    were reused.
+
+    File summaries are cached under the file's path and a hash of its hunks, so when another push to a pull request
+    changes a few files, only those are summarized again and merged with the cached summaries of the others.
+    """
+    files = split_files(diffs, chunk_tokens)
+    if not files:
+        # Nothing to split (e.g. an empty diff), so there are no file summaries to merge
+        summary, outcome = await summarize_code(diffs, llm, cache, bypass, chunk_tokens, max_parallel_chunks)
+        return summary, outcome, FileReuse(0, 0)
+
+    semaphore = asyncio.Semaphore(max_parallel_chunks)
+    outcomes = []
+
+    async def summarize_file(file: FileChunk) -> StructuredSummary:
+        async with semaphore:
+            summary, outcome = await cached(cache, "code_file", MODEL, PROMPT_VERSION, StructuredSummary,
+                                            f"{file.path}\n{file.hunks}",
+                                            lambda: llm.generate(MODEL, chunk_prompt(file.text), StructuredSummary),
+                                            bypass=bypass)
+        outcomes.append(outcome)
+        return summary
+
+    summaries = list(await asyncio.gather(*[summarize_file(file) for file in files]))
+    if len(summaries) == 1:
+        summary, merge_outcome = summaries[0], outcomes[0]
+    else:
+        # Merged summaries are cached too, so a diff whose files are all unchanged needs no LLM call at all
+        content = json.dumps([summary.model_dump() for summary in summaries], sort_keys=True)
+        summary, merge_outcome = await cached(cache, "code_merge", MODEL, PROMPT_VERSION, StructuredSummary, content,
+                                              lambda: merge_summaries(summaries, llm, chunk_tokens, semaphore),
+                                              bypass=bypass)
+
+    reuse = FileReuse(len(files), outcomes.count("hit"))
+    if bypass:
+        outcome = "bypass"
+    else:
+        outcome = "hit" if reuse.reused == reuse.files and merge_outcome == "hit" else "miss"
+    return summary, outcome, reuse
+
+
+@code_summarization_app.post("/summarize", response_model=StructuredSummary)
+async def generate_code_summary(
+        pr_data: PRModel,
+        request: Request,
+        response: Response,
+        llm: LLMClient = Depends(get_llm),
+        cache: ResponseCache = Depends(get_response_cache)
+) -> StructuredSummary:
+    diffs, report = preprocess_diff(pr_data.diffs, pr_data.preprocessing)
+    response.headers[DIFF_TOKENS_HEADER] = report.header()
+    if pr_data.incremental:
+        summary, outcome, reuse = await summarize_code_incrementally(diffs, llm, cache, bypass_requested(request))
+        response.headers[FILE_REUSE_HEADER] = reuse.header()
+    else:
+        summary, outcome = await summarize_code(diffs, llm, cache, bypass_requested(request))
+    response.headers[CACHE_HEADER] = outcome
+    return summary
@@ -0,0 +1,120 @@
+"""
+Splitting of unified diffs into chunks under a token budget, for map-reduce summarization of large pull requests.
+
+A diff is split into files (`diff --git ...` sections) and every file into its header and hunks (`@@ ... @@`
+sections). Chunks are filled with whole files where they fit, then with a file's hunks (each chunk repeating the file
+header, so the LLM knows which file it reads), and only a hunk that alone exceeds the budget is cut between lines.
+Text that isn't a unified diff, e.g. a pasted code block, is cut between lines.
+
+`split_files` keeps every file (or piece of a large file) on its own instead, so per-file summaries can be reused
+across pushes to a pull request.
+"""
+import re
+from typing import NamedTuple
+
+FILE_HEADER = re.compile(r"^diff --git a/(\S+) b/(\S+)", re.MULTILINE)
+HUNK_HEADER = re.compile(r"^@@ ", re.MULTILINE)
+
+# Roughly four characters per token for English prose and code
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class FileDiff(NamedTuple):
+    path: str
+    header: str  # `diff --git`, index and `---`/`+++` lines
+    hunks: list[str]
+
+    @property
+    def text(self) -> str:
+        return self.header + "".join(self.hunks)
+
+
+def parse_diff(diffs: str) -> list[FileDiff]:
+    """The files of a unified diff; text before the first file header, if any, becomes a file without a path."""
+    starts = [match.start() for match in FILE_HEADER.finditer(diffs)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+
+    files = []
+    for start, end in zip(starts, starts[1:] + [len(diffs)]):
+        section = diffs[start:end]
+        if not section.strip():
+            continue
+        match = FILE_HEADER.match(section)
+        hunk_starts = [match.start() for match in HUNK_HEADER.finditer(section)]
+        header_end = hunk_starts[0] if hunk_starts else len(section)
+        hunks = [section[s:e] for s, e in zip(hunk_starts, hunk_starts[1:] + [len(section)])]
+        files.append(FileDiff(match.group(2) if match else "", section[:header_end], hunks))
+    return files
+
+
+def _split_lines(text: str, max_chars: int) -> list[str]:
+    pieces, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        # A single line longer than the budget (minified code) is cut as well
+        while len(line) > max_chars:
+            if current:
+                pieces.append("".join(current))
+                current, size = [], 0
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if size + len(line) > max_chars and current:
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def _file_pieces(file: FileDiff, max_chars: int) -> list[str]:
+    """The file's diff in pieces of at most `max_chars`, each starting with the file header."""
+    if len(file.text) <= max_chars:
+        return [file.text]
+    budget = max(max_chars - len(file.header), max_chars // 2)
+    pieces, current = [], ""
+    for hunk in file.hunks or [file.header]:
+        for part in ([hunk] if len(hunk) <= budget else _split_lines(hunk, budget)):
+            if current and len(current) + len(part) > budget:
+                pieces.append(current)
+                current = ""
+            current += part
+    if current:
+        pieces.append(current)
+    return [file.header + piece if file.hunks else piece for piece in pieces]
+
+
+class FileChunk(NamedTuple):
+    path: str
+    text: str  # The file header and the hunks, as sent to the LLM
+    hunks: str  # The hunks only, which identify the change regardless of the blob hashes in the header
+
+
+def split_files(diffs: str, max_tokens: int) -> list[FileChunk]:
+    """`diffs` file by file, with files over about `max_tokens` tokens in several pieces."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [
+        FileChunk(file.path, piece, piece[len(file.header):] if file.hunks else piece)
+        for file in parse_diff(diffs)
+        for piece in _file_pieces(file, max_chars)
+    ]
+
+
+def split_diff(diffs: str, max_tokens: int) -> list[str]:
+    """`diffs` in chunks of at most about `max_tokens` tokens, keeping files and then hunks together where they fit."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    for file in parse_diff(diffs):
+        for piece in _file_pieces(file, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,255 @@
+"""
+Removal of diff content that costs tokens without telling the LLM anything about the change.
+
+Lockfiles, generated code, vendored dependencies, minified assets and binary files are dropped whole, hunks that only
+change whitespace are dropped (re-indenting counts as a change in indentation-sensitive files such as Python), runs of
+unchanged context lines are collapsed to a marker, and files that are still too large are truncated. Every rule can be
+turned off or adjusted per request through `PreprocessingRules`, e.g. from a user's settings, and `include_paths` keeps
+files the built-in patterns would drop.
+
+Both unified diffs and the `{"path": "file content"}` JSON the GitHub app sends are understood; for the latter the
+path and content rules apply, as there are no hunks.
+"""
+import fnmatch
+import json
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from .diff_chunks import CHARS_PER_TOKEN, FileDiff, estimate_tokens, parse_diff
+
+DIFF_PREPROCESSING_ENABLED = os.getenv("DIFF_PREPROCESSING_ENABLED", "true").lower() == "true"
+
+DIFF_TOKENS_HEADER = "X-Syntropy-Diff-Tokens"
+
+LOCKFILE_PATTERNS = (
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb", "poetry.lock", "uv.lock",
+    "Pipfile.lock", "Cargo.lock", "Gemfile.lock", "composer.lock", "go.sum", "*.lock",
+)
+GENERATED_PATTERNS = (
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.generated.*", "*.g.dart", "*.map", "dist/*", "build/*",
+    "*/__generated__/*", "__generated__/*",
+)
+VENDORED_PATTERNS = ("vendor/*", "*/vendor/*", "node_modules/*", "*/node_modules/*", "third_party/*", "*/third_party/*")
+MINIFIED_PATTERNS = ("*.min.js", "*.min.css", "*.min.mjs", "*-min.js", "*.bundle.js")
+# Where leading whitespace is syntax, so a hunk that only re-indents lines still changes the program
+INDENTATION_SENSITIVE_PATTERNS = (
+    "*.py", "*.pyi", "*.pyx", "*.yaml", "*.yml", "Makefile", "*.mk", "*.coffee", "*.sass", "*.pug", "*.haml", "*.slim",
+)
+# Markers code generators put at the top of their output, so only a file's first lines are searched for them
+GENERATED_MARKERS = re.compile(r"@generated|DO NOT EDIT|auto-generated|autogenerated", re.IGNORECASE)
+GENERATED_MARKER_LINES = 5
+# Content is minified or bundled when at least this share of its added lines are longer than `MINIFIED_LINE_CHARS`
+MINIFIED_LINE_CHARS = 1000
+MINIFIED_LINE_RATIO = 0.5
+HUNK_RANGES = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+
+class PreprocessingRules(BaseModel):
+    enabled: bool = Field(DIFF_PREPROCESSING_ENABLED, description="Apply any preprocessing at all.")
+    drop_lockfiles: bool = True
+    drop_generated: bool = True
+    drop_vendored: bool = True
+    drop_minified: bool = True
+    drop_binary: bool = True
+    drop_whitespace_only_hunks: bool = True
+    context_lines: Optional[int] = Field(
+        2, ge=0, description="Unchanged lines kept before and after every change; `null` keeps them all.")
+    max_file_tokens: Optional[int] = Field(
+        8000, gt=0, description="Files above this many tokens are truncated; `null` never truncates.")
+    exclude_paths: list[str] = Field(
+        default_factory=list, description="Further glob patterns of files to drop, e.g. `docs/*`.")
+    include_paths: list[str] = Field(
+        default_factory=list, description="Glob patterns of files that are never dropped, e.g. `vendor/ours/*`.")
+
+
+class PreprocessingReport(BaseModel):
+    tokens_before: int
+    tokens_after: int
+    dropped_files: dict[str, str] = Field(default_factory=dict, description="Dropped files and the rule that did it.")
+    truncated_files: list[str] = Field(default_factory=list)
+    dropped_hunks: int = 0
+    collapsed_lines: int = 0
+
+    def header(self) -> str:
+        return f"before={self.tokens_before}; after={self.tokens_after}"
+
+
+def _matches(path: str, patterns) -> bool:
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def _is_minified(added_lines: list[str]) -> bool:
+    lines = [line for line in added_lines if line.strip()]
+    long_lines = sum(1 for line in lines if len(line) > MINIFIED_LINE_CHARS)
+    return long_lines > 0 and long_lines >= MINIFIED_LINE_RATIO * len(lines)
+
+
+def _diff_head(hunks: list[str]) -> str:
+    """The first lines of the file, as far as a hunk starting at its top shows them."""
+    for hunk in hunks:
+        header, _, body = hunk.partition("\n")
+        ranges = HUNK_RANGES.match(header)
+        if ranges and min(int(ranges.group(1)), int(ranges.group(2))) <= 1:
+            return "\n".join(line[1:] for line in body.splitlines()[:GENERATED_MARKER_LINES])
+    return ""
+
+
+def drop_reason(path: str, head: str, added_lines: list[str], rules: PreprocessingRules,
+                binary: bool = False) -> Optional[str]:
+    """
+    The rule that drops the file at `path`, if any.
+
+    `head` is the file's first lines, as far as they are known, and `added_lines` its added (or, for a whole file,
+    all) lines without their `+`.
+    """
+    if _matches(path, rules.include_paths):
+        return None
+    if rules.exclude_paths and _matches(path, rules.exclude_paths):
+        return "excluded"
+    if rules.drop_binary and binary:
+        return "binary"
+    if rules.drop_lockfiles and _matches(path, LOCKFILE_PATTERNS):
+        return "lockfile"
+    if rules.drop_vendored and _matches(path, VENDORED_PATTERNS):
+        return "vendored"
+    if rules.drop_generated and (_matches(path, GENERATED_PATTERNS) or GENERATED_MARKERS.search(head)):
+        return "generated"
+    if rules.drop_minified and (_matches(path, MINIFIED_PATTERNS) or _is_minified(added_lines)):
+        return "minified"
+    return None
+
+
+def _normalize_whitespace(line: str, keep_indentation: bool) -> str:
+    """`line` with runs of whitespace collapsed to one space and trailing whitespace dropped."""
+    normalized = " ".join(line.split())
+    if keep_indentation and normalized:
+        return line[:len(line) - len(line.lstrip())] + normalized
+    return normalized
+
+
+def _is_whitespace_only(hunk_lines: list[str], keep_indentation: bool = False) -> bool:
+    removed = Counter(_normalize_whitespace(line[1:], keep_indentation) for line in hunk_lines if line.startswith("-"))
+    added = Counter(_normalize_whitespace(line[1:], keep_indentation) for line in hunk_lines if line.startswith("+"))
+    return bool(removed or added) and removed == added
+
+
+def _collapse_context(hunk_lines: list[str], context_lines: int) -> tuple[list[str], int]:
+    """The hunk's lines with runs of unchanged lines further than `context_lines` from a change replaced by a marker."""
+    changed = [i for i, line in enumerate(hunk_lines) if line[:1] in ("+", "-")]
+    keep = [False] * len(hunk_lines)
+    for i in changed:
+        for j in range(max(0, i - context_lines), min(len(hunk_lines), i + context_lines + 1)):
+            keep[j] = True
+
+    lines, collapsed, skipped = [], 0, []
+
+    def flush():
+        nonlocal collapsed
+        # A single unchanged line is kept, as the marker would be no shorter
+        if len(skipped) == 1:
+            lines.append(skipped[0])
+        elif skipped:
+            lines.append(f" ... ({len(skipped)} unchanged lines)")
+            collapsed += len(skipped)
+        skipped.clear()
+
+    for line, kept in zip(hunk_lines, keep):
+        if kept or not line.startswith(" "):
+            flush()
+            lines.append(line)
+        else:
+            skipped.append(line)
+    flush()
+    return lines, collapsed
+
+
+def _truncate(text: str, max_tokens: int) -> tuple[str, bool]:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind("\n", 0, max_chars) + 1 or max_chars
+    remaining = text[cut:].count("\n") + 1
+    return f"{text[:cut]}... (truncated, {remaining} more lines)\n", True
+
+
+def _preprocess_file(file: FileDiff, rules: PreprocessingRules, report: PreprocessingReport) -> str:
+    binary = "\nBinary files " in f"\n{file.header}" or "GIT binary patch" in file.header
+    added_lines = [line[1:] for hunk in file.hunks for line in hunk.splitlines()[1:] if line.startswith("+")]
+    reason = drop_reason(file.path, _diff_head(file.hunks), added_lines, rules, binary=binary) if file.path else None
+    if reason:
+        report.dropped_files[file.path] = reason
+        return ""
+
+    keep_indentation = _matches(file.path, INDENTATION_SENSITIVE_PATTERNS)
+    hunks = []
+    for hunk in file.hunks:
+        header, _, body = hunk.partition("\n")
+        hunk_lines = body.splitlines()
+        if rules.drop_whitespace_only_hunks and _is_whitespace_only(hunk_lines, keep_indentation):
+            report.dropped_hunks += 1
+            continue
+        if rules.context_lines is not None:
+            hunk_lines, collapsed = _collapse_context(hunk_lines, rules.context_lines)
+            report.collapsed_lines += collapsed
+        hunks.append("\n".join([header, *hunk_lines]) + "\n")
+    if file.hunks and not hunks:
+        report.dropped_files[file.path] = "whitespace"
+        return ""
+
+    text = file.header + "".join(hunks)
+    if rules.max_file_tokens is not None:
+        text, truncated = _truncate(text, rules.max_file_tokens)
+        if truncated:
+            report.truncated_files.append(file.path)
+    return text
+
+
+def _parse_file_map(diffs: str) -> Optional[dict[str, str]]:
+    """The `{"path": "content"}` JSON object sent instead of a diff, if `diffs` is one."""
+    if not diffs.lstrip().startswith("{"):
+        return None
+    try:
+        files = json.loads(diffs)
+    except ValueError:
+        return None
+    if isinstance(files, dict) and all(isinstance(value, str) for value in files.values()):
+        return files
+    return None
+
+
+def preprocess_diff(diffs: str, rules: Optional[PreprocessingRules] = None) -> tuple[str, PreprocessingReport]:
+    """`diffs` without the content `rules` drop, and a report of what was dropped and the tokens saved."""
+    rules = rules or PreprocessingRules()
+    report = PreprocessingReport(tokens_before=estimate_tokens(diffs), tokens_after=estimate_tokens(diffs))
+    if not rules.enabled:
+        return diffs, report
+
+    files = _parse_file_map(diffs)
+    if files is not None:
+        kept = {}
+        for path, content in files.items():
+            lines = content.splitlines()
+            reason = drop_reason(path, "\n".join(lines[:GENERATED_MARKER_LINES]), lines, rules, binary="\0" in content)
+            if reason:
+                report.dropped_files[path] = reason
+                continue
+            if rules.max_file_tokens is not None:
+                content, truncated = _truncate(content, rules.max_file_tokens)
+                if truncated:
+                    report.truncated_files.append(path)
+            kept[path] = content
+        processed = json.dumps(kept)
+    else:
+        processed = "".join(_preprocess_file(file, rules, report) for file in parse_diff(diffs))
+
+    if diffs.strip() and not processed.strip("{}\n"):
+        # Nothing but noise, e.g. a dependency bump touching only a lockfile: say what changed rather than send nothing
+        dropped = ", ".join(f"{path} ({reason})" for path, reason in report.dropped_files.items())
+        processed = f"Only files left out of the analysis changed: {dropped}\n"
+    report.tokens_after = estimate_tokens(processed)
+    return processed, report
@@ -0,0 +1,128 @@
+"""
+Gemini client shared by the summarization components.
+
+One `LLMClient` is created by the app's lifespan and closed again at shutdown, so every request reuses the same
+`genai.Client` and its pooled HTTP connections instead of opening a new TLS connection per call. Calls go through
+the client's async API, so a worker keeps serving other requests during an LLM round trip, and a semaphore bounds the
+calls in flight at once (`LLM_MAX_CONCURRENCY`) to stay within the API's rate limits.
+
+`google.genai` takes more than a second to import, so it is imported on first use rather than when the app is
+imported: the process starts serving `/health` straight away and the lifespan warms the client up in the background,
+which `/ready` reports on.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Optional Gemini API endpoint, e.g. the local fake LLM server in `benchmarks/fake_llm.py`
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+class LLMClient:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = GEMINI_BASE_URL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._client = None
+        self._load_seconds: Optional[float] = None
+        self._error: Optional[str] = None
+
+        self._calls = 0
+        self._failures = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._waiting = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._client is not None
+
+    def client(self):
+        """The `genai.Client`, created (and `google.genai` imported) on the first call."""
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                started = time.perf_counter()
+                try:
+                    from google import genai
+
+                    http_options = {"base_url": self.base_url} if self.base_url else None
+                    self._client = genai.Client(api_key=self.api_key or os.getenv("GEMINI_API_KEY"),
+                                                http_options=http_options)
+                except Exception as e:
+                    self._error = f"{type(e).__name__}: {e}"
+                    raise
+                self._load_seconds = time.perf_counter() - started
+                self._error = None
+        return self._client
+
+    async def warm_up(self):
+        """Creates the client in a worker thread, so the event loop keeps serving while `google.genai` is imported."""
+        try:
+            await asyncio.to_thread(self.client)
+        except Exception:
+            pass  # Recorded in `status()`; requests retry creating the client and surface the error themselves
+
+    async def generate(self, model: str, prompt: str, schema: type[Schema]) -> Schema:
+        """Generates a structured response and returns it parsed as `schema`."""
+        client = self._client or await asyncio.to_thread(self.client)
+
+        self._waiting += 1
+        async with self._semaphore:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            self._calls += 1
+            try:
+                response = await client.aio.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config={"response_mime_type": "application/json", "response_schema": schema},
+                )
+            except Exception:
+                self._failures += 1
+                raise
+            finally:
+                self._in_flight -= 1
+
+        if response.parsed is None:
+            raise HTTPException(status_code=502, detail=f"{model} returned a response that does not match the schema")
+        return response.parsed
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aio.aclose()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "load_seconds": self._load_seconds,
+            "error": self._error,
+            "max_concurrency": self.max_concurrency,
+            "calls": self._calls,
+            "failures": self._failures,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "waiting": self._waiting,
+        }
+
+
+def get_llm(request: Request) -> LLMClient:
+    """FastAPI dependency for the app's shared `LLMClient`, set up by its lifespan."""
+    llm = getattr(request.app.state, "llm", None)
+    if llm is None:
+        # The app is used without running its lifespan, e.g. through a `TestClient` outside a `with` block
+        llm = request.app.state.llm = LLMClient()
+    return llm
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRouter
+from pydantic import BaseModel, Field
+
+from .code_summarizer import StructuredSummary, summarize_code, summarize_code_incrementally
+from .diff_preprocessing import PreprocessingReport, PreprocessingRules, preprocess_diff
+from .llm import LLMClient, get_llm
+from .requirements_summarizer import ProductRequirementsSummary, summarize_requirements
+from .response_cache import ResponseCache, bypass_requested, get_response_cache
+from .synthesizer import ComparisonSummary, compare_summaries
+
+pipeline_app = APIRouter()
+
+
+class PipelineRequest(BaseModel):
+    diffs: str
+    requirements: str
+    # As for `/syntropy/code/summarize`: summarize file by file, reusing cached summaries of unchanged files
+    incremental: bool = False
+    # As for `/syntropy/code/summarize`: overrides of the diff preprocessing rules
+    preprocessing: Optional[PreprocessingRules] = None
+
+
+class PipelineResponse(BaseModel):
+    code_summary: Optional[StructuredSummary] = None
+    requirements_summary: Optional[ProductRequirementsSummary] = None
+    comparison: Optional[ComparisonSummary] = None
+    timings_ms: dict[str, float] = Field(
+        default_factory=dict,
+        description="Duration of every stage that ran, and of the whole pipeline (`total`), in milliseconds.")
+    cache: dict[str, str] = Field(
+        default_factory=dict,
+        description="Whether each completed stage was a response cache `hit`, `miss` or `bypass`.")
+    file_reuse: Optional[dict[str, float]] = Field(
+        default=None,
+        description="For incremental code summaries, how many file summaries there were and were reused.")
+    preprocessing: Optional[PreprocessingReport] = Field(
+        default=None,
+        description="Estimated tokens of the diff before and after preprocessing, and what was dropped or cut.")
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Why each failed stage failed; the comparison is skipped when a summary failed.")
+
+
+def describe(error: BaseException) -> str:
+    if isinstance(error, HTTPException):
+        return f"{error.status_code}: {error.detail}"
+    return f"{type(error).__name__}: {error}"
+
+
+@pipeline_app.post("", response_model=PipelineResponse)
+async def run_pipeline(
+        pr_data: PipelineRequest,
+        request: Request,
+        llm: LLMClient = Depends(get_llm),
+        cache: ResponseCache = Depends(get_response_cache)
+):
+    """
+    Summarizes the diff and the requirements concurrently, then compares the two summaries, in one request.
+
+    Completed stages are returned even when another fails. The response is a 200 when at least one stage completed,
+    with the failed stages in `errors`, and a 502 when none did.
+    """
+    result = PipelineResponse()
+    bypass = bypass_requested(request)
+    started = time.perf_counter()
+
+    async def stage(name: str, run):
+        stage_started = time.perf_counter()
+        try:
+            value, outcome = await run
+        except Exception as e:
+            result.errors[name] = describe(e)
+            return None
+        finally:
+            result.timings_ms[name] = (time.perf_counter() - stage_started) * 1000
+        result.cache[name] = outcome
+        return value
+
+    diffs, result.preprocessing = preprocess_diff(pr_data.diffs, pr_data.preprocessing)
+    result.timings_ms["preprocessing"] = (time.perf_counter() - started) * 1000
+
+    async def code_summary():
+        if not pr_data.incremental:
+            return await summarize_code(diffs, llm, cache, bypass)
+        summary, outcome, reuse = await summarize_code_incrementally(diffs, llm, cache, bypass)
+        result.file_reuse = {"files": reuse.files, "reused": reuse.reused, "ratio": reuse.ratio}
+        return summary, outcome
+
+    result.code_summary, result.requirements_summary = await asyncio.gather(
+        stage("code_summary", code_summary()),
+        stage("requirements_summary", summarize_requirements(pr_data.requirements, llm, cache, bypass)),
+    )
+    if result.code_summary is not None and result.requirements_summary is not None:
+        # The typed summaries go straight into the comparison, without a round trip through JSON
+        result.comparison = await stage(
+            "comparison", compare_summaries(result.code_summary, result.requirements_summary, llm, cache, bypass)
+        )
+    result.timings_ms["total"] = (time.perf_counter() - started) * 1000
+
+    completed = any(value is not None for value in (result.code_summary, result.requirements_summary))
+    return JSONResponse(result.model_dump(mode="json"), status_code=200 if completed else 502)
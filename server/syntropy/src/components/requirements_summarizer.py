@@ -1,10 +1,16 @@
-import os
 from pydantic import BaseModel, Field
+from fastapi import Depends, Request, Response
 from fastapi.routing import APIRouter
-from google import genai
+
+from .llm import LLMClient, get_llm
+from .response_cache import CACHE_HEADER, ResponseCache, bypass_requested, cached, get_response_cache
 
 product_requirements_app = APIRouter()
 
+MODEL = 'gemini-2.0-flash'
+# Part of every cached summary's key: bump it whenever the prompt below changes
+PROMPT_VERSION = 1
+
 
 class ProductRequirementsSummary(BaseModel):
     core_business_functionality: str = Field(
@@ -61,8 +67,12 @@ class PRModel(BaseModel):
     requirements: str  # Now represents product requirements document
 
 
-@product_requirements_app.post(path='/summarize', response_model=ProductRequirementsSummary)
-async def generate_requirements_summary(pr_data: PRModel) -> ProductRequirementsSummary:
+async def summarize_requirements(requirements: str, llm: LLMClient, cache: ResponseCache,
+                                 bypass: bool = False) -> tuple[ProductRequirementsSummary, str]:
+    """
+    A `(summary, outcome)` pair: the structured summary of `requirements` and how the response cache served it, one of
+    `hit`, `miss` or `bypass`.
+    """
     prompt = f"""
         Analyze the following product requirements document and return a structured JSON output 
         summarizing key expectations in the following categories:
@@ -97,17 +107,21 @@ async def generate_requirements_summary(pr_data: PRModel) -> ProductRequirements
         }}
 
         Here is the product requirements document:
-        {pr_data.requirements}
+        {requirements}
     """
 
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    response = client.models.generate_content(
-        model='gemini-2.0-flash',
-        contents=prompt,
-        config={
-            'response_mime_type': 'application/json',
-            'response_schema': ProductRequirementsSummary,
-        },
-    )
+    return await cached(cache, 'requirements', MODEL, PROMPT_VERSION, ProductRequirementsSummary, requirements,
+                        lambda: llm.generate(MODEL, prompt, ProductRequirementsSummary), bypass=bypass)
 
-    return response.parsed
+
+@product_requirements_app.post(path='/summarize', response_model=ProductRequirementsSummary)
+async def generate_requirements_summary(
+        pr_data: PRModel,
+        request: Request,
+        response: Response,
+        llm: LLMClient = Depends(get_llm),
+        cache: ResponseCache = Depends(get_response_cache)
+) -> ProductRequirementsSummary:
+    summary, outcome = await summarize_requirements(pr_data.requirements, llm, cache, bypass_requested(request))
+    response.headers[CACHE_HEADER] = outcome
+    return summary
@@ -0,0 +1,231 @@
+"""
+Content-addressed cache of structured LLM responses.
+
+Entries are keyed by a hash of the normalized input, the prompt template version, the model and the response schema,
+so a re-run, a reopened pull request or a replayed dataset is answered without another LLM call, while editing a
+prompt (and bumping its version), switching models or changing a schema starts from fresh entries. Validated responses
+are kept in an in-memory LRU tier backed by a disk tier of one JSON file per entry, so they survive restarts; both
+expire after `RESPONSE_CACHE_TTL_SECONDS`. The disk tier is swept on the first write and then once every tenth of
+`RESPONSE_CACHE_MAX_DISK_ENTRIES` writes: expired entries are deleted, then the oldest ones until at most that many
+are left. Concurrent requests for the same key share a single LLM call.
+
+Send `Cache-Control: no-cache` to skip the lookup and refresh the entry; every cached endpoint reports `hit`, `miss`
+or `bypass` in its `X-Syntropy-Cache` response header.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_DISK_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_DISK_ENTRIES", "10000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Set to an empty string to keep entries in memory only
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "syntropy-response-cache"))
+
+CACHE_HEADER = "X-Syntropy-Cache"
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+def normalize(text: str) -> str:
+    """Line endings unified and trailing whitespace dropped, which don't change what the LLM is asked."""
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+def cache_key(kind: str, model: str, prompt_version: int, schema: type[BaseModel], content: str) -> str:
+    schema_hash = hashlib.sha256(json.dumps(schema.model_json_schema(), sort_keys=True).encode()).hexdigest()
+    digest = hashlib.sha256()
+    for part in (kind, model, str(prompt_version), schema_hash, normalize(content)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def bypass_requested(request: Request) -> bool:
+    return "no-cache" in request.headers.get("cache-control", "").lower()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 directory: Optional[str] = RESPONSE_CACHE_DIR,
+                 max_disk_entries: int = RESPONSE_CACHE_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory or None
+        self.max_disk_entries = max(1, max_disk_entries)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        # Entries left on disk by a previous run are swept on the first write
+        self._writes_until_sweep = 0
+
+        # Key -> (expiry as a Unix timestamp, validated response)
+        self._memory: OrderedDict[str, tuple[float, BaseModel]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._counts = Counter()
+
+    async def get_or_generate(self, key: str, schema: type[Schema], generate: Callable[[], Awaitable[Schema]],
+                              bypass: bool = False) -> tuple[Schema, str]:
+        """
+        The cached response for `key`, or the one `generate` returns, along with how it was served (`hit`, `miss` or
+        `bypass`). With `bypass`, the cache isn't read but the fresh response replaces the entry.
+        """
+        if not bypass:
+            value = self._get_memory(key)
+            if value is None and self.directory:
+                value = await asyncio.to_thread(self._read_disk, key, schema)
+                if value is not None:
+                    self._counts["disk_hits"] += 1
+                    self._put_memory(key, value)
+            elif value is not None:
+                self._counts["memory_hits"] += 1
+            if value is not None:
+                return value, "hit"
+
+        self._counts["bypasses" if bypass else "misses"] += 1
+        # Identical requests arriving while the LLM call runs wait for it instead of making their own
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._counts["coalesced"] += 1
+            return await asyncio.shield(in_flight), "bypass" if bypass else "miss"
+
+        future = asyncio.ensure_future(self._generate(key, generate))
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so a client disconnecting doesn't cancel the call the other waiters share
+        return await asyncio.shield(future), "bypass" if bypass else "miss"
+
+    async def _generate(self, key: str, generate: Callable[[], Awaitable[Schema]]) -> Schema:
+        value = await generate()
+        self._put_memory(key, value)
+        if self.directory:
+            self._writes_until_sweep -= 1
+            sweep = self._writes_until_sweep <= 0
+            if sweep:
+                self._writes_until_sweep = max(1, self.max_disk_entries // 10)
+            try:
+                await asyncio.to_thread(self._write_disk, key, value)
+                if sweep:
+                    await asyncio.to_thread(self._sweep_disk)
+            except OSError:
+                self._counts["disk_errors"] += 1
+        return value
+
+    def _get_memory(self, key: str) -> Optional[BaseModel]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _put_memory(self, key: str, value: BaseModel):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (time.time() + self.ttl_seconds, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str, schema: type[Schema]) -> Optional[Schema]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["expires_at"] < time.time():
+                os.remove(path)
+                return None
+            return schema.model_validate(entry["value"])
+        except (OSError, ValueError, KeyError, ValidationError):
+            return None
+
+    def _write_disk(self, key: str, value: BaseModel):
+        path = self._path(key)
+        # Written to a temporary file first, so a concurrent reader never sees half an entry
+        temporary = f"{path}.{os.getpid()}.tmp"
+        expires_at = time.time() + self.ttl_seconds
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "value": value.model_dump(mode="json")}, f)
+        # The modification time is the expiry, so sweeps needn't read the entries
+        os.utime(temporary, (expires_at, expires_at))
+        os.replace(temporary, path)
+
+    def _sweep_disk(self):
+        """Deletes expired entries, then the ones expiring soonest beyond `max_disk_entries`."""
+        now = time.time()
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue  # Deleted by a concurrent reader or sweep
+
+        entries.sort()
+        num_expired = sum(1 for expires_at, _ in entries if expires_at < now)
+        num_removed = max(num_expired, len(entries) - self.max_disk_entries)
+        for _, path in entries[:num_removed]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._counts["disk_expired"] += num_expired
+        self._counts["disk_evictions"] += num_removed - num_expired
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> dict:
+        lookups = self._counts["memory_hits"] + self._counts["disk_hits"] + self._counts["misses"]
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "directory": self.directory,
+            "max_disk_entries": self.max_disk_entries,
+            "disk_expired": self._counts["disk_expired"],
+            "disk_evictions": self._counts["disk_evictions"],
+            "memory_hits": self._counts["memory_hits"],
+            "disk_hits": self._counts["disk_hits"],
+            "misses": self._counts["misses"],
+            "bypasses": self._counts["bypasses"],
+            "coalesced": self._counts["coalesced"],
+            "disk_errors": self._counts["disk_errors"],
+            "hit_ratio": (self._counts["memory_hits"] + self._counts["disk_hits"]) / lookups if lookups else None,
+        }
+
+
+def get_response_cache(request: Request) -> ResponseCache:
+    """FastAPI dependency for the app's `ResponseCache`, set up by its lifespan."""
+    cache = getattr(request.app.state, "response_cache", None)
+    if cache is None:
+        # The app is used without running its lifespan, e.g. through a `TestClient` outside a `with` block
+        cache = request.app.state.response_cache = ResponseCache()
+    return cache
+
+
+async def cached(cache: ResponseCache, kind: str, model: str, prompt_version: int, schema: type[Schema], content: str,
+                 generate: Callable[[], Awaitable[Schema]], bypass: bool = False) -> tuple[Schema, str]:
+    """The response to `content` from `cache`, or from `generate` on a miss, and whether it was a hit."""
+    key = cache_key(kind, model, prompt_version, schema, content)
+    return await cache.get_or_generate(key, schema, generate, bypass=bypass)
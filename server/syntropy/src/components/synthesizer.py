@@ -1,13 +1,19 @@
-import os
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
 from pydantic import BaseModel, Field
-from google import genai
 
 from .requirements_summarizer import ProductRequirementsSummary
 from .code_summarizer import StructuredSummary
+from .llm import LLMClient, get_llm
+from .response_cache import CACHE_HEADER, ResponseCache, bypass_requested, cached, get_response_cache
 
 comparison_app = APIRouter()
 
+MODEL = 'gemini-2.0-flash'
+# Part of every cached comparison's key: bump it whenever the prompt below changes
+PROMPT_VERSION = 1
+
 class ComparisonCategory(BaseModel):
     did_right: str = Field(..., description="Aspects where the code meets requirements.")
     did_wrong: str = Field(..., description="Aspects where the code fails to meet requirements.")
@@ -27,11 +33,13 @@ class ComparisonSummary(BaseModel):
     compliance_and_regulatory_considerations: ComparisonCategory
     adherence_to_standards_and_best_practices: ComparisonCategory
 
-@comparison_app.post("/summarize", response_model=ComparisonSummary)
-def compare_with_llm(
+async def compare_summaries(
         code_summary: StructuredSummary,
-        requirements_summary: ProductRequirementsSummary
-) -> ComparisonSummary:
+        requirements_summary: ProductRequirementsSummary,
+        llm: LLMClient,
+        cache: ResponseCache,
+        bypass: bool = False
+) -> tuple[ComparisonSummary, str]:
     """Sends both summaries to the LLM for a structured comparison."""
     prompt = f"""
     Given the following product requirements and the corresponding code implementation summaries, 
@@ -61,13 +69,22 @@ def compare_with_llm(
     **Code Implementation:** {code_summary}
     """
 
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    response = client.models.generate_content(
-        model='gemini-2.0-flash',
-        contents=prompt,
-        config={
-            'response_mime_type': 'application/json',
-            'response_schema': ComparisonSummary,
-        },
-    )
-    return response.parsed
+    # Both summaries, serialized with sorted keys, are the content the comparison is cached under
+    content = json.dumps([requirements_summary.model_dump(), code_summary.model_dump()], sort_keys=True)
+    return await cached(cache, 'comparison', MODEL, PROMPT_VERSION, ComparisonSummary, content,
+                        lambda: llm.generate(MODEL, prompt, ComparisonSummary), bypass=bypass)
+
+
+@comparison_app.post("/summarize", response_model=ComparisonSummary)
+async def compare_with_llm(
+        code_summary: StructuredSummary,
+        requirements_summary: ProductRequirementsSummary,
+        request: Request,
+        response: Response,
+        llm: LLMClient = Depends(get_llm),
+        cache: ResponseCache = Depends(get_response_cache)
+) -> ComparisonSummary:
+    comparison, outcome = await compare_summaries(code_summary, requirements_summary, llm, cache,
+                                                  bypass_requested(request))
+    response.headers[CACHE_HEADER] = outcome
+    return comparison
@@ -1,11 +1,33 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRouter
 
+from .components.llm import LLMClient
+from .components.pipeline import pipeline_app
+from .components.response_cache import ResponseCache, get_response_cache
 from .components.code_summarizer import code_summarization_app
 from .components.requirements_summarizer import product_requirements_app
 from .components.synthesizer import comparison_app
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Gemini client, and its connection pool, shared by every request and closed at shutdown
+    app.state.llm = LLMClient()
+    app.state.response_cache = ResponseCache()
+    # Warmed up in the background, so `/health` answers while `google.genai` is imported
+    warmup = asyncio.create_task(app.state.llm.warm_up())
+    yield
+    warmup.cancel()
+    await app.state.llm.aclose()
+    app.state.llm = None
+    app.state.response_cache = None
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Create a router to group both functionalities under `/syntropy`
 syntropy_router = APIRouter()
@@ -14,6 +36,12 @@ syntropy_router = APIRouter()
 syntropy_router.include_router(code_summarization_app, prefix="/code", tags=["Code Summarization"])
 syntropy_router.include_router(product_requirements_app, prefix="/requirements", tags=["Product Requirements Summarization"])
 syntropy_router.include_router(comparison_app, prefix="/comparison", tags=["Code-Requirement Alignment Summarization"])
+syntropy_router.include_router(pipeline_app, prefix="/pipeline", tags=["Code-Requirement Alignment Pipeline"])
+
+
+@syntropy_router.get("/cache/stats")
+async def cache_stats(cache: ResponseCache = Depends(get_response_cache)):
+    return cache.stats()
 
 
 # Mount the combined router under `/syntropy`
@@ -23,6 +51,13 @@ app.include_router(syntropy_router, prefix="/syntropy")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Succeeds once the Gemini client is created; `/health` only says the process is serving."""
+    llm = getattr(app.state, "llm", None)
+    status = llm.status() if llm is not None else {"ready": False}
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.get("/")
 async def root():
     return {"message": "Syntropy API is running"}
\ No newline at end of file
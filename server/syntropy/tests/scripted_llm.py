@@ -0,0 +1,39 @@
+import asyncio
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def placeholder(schema: type[BaseModel]) -> dict:
+    return {
+        name: placeholder(field.annotation) if issubclass(field.annotation, BaseModel) else f"Placeholder {name}."
+        for name, field in schema.model_fields.items()
+    }
+
+
+class ScriptedLLM:
+    """Answers every call after `delay` seconds with placeholder text, failing calls for the `failing` schemas."""
+
+    def __init__(self, delay: float = 0.1, failing: tuple = ()):
+        self.delay = delay
+        self.failing = failing
+        self.calls = []
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, model: str, prompt: str, schema: type[BaseModel]):
+        self.calls.append(schema.__name__)
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if schema in self.failing:
+            raise HTTPException(status_code=502, detail="Scripted failure")
+        return schema.model_validate(placeholder(schema))
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,116 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from benchmarks.synthetic_diffs import (
+    make_binary_diff, make_file_diff, make_lockfile_diff, make_minified_diff, make_reindent_diff
+)
+from src.components.diff_preprocessing import DIFF_TOKENS_HEADER, PreprocessingRules, preprocess_diff
+from src.components.response_cache import ResponseCache
+from src.main import app
+from tests.scripted_llm import ScriptedLLM
+
+SOURCE = make_file_diff("src/app.py", num_hunks=2)
+NOISE = (
+    make_lockfile_diff(200) + make_minified_diff() + make_binary_diff() + make_reindent_diff("web/old.js")
+    + make_file_diff("vendor/lib/util.py", num_hunks=1) + make_file_diff("api/service_pb2.py", num_hunks=1)
+)
+
+
+def test_noise_is_dropped_and_source_kept():
+    processed, report = preprocess_diff(NOISE + SOURCE)
+
+    assert "diff --git a/src/app.py" in processed
+    assert report.dropped_files == {
+        "package-lock.json": "lockfile",
+        "static/app.min.js": "minified",
+        "static/logo.png": "binary",
+        "web/old.js": "whitespace",
+        "vendor/lib/util.py": "vendored",
+        "api/service_pb2.py": "generated",
+    }
+    assert report.tokens_after < report.tokens_before / 5
+
+
+def diff_of(path: str, hunk: str) -> str:
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n{hunk}"
+
+
+def test_generated_markers_only_count_at_the_top_of_a_file():
+    comment = diff_of("src/ids.py", "@@ -40,2 +40,3 @@\n def next_id():\n+    # ids are auto-generated by the database\n"
+                                    "     return None\n")
+    header = diff_of("api/client.go", "@@ -0,0 +1,3 @@\n+// Code generated by oapi-codegen. DO NOT EDIT.\n+\n"
+                                      "+package api\n")
+
+    assert preprocess_diff(comment)[1].dropped_files == {}
+    assert preprocess_diff(header)[1].dropped_files == {"api/client.go": "generated"}
+    docs = {"src/ids.py": "import uuid\n" * 10 + "# ids are auto-generated\n", "gen.go": "// DO NOT EDIT.\n"}
+    assert preprocess_diff(json.dumps(docs))[1].dropped_files == {"gen.go": "generated"}
+
+
+def test_one_long_line_does_not_make_a_file_minified():
+    long_line = "+FIXTURE = '" + "a" * 1500 + "'\n"
+    source = diff_of("tests/fixtures.py", "@@ -1,3 +1,6 @@\n import json\n" + long_line
+                     + "".join(f"+CASE_{i} = {i}\n" for i in range(3)) + " \n")
+
+    assert preprocess_diff(source)[1].dropped_files == {}
+    assert preprocess_diff(make_minified_diff("static/bundle.js"))[1].dropped_files == {"static/bundle.js": "minified"}
+
+
+def test_indentation_and_removed_whitespace_are_changes():
+    dedent = diff_of("src/cleanup.py", "@@ -10,2 +10,2 @@\n if dry_run:\n-delete_everything()\n"
+                                       "+    delete_everything()\n")
+    joined = diff_of("src/app.js", "@@ -3 +3 @@\n-  return x;\n+  returnx;\n")
+    spacing = diff_of("src/app.js", "@@ -3 +3 @@\n-  return  x;   \n+\treturn x;\n")
+
+    assert preprocess_diff(dedent)[1].dropped_files == {}
+    assert preprocess_diff(joined)[1].dropped_files == {}
+    assert preprocess_diff(spacing)[1].dropped_files == {"src/app.js": "whitespace"}
+    assert preprocess_diff(make_reindent_diff("src/old.py"))[1].dropped_files == {}
+
+
+def test_context_lines_are_collapsed():
+    hunk = "@@ -1,9 +1,9 @@\n" + "".join(f" line {i}\n" for i in range(8)) + "-old\n+new\n"
+    diff = "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n" + hunk
+
+    processed, report = preprocess_diff(diff, PreprocessingRules(context_lines=1))
+
+    assert " ... (7 unchanged lines)\n line 7\n-old\n+new\n" in processed
+    assert report.collapsed_lines == 7
+    assert preprocess_diff(diff, PreprocessingRules(context_lines=None))[0] == diff
+
+
+def test_rules_can_be_overridden():
+    rules = PreprocessingRules(drop_lockfiles=False, include_paths=["vendor/*"], exclude_paths=["src/*"],
+                               max_file_tokens=1000)
+    processed, report = preprocess_diff(make_lockfile_diff(200) + make_file_diff("vendor/lib/util.py", 1) + SOURCE,
+                                        rules)
+
+    assert report.dropped_files == {"src/app.py": "excluded"}
+    assert report.truncated_files == ["package-lock.json"]
+    assert "vendor/lib/util.py" in processed
+    assert preprocess_diff(NOISE, PreprocessingRules(enabled=False))[0] == NOISE
+
+
+def test_file_map_and_noise_only_changes():
+    files = {"src/app.py": "print('hi')\n", "yarn.lock": "lodash@4:\n  version 4.17.21\n"}
+    processed, report = preprocess_diff(json.dumps(files))
+    assert json.loads(processed) == {"src/app.py": "print('hi')\n"}
+
+    processed, report = preprocess_diff(make_lockfile_diff(50))
+    assert processed == "Only files left out of the analysis changed: package-lock.json (lockfile)\n"
+
+
+def test_code_summary_prompt_is_preprocessed():
+    llm = ScriptedLLM(delay=0)
+    with TestClient(app) as client:
+        app.state.llm = llm
+        app.state.response_cache = ResponseCache(directory=None)
+        response = client.post("/syntropy/code/summarize",
+                               json={"diffs": NOISE + SOURCE, "preprocessing": {"drop_binary": False}})
+
+    assert response.status_code == 200
+    before, after = (int(part.split("=")[1]) for part in response.headers[DIFF_TOKENS_HEADER].split("; "))
+    assert after < before
+    assert "package-lock.json" not in llm.prompts[0]
+    assert "static/logo.png" in llm.prompts[0]
@@ -0,0 +1,82 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from benchmarks.synthetic_diffs import make_file_diff
+from src.components.code_summarizer import summarize_code_incrementally
+from src.components.response_cache import ResponseCache
+from src.main import app
+from tests.scripted_llm import ScriptedLLM
+
+FILES = [f"src/module_{i}.py" for i in range(4)]
+
+
+def push(seed_by_path: dict[str, int]) -> str:
+    """A diff of `FILES`, where changing a file's seed stands for another commit touching that file."""
+    return "".join(make_file_diff(path, num_hunks=2, seed=seed_by_path.get(path, 0)) for path in FILES)
+
+
+def test_only_changed_files_are_summarized_again():
+    llm = ScriptedLLM(delay=0)
+    cache = ResponseCache(directory=None)
+
+    async def run():
+        first = await summarize_code_incrementally(push({}), llm, cache)
+        calls_after_first = len(llm.calls)
+        second = await summarize_code_incrementally(push({FILES[2]: 1}), llm, cache)
+        calls_after_second = len(llm.calls)
+        third = await summarize_code_incrementally(push({FILES[2]: 1}), llm, cache)
+        return first, second, third, calls_after_first, calls_after_second
+
+    first, second, third, calls_after_first, calls_after_second = asyncio.run(run())
+
+    assert (first[2].files, first[2].reused, first[1]) == (4, 0, "miss")
+    assert calls_after_first == 4 + 1  # Every file, then the merge
+    assert (second[2].reused, second[2].ratio, second[1]) == (3, 0.75, "miss")
+    # Only the changed file is summarized again (the placeholder summaries are identical, so the merge is cached)
+    second_push_prompts = llm.prompts[calls_after_first:calls_after_second]
+    assert [FILES[2] in prompt for prompt in second_push_prompts] == [True]
+    assert (third[2].reused, third[1]) == (4, "hit")
+    assert len(llm.calls) == calls_after_second
+
+
+def test_file_key_ignores_blob_hashes_in_the_header():
+    llm = ScriptedLLM(delay=0)
+    cache = ResponseCache(directory=None)
+    diff = make_file_diff(FILES[0], num_hunks=1)
+    rebased = diff.replace(diff.splitlines()[1], "index 0000000..1111111 100644")
+
+    async def run():
+        await summarize_code_incrementally(diff, llm, cache)
+        return await summarize_code_incrementally(rebased, llm, cache)
+
+    _, outcome, reuse = asyncio.run(run())
+
+    assert (outcome, reuse.reused) == ("hit", 1)
+    assert len(llm.calls) == 1
+
+
+def test_empty_diff_is_summarized_like_the_non_incremental_path():
+    llm = ScriptedLLM(delay=0)
+    cache = ResponseCache(directory=None)
+
+    async def run():
+        return [await summarize_code_incrementally(diff, llm, cache) for diff in ("", "  \n")]
+
+    (summary, outcome, reuse), (_, blank_outcome, _) = asyncio.run(run())
+
+    assert summary is not None
+    assert (outcome, reuse.files, reuse.ratio) == ("miss", 0, 1.0)
+    assert blank_outcome == "hit"  # Same normalized content as the empty diff
+    assert len(llm.calls) == 1
+
+
+def test_endpoint_reports_reuse():
+    with TestClient(app) as client:
+        app.state.llm = ScriptedLLM(delay=0)
+        app.state.response_cache = ResponseCache(directory=None)
+        client.post("/syntropy/code/summarize", json={"diffs": push({}), "incremental": True})
+        response = client.post("/syntropy/code/summarize", json={"diffs": push({FILES[0]: 1}), "incremental": True})
+
+    assert response.status_code == 200
+    assert response.headers["X-Syntropy-File-Reuse"] == "files=4; reused=3; ratio=0.75"
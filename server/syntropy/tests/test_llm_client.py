@@ -0,0 +1,71 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.components.llm import LLMClient
+from src.components.requirements_summarizer import ProductRequirementsSummary
+from src.components.response_cache import ResponseCache
+from src.main import app
+
+
+@pytest.fixture(scope="module")
+def fake_llm_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_llm:app_from_env", "--factory", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, "FAKE_LLM_LATENCY_MS": "100"}
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{url}/stub/stats")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def test_concurrent_calls_are_limited(fake_llm_url):
+    httpx.post(f"{fake_llm_url}/stub/reset")
+
+    async def run():
+        llm = LLMClient(api_key="fake", base_url=fake_llm_url, max_concurrency=2)
+        try:
+            return await asyncio.gather(*[
+                llm.generate("gemini-2.0-flash", "Users log in.", ProductRequirementsSummary) for _ in range(6)
+            ])
+        finally:
+            await llm.aclose()
+
+    summaries = asyncio.run(run())
+
+    assert all(isinstance(summary, ProductRequirementsSummary) for summary in summaries)
+    stats = httpx.get(f"{fake_llm_url}/stub/stats").json()
+    assert stats["total"] == 6
+    assert stats["max_in_flight"] == 2
+
+
+def test_endpoints_share_the_app_client(fake_llm_url):
+    with TestClient(app) as client:
+        app.state.llm = llm = LLMClient(api_key="fake", base_url=fake_llm_url)
+        app.state.response_cache = ResponseCache(directory=None)
+        for requirements in ("Users log in.", "Users log out."):
+            response = client.post("/syntropy/requirements/summarize", json={"requirements": requirements})
+            assert response.status_code == 200
+            assert set(response.json()) == set(ProductRequirementsSummary.model_fields)
+
+    assert llm.status()["calls"] == 2
@@ -0,0 +1,72 @@
+import asyncio
+
+from src.components.code_summarizer import StructuredSummary, summarize_code
+from src.components.diff_chunks import estimate_tokens, parse_diff, split_diff
+from src.components.response_cache import ResponseCache
+from tests.scripted_llm import ScriptedLLM
+
+
+def make_file(path: str, hunks: int, lines_per_hunk: int = 20) -> str:
+    header = f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n"
+    body = "".join(
+        f"@@ -{h * 100},{lines_per_hunk} +{h * 100},{lines_per_hunk} @@\n"
+        + "".join(f"+    value_{h}_{i} = compute({i})\n" for i in range(lines_per_hunk))
+        for h in range(hunks)
+    )
+    return header + body
+
+
+def test_parse_diff_splits_files_and_hunks():
+    files = parse_diff(make_file("src/a.py", 2) + make_file("src/b.py", 3))
+
+    assert [file.path for file in files] == ["src/a.py", "src/b.py"]
+    assert [len(file.hunks) for file in files] == [2, 3]
+    assert files[1].header.startswith("diff --git a/src/b.py")
+
+
+def test_split_diff_keeps_files_together_and_repeats_headers():
+    small = [make_file(f"src/small_{i}.py", 1) for i in range(3)]
+    large = make_file("src/large.py", 12)
+    diffs = "".join(small) + large
+
+    chunks = split_diff(diffs, max_tokens=1000)
+
+    assert "".join(small) in chunks[0]
+    assert all(estimate_tokens(chunk) <= 1000 + 1 for chunk in chunks)
+    large_chunks = [chunk for chunk in chunks if "src/large.py" in chunk]
+    assert len(large_chunks) > 1
+    assert all("+++ b/src/large.py" in chunk for chunk in large_chunks)
+    assert sum(chunk.count("@@ -") for chunk in chunks) == 3 + 12
+
+
+def test_split_diff_cuts_text_without_diff_headers_between_lines():
+    code = "".join(f"print({i})\n" for i in range(2000))
+
+    chunks = split_diff(code, max_tokens=500)
+
+    assert "".join(chunks) == code
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+
+
+def test_small_diffs_take_a_single_call():
+    llm = ScriptedLLM(delay=0)
+
+    summary, _ = asyncio.run(summarize_code(make_file("src/a.py", 1), llm, ResponseCache(directory=None)))
+
+    assert isinstance(summary, StructuredSummary)
+    assert len(llm.calls) == 1
+
+
+def test_large_diffs_are_summarized_in_bounded_parallel_chunks_and_merged():
+    llm = ScriptedLLM(delay=0.02)
+    diffs = "".join(make_file(f"src/module_{i}.py", 4) for i in range(20))
+
+    summary, _ = asyncio.run(summarize_code(diffs, llm, ResponseCache(directory=None), chunk_tokens=1500,
+                                            max_parallel_chunks=3))
+
+    num_chunks = len(split_diff(diffs, 1500))
+    assert isinstance(summary, StructuredSummary)
+    assert num_chunks > 3
+    assert len(llm.calls) > num_chunks  # Every chunk, then at least one merge
+    assert llm.max_in_flight == 3
+    assert all(estimate_tokens(prompt) < 1500 + 1000 for prompt in llm.prompts)  # Budget plus the instructions
@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+from src.components.code_summarizer import StructuredSummary
+from src.components.response_cache import ResponseCache
+from src.main import app
+from tests.scripted_llm import ScriptedLLM
+
+
+def run_pipeline(llm: ScriptedLLM):
+    with TestClient(app) as client:
+        app.state.llm = llm
+        app.state.response_cache = ResponseCache(directory=None)
+        return client.post("/syntropy/pipeline", json={"diffs": "+print('hi')", "requirements": "Say hi."})
+
+
+def test_summaries_run_concurrently_before_the_comparison():
+    llm = ScriptedLLM()
+    response = run_pipeline(llm)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["errors"] == {}
+    assert body["comparison"]["core_business_functionality"]["did_right"] == "Placeholder did_right."
+    assert body["cache"] == {"code_summary": "miss", "requirements_summary": "miss", "comparison": "miss"}
+    assert llm.calls[-1] == "ComparisonSummary"
+    timings = body["timings_ms"]
+    # Both summaries overlap, so the pipeline takes about two LLM calls rather than three
+    assert timings["total"] < timings["code_summary"] + timings["requirements_summary"] + timings["comparison"] - 50
+
+
+def test_failed_stage_keeps_completed_ones():
+    response = run_pipeline(ScriptedLLM(failing=(StructuredSummary,)))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["code_summary"] is None
+    assert body["requirements_summary"]["core_business_functionality"] == "Placeholder core_business_functionality."
+    assert body["comparison"] is None
+    assert body["errors"] == {"code_summary": "502: Scripted failure"}
+    assert "comparison" not in body["timings_ms"]
@@ -0,0 +1,99 @@
+import asyncio
+
+from src.components.code_summarizer import StructuredSummary
+from src.components.requirements_summarizer import ProductRequirementsSummary
+from src.components.response_cache import ResponseCache, cache_key
+
+summary = ProductRequirementsSummary(**{field: "Users must log in." for field in ProductRequirementsSummary.model_fields})
+
+
+def counting_generate(calls: list, delay: float = 0):
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return summary
+    return generate
+
+
+def test_key_ignores_whitespace_but_not_version_model_or_schema():
+    key = cache_key("requirements", "gemini-2.0-flash", 1, ProductRequirementsSummary, "Users log in.\r\n")
+
+    assert key == cache_key("requirements", "gemini-2.0-flash", 1, ProductRequirementsSummary, "  Users log in.  ")
+    assert key != cache_key("requirements", "gemini-2.0-flash", 2, ProductRequirementsSummary, "Users log in.")
+    assert key != cache_key("requirements", "gemini-1.5-pro-latest", 1, ProductRequirementsSummary, "Users log in.")
+    assert key != cache_key("requirements", "gemini-2.0-flash", 1, StructuredSummary, "Users log in.")
+
+
+def test_hits_memory_then_disk_after_restart(tmp_path):
+    calls = []
+
+    async def run():
+        cache = ResponseCache(directory=str(tmp_path))
+        first = await cache.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        second = await cache.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        restarted = ResponseCache(directory=str(tmp_path))
+        third = await restarted.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        return first, second, third, restarted.stats()
+
+    first, second, third, stats = asyncio.run(run())
+
+    assert [outcome for _, outcome in (first, second, third)] == ["miss", "hit", "hit"]
+    assert third[0] == summary
+    assert stats["disk_hits"] == 1
+    assert len(calls) == 1
+
+
+def test_expired_and_bypassed_entries_are_regenerated(tmp_path):
+    calls = []
+
+    async def run():
+        cache = ResponseCache(ttl_seconds=-1, directory=str(tmp_path))
+        await cache.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        _, expired = await cache.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        fresh = ResponseCache(directory=None)
+        await fresh.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls))
+        _, bypassed = await fresh.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls),
+                                                  bypass=True)
+        return expired, bypassed
+
+    assert asyncio.run(run()) == ("miss", "bypass")
+    assert len(calls) == 4
+
+
+def test_concurrent_identical_requests_share_one_call():
+    calls = []
+
+    async def run():
+        cache = ResponseCache(directory=None)
+        results = await asyncio.gather(*[
+            cache.get_or_generate("key", ProductRequirementsSummary, counting_generate(calls, delay=0.05))
+            for _ in range(10)
+        ])
+        return results, cache.stats()
+
+    results, stats = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(value == summary for value, _ in results)
+    assert stats["coalesced"] == 9
+
+
+def test_disk_tier_is_swept_of_expired_and_excess_entries(tmp_path):
+    calls = []
+
+    async def run():
+        stale = ResponseCache(ttl_seconds=-1, directory=str(tmp_path))
+        for i in range(3):
+            stale._write_disk(f"stale-{i}", summary)
+        cache = ResponseCache(directory=str(tmp_path), max_disk_entries=20)
+        for i in range(25):
+            await cache.get_or_generate(f"key-{i}", ProductRequirementsSummary, counting_generate(calls))
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    remaining = sorted(path.stem for path in tmp_path.glob("*.json"))
+
+    # Swept on the first write, which drops the stale entries, and on every second write after it
+    assert stats["disk_expired"] == 3
+    assert stats["disk_evictions"] == 5
+    assert remaining == sorted(f"key-{i}" for i in range(5, 25))
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+
+def test_import_does_not_load_genai():
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, src.main; print('google.genai' in sys.modules)"],
+        capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_ready_once_client_is_created(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        for _ in range(200):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            assert response.status_code == 503
+            time.sleep(0.05)
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True